@@ -5,9 +5,17 @@ CREATE TABLE IF NOT EXISTS events (
   date VARCHAR(255) NOT NULL,
   time VARCHAR(50) NOT NULL,
   location VARCHAR(255) NOT NULL,
-  author VARCHAR(255) NOT NULL
+  author VARCHAR(255) NOT NULL,
+  starts_at TIMESTAMPTZ,
+  selection_strategy TEXT NOT NULL DEFAULT 'weighted',
+  revision BIGINT NOT NULL DEFAULT 1,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 )
 
+CREATE INDEX IF NOT EXISTS events_starts_at_idx ON events (starts_at)
+CREATE INDEX IF NOT EXISTS events_genre_id_idx ON events (genre, id)
+CREATE INDEX IF NOT EXISTS events_author_id_idx ON events (author, id)
+
 CREATE TABLE IF NOT EXISTS rsvps (
   id BIGSERIAL PRIMARY KEY,
   event_id BIGINT NOT NULL,
@@ -18,6 +26,8 @@ CREATE TABLE IF NOT EXISTS rsvps (
   UNIQUE (event_id, author)
 )
 
+CREATE INDEX CONCURRENTLY IF NOT EXISTS rsvps_event_id_id_idx ON rsvps (event_id, id)
+
 CREATE TABLE IF NOT EXISTS event_winners (
   event_id BIGINT, 
   FOREIGN KEY (event_id) REFERENCES events(id) ON DELETE CASCADE,
@@ -27,6 +37,68 @@ CREATE TABLE IF NOT EXISTS event_winners (
   author VARCHAR(255) NOT NULL,
   radarr_sent_at TIMESTAMPTZ,
   radarr_status TEXT NOT NULL DEFAULT 'unsent',
+  strategy TEXT,
+  seed BIGINT,
   UNIQUE (event_id), 
   PRIMARY KEY (event_id, movie)
 )
+
+CREATE INDEX IF NOT EXISTS event_winners_author_idx ON event_winners (author)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS event_winners_rsvp_id_idx ON event_winners (rsvp_id)
+
+CREATE TABLE IF NOT EXISTS outbox (
+  id BIGSERIAL PRIMARY KEY,
+  kind TEXT NOT NULL,
+  event_id BIGINT NOT NULL,
+  FOREIGN KEY (event_id) REFERENCES events(id) ON DELETE CASCADE,
+  payload JSONB NOT NULL,
+  status TEXT NOT NULL DEFAULT 'pending',
+  attempts INT NOT NULL DEFAULT 0,
+  available_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  claimed_until TIMESTAMPTZ,
+  last_error TEXT,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  processed_at TIMESTAMPTZ,
+  UNIQUE (kind, event_id)
+)
+
+CREATE INDEX IF NOT EXISTS outbox_pending_idx
+ON outbox (available_at)
+WHERE status = 'pending'
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS outbox_event_id_idx ON outbox (event_id)
+
+CREATE TABLE IF NOT EXISTS movies (
+  tmdb_id BIGINT PRIMARY KEY,
+  title VARCHAR(255) NOT NULL,
+  title_key VARCHAR(255) NOT NULL,
+  year INT,
+  is_available BOOLEAN,
+  in_library BOOLEAN NOT NULL DEFAULT FALSE,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+)
+
+CREATE INDEX IF NOT EXISTS movies_title_key_idx ON movies (title_key text_pattern_ops)
+
+CREATE INDEX IF NOT EXISTS movies_updated_at_idx ON movies (updated_at)
+
+CREATE TABLE IF NOT EXISTS data_version (
+  id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+  version BIGINT NOT NULL DEFAULT 1,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+)
+
+CREATE TABLE IF NOT EXISTS author_stats (
+  author VARCHAR(255) PRIMARY KEY,
+  rsvp_count BIGINT NOT NULL DEFAULT 0,
+  win_count BIGINT NOT NULL DEFAULT 0,
+  last_win_at TIMESTAMPTZ,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+)
+
+CREATE TABLE IF NOT EXISTS schema_migrations (
+  version INT PRIMARY KEY,
+  name TEXT NOT NULL,
+  applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  duration_ms INT NOT NULL
+)
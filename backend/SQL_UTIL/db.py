@@ -1,9 +1,245 @@
 # backend/SQL_UTIL/db.py
+# Connection pools. Nothing connects at import: each process opens the pool
+# it uses, sized for its role, with open_async_pool(role) (API, watcher,
+# export CLI) or open_pool(role). The sync pool also opens itself with the
+# cli sizes on first use, for scripts and benches. Migrations (init_db) run
+# on a dedicated connection of their own and open no pool.
 import os
-from psycopg_pool import ConnectionPool
+from time import monotonic, perf_counter
+from weakref import WeakKeyDictionary
+
+import orjson
+from psycopg_pool import AsyncConnectionPool, ConnectionPool
 from psycopg.rows import dict_row
+from psycopg.types.json import set_json_loads
+
+from ..deadline import remaining, within_deadline
+from ..metrics import POOL_WAIT, TimedAsyncCursor, query_name, register_pool
+from .operations import set_statement_timeout, warm_connection
+
+DB_URL = os.environ.get("MOVIE_PICKER_DB_URL")
+# No statement on the async pool runs longer, request deadlines are usually
+# shorter (backend/deadline.py)
+DB_STATEMENT_TIMEOUT_SECONDS = float(os.environ.get("MOVIE_PICKER_DB_STATEMENT_TIMEOUT", 30))
+# Set to 0 behind a pooler that can't keep server-side prepared statements
+# (PgBouncer before 1.21 in transaction mode)
+DB_PREPARE = os.environ.get("MOVIE_PICKER_DB_PREPARE", "1") != "0"
+
+# (min_size, max_size) by process role. A pool opens with min_size
+# connections and grows up to max_size under load, connections over min_size
+# are closed again after MOVIE_PICKER_DB_POOL_MAX_IDLE seconds unused.
+# Override with MOVIE_PICKER_<ROLE>_POOL_MIN and _MAX.
+POOL_SIZES: dict[str, tuple[int, int]] = {
+    # Request handlers, live feed and movie index refreshes
+    "api": (4, 10),
+    # A tick, plus MOVIE_PICKER_DISPATCH_CONCURRENCY Radarr results
+    "watcher": (2, 6),
+    # Exports, replays and benches run from the command line
+    "cli": (1, 4),
+}
+# Connections are replaced after this long (with some jitter), so memory a
+# backend accumulated and connections pinned to an old server after a
+# failover don't live forever
+DB_POOL_MAX_LIFETIME_SECONDS = float(os.environ.get("MOVIE_PICKER_DB_POOL_MAX_LIFETIME", 3600))
+DB_POOL_MAX_IDLE_SECONDS = float(os.environ.get("MOVIE_PICKER_DB_POOL_MAX_IDLE", 600))
+# Async pool connections that sat unused for longer are checked with a
+# round-trip before they are handed out, a server restart or a proxy may
+# have dropped them meanwhile. Busy connections skip the check.
+DB_POOL_CHECK_IDLE_SECONDS = float(os.environ.get("MOVIE_PICKER_DB_POOL_CHECK_IDLE", 10))
+# Wait for min_size warmed-up connections before serving, so the first
+# requests after a deploy don't pay for connecting. With 0 the process starts
+# serving right away and the connections are made in the background.
+DB_POOL_WARMUP = os.environ.get("MOVIE_PICKER_DB_POOL_WARMUP", "1") != "0"
+
+
+def pool_size(role: str) -> tuple[int, int]:
+    min_size, max_size = POOL_SIZES[role]
+    prefix = f"MOVIE_PICKER_{role.upper()}_POOL"
+    min_size = int(os.environ.get(f"{prefix}_MIN", min_size))
+    max_size = int(os.environ.get(f"{prefix}_MAX", max(max_size, min_size)))
+    return min_size, max_size
+
+
+# operations.py queries run on every request or watcher tick. They are
+# prepared on each pooled connection the first time they run there, later
+# runs skip parsing and planning. Other queries are prepared by psycopg
+# after their 5th run on a connection, as usual.
+PREPARED_QUERIES = frozenset(
+    {
+        "get_data_version",
+        "get_event_revision",
+        "get_events_query",
+        "get_event_details_query",
+        "get_rsvps_for_event",
+        "get_event_winner_query",
+        "get_author_stats",
+        "get_author_stats_page",
+        "get_movie_by_title_key",
+        "insert_event",
+        "insert_rsvp",
+        "delete_event_query",
+        "delete_rsvp_query",
+        "claim_due_event_candidates",
+        "insert_event_winners",
+        "get_watcher_deadlines",
+        "claim_outbox_jobs",
+        "record_outbox_job_sent",
+        "record_outbox_job_failed",
+    }
+)
+
+
+# JSON columns (the event details' rsvps and winner) are parsed with orjson
+# instead of the stdlib json module
+set_json_loads(orjson.loads)
+
+
+class PoolAsyncCursor(TimedAsyncCursor):
+    # Cursor factory for the async pool: PREPARED_QUERIES are prepared on
+    # their first run, unless the caller says otherwise, and queries are
+    # cancelled when the request's deadline passes
+
+    async def execute(self, query, params=None, *, prepare=None, **kwargs):
+        if prepare is None and DB_PREPARE and query_name(query) in PREPARED_QUERIES:
+            prepare = True
+        return await within_deadline(
+            super().execute(query, params, prepare=prepare, **kwargs), "the database"
+        )
+
+    async def executemany(self, query, params_seq, **kwargs):
+        return await within_deadline(
+            super().executemany(query, params_seq, **kwargs), "the database"
+        )
+
+
+class DeadlineAsyncConnectionPool(AsyncConnectionPool):
+    # Waits for a free connection no longer than the request has left,
+    # PoolTimeout when none came in time
+
+    async def getconn(self, timeout: float | None = None):
+        if timeout is None:
+            left = remaining()
+            if left is not None:
+                timeout = min(left, self.timeout)
+        start = perf_counter()
+        try:
+            return await super().getconn(timeout)
+        finally:
+            POOL_WAIT.labels(self.name).observe(perf_counter() - start)
+
+
+class CLIConnectionPool(ConnectionPool):
+    # Opens itself with the cli sizes on first use unless open_pool() ran
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.was_opened = False
+
+    def open(self, wait: bool = False, timeout: float = 30.0):
+        self.was_opened = True
+        super().open(wait, timeout)
 
-# Initialize the database connection pool
-POOL = ConnectionPool(
-    os.environ.get("MOVIE_PICKER_DB_URL"), kwargs={"row_factory": dict_row}
+    def getconn(self, timeout: float | None = None):
+        if not self.was_opened:
+            open_pool("cli")
+        start = perf_counter()
+        try:
+            return super().getconn(timeout)
+        finally:
+            POOL_WAIT.labels(self.name).observe(perf_counter() - start)
+
+
+# When each async pool connection was last given back (or connected)
+RETURNED_AT: WeakKeyDictionary = WeakKeyDictionary()
+
+
+async def configure_connection(conn):
+    _ = await conn.execute(
+        set_statement_timeout, (f"{int(DB_STATEMENT_TIMEOUT_SECONDS * 1000)}ms",)
+    )
+    if DB_POOL_WARMUP:
+        _ = await conn.execute(warm_connection)
+    RETURNED_AT[conn] = monotonic()
+
+
+async def check_idle_connection(conn):
+    # Raising makes the pool throw the connection away and try another one
+    if monotonic() - RETURNED_AT.get(conn, 0) > DB_POOL_CHECK_IDLE_SECONDS:
+        await AsyncConnectionPool.check_connection(conn)
+
+
+async def mark_returned(conn):
+    RETURNED_AT[conn] = monotonic()
+
+
+# Sync pool for init-time scripts, replays and benches
+POOL = CLIConnectionPool(
+    DB_URL,
+    kwargs={"row_factory": dict_row},
+    min_size=0,
+    max_size=1,
+    open=False,
+    name="sync",
+    max_lifetime=DB_POOL_MAX_LIFETIME_SECONDS,
+    max_idle=DB_POOL_MAX_IDLE_SECONDS,
+)
+
+# Async connection pool used by the API handlers and the watcher so queries
+# don't block the event loop.
+# Autocommit: a single statement is one round-trip instead of three (BEGIN,
+# the statement, COMMIT). Code that needs several statements to be atomic
+# opens conn.transaction() itself.
+ASYNC_POOL = DeadlineAsyncConnectionPool(
+    DB_URL,
+    kwargs={
+        "row_factory": dict_row,
+        "cursor_factory": PoolAsyncCursor,
+        "autocommit": True,
+        "prepare_threshold": 5 if DB_PREPARE else None,
+    },
+    min_size=0,
+    max_size=1,
+    open=False,
+    name="async",
+    configure=configure_connection,
+    check=check_idle_connection,
+    reset=mark_returned,
+    max_lifetime=DB_POOL_MAX_LIFETIME_SECONDS,
+    max_idle=DB_POOL_MAX_IDLE_SECONDS,
 )
+
+
+async def open_async_pool(role: str) -> float:
+    # Returns how long opening (and warming up) took, in seconds
+    min_size, max_size = pool_size(role)
+    # Tells the processes apart in pg_stat_activity
+    ASYNC_POOL.kwargs["application_name"] = f"movie-picker-{role}"
+    start = perf_counter()
+    await ASYNC_POOL.open()
+    await ASYNC_POOL.resize(min_size, max_size)
+    if DB_POOL_WARMUP:
+        # PoolTimeout (and the process fails to start) if the database
+        # can't be reached
+        await ASYNC_POOL.wait(timeout=ASYNC_POOL.timeout)
+    return perf_counter() - start
+
+
+async def close_async_pool():
+    await ASYNC_POOL.close()
+
+
+def open_pool(role: str):
+    min_size, max_size = pool_size(role)
+    POOL.kwargs["application_name"] = f"movie-picker-{role}"
+    POOL.open()
+    POOL.resize(min_size, max_size)
+    if DB_POOL_WARMUP:
+        POOL.wait(timeout=POOL.timeout)
+
+
+def close_pool():
+    POOL.close()
+
+
+register_pool("sync", POOL)
+register_pool("async", ASYNC_POOL)
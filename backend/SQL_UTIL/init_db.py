@@ -1,21 +1,30 @@
 # backend/SQL_UTIL/init_db.py
-from .db import POOL
-from .operations import (
-    create_events_table,
-    create_rsvps_table,
-    create_event_winners_table,
-)
+# Creates or upgrades the schema by applying the pending migrations in
+# backend/SQL_UTIL/migrations.py. From the root directory:
+#   python -m backend.SQL_UTIL.init_db            # everything pending
+#   python -m backend.SQL_UTIL.init_db --to 3     # up to version 3
+#   python -m backend.SQL_UTIL.init_db --status   # applied / pending
+# Migrations run on a dedicated connection (backend/SQL_UTIL/migrations.py),
+# no pool is opened.
+import argparse
 
+from .migrations import migrate, migration_status
 
-def init_db():
-    with POOL.connection() as conn:
-        with conn.cursor() as cur:
-            _ = cur.execute(create_events_table)
-            _ = cur.execute(create_rsvps_table)
-            _ = cur.execute(create_event_winners_table)
+
+def init_db(target: int | None = None) -> list[int]:
+    return migrate(target)
 
 
 if __name__ == "__main__":
-    init_db()
-    print("[init_db] Database schema initialized successfully.")
-    POOL.close()
+    parser = argparse.ArgumentParser()
+    _ = parser.add_argument("--to", type=int, help="stop after this version")
+    _ = parser.add_argument("--status", action="store_true")
+    args = parser.parse_args()
+
+    if args.status:
+        for migration in migration_status():
+            state = migration["applied_at"] or "pending"
+            print(f"[init_db] {migration['version']:>3} {migration['name']}: {state}")
+    else:
+        applied = init_db(args.to)
+        print(f"[init_db] Database schema initialized successfully ({len(applied)} migrations applied).")
@@ -0,0 +1,334 @@
+# backend/SQL_UTIL/migrations.py
+# Versioned schema changes, applied in order by init_db and recorded in
+# schema_migrations. Append new migrations at the end with the next version,
+# never edit or renumber one that has shipped.
+#
+# A migration is a list of steps:
+#   - Transactional: statements run in one transaction, with lock waits
+#     capped and retried so DDL doesn't queue up traffic behind it
+#   - ConcurrentIndex: CREATE INDEX CONCURRENTLY, outside any transaction,
+#     writes keep going while it builds
+#   - Backfill: an UPDATE of at most %(batch_size)s rows, repeated in short
+#     transactions until it changes nothing
+# Steps must be safe to run again (IF NOT EXISTS, backfills that skip done
+# rows): a migration interrupted halfway is rerun from its first step.
+import time
+from time import perf_counter
+
+import psycopg
+from psycopg.rows import dict_row
+from psycopg.sql import SQL, Identifier
+
+from .db import DB_URL
+from .operations import (
+    add_event_winners_selection_columns,
+    add_events_revision_columns,
+    add_events_selection_strategy_column,
+    add_events_starts_at_column,
+    backfill_author_stats,
+    backfill_events_starts_at,
+    backfill_radarr_add_jobs,
+    create_author_stats_table,
+    create_bump_data_version_function,
+    create_bump_data_version_once_function,
+    create_count_author_wins_function,
+    create_count_rsvp_authors_function,
+    create_data_version_table,
+    create_data_version_unqueued_function,
+    create_enqueue_radarr_add_function,
+    create_event_winners_author_index,
+    create_event_winners_author_stats_delete_trigger,
+    create_event_winners_author_stats_insert_trigger,
+    create_event_winners_author_stats_update_trigger,
+    create_event_winners_data_version_commit_trigger,
+    create_event_winners_data_version_trigger,
+    create_event_winners_enqueue_trigger,
+    create_event_winners_notify_trigger,
+    create_event_winners_rsvp_id_index,
+    create_event_winners_table,
+    create_event_winners_touch_trigger,
+    create_events_author_index,
+    create_events_author_stats_trigger,
+    create_events_data_version_commit_trigger,
+    create_events_data_version_trigger,
+    create_events_genre_index,
+    create_events_notify_trigger,
+    create_events_starts_at_index,
+    create_events_table,
+    create_events_touch_trigger,
+    create_movies_table,
+    create_movies_title_key_index,
+    create_movies_updated_at_index,
+    create_notify_changes_function,
+    create_outbox_event_id_index,
+    create_outbox_pending_index,
+    create_outbox_table,
+    create_recount_author_wins_function,
+    create_recount_event_winner_author_function,
+    create_rsvps_author_stats_delete_trigger,
+    create_rsvps_author_stats_insert_trigger,
+    create_rsvps_author_stats_update_trigger,
+    create_rsvps_data_version_commit_trigger,
+    create_rsvps_data_version_trigger,
+    create_rsvps_event_id_index,
+    create_rsvps_notify_trigger,
+    create_rsvps_table,
+    create_rsvps_touch_trigger,
+    create_schema_migrations_table,
+    create_touch_event_function,
+    create_touch_parent_event_function,
+    drop_bump_data_version_function,
+    drop_data_version_triggers,
+    drop_event_winners_dispatch_columns,
+    drop_event_winners_undispatched_index,
+    drop_index_concurrently,
+    get_applied_migrations,
+    get_index_validity,
+    record_migration,
+    seed_data_version,
+    set_migration_lock_timeout,
+    try_lock_migrations,
+)
+
+# How long a migration statement may wait for a table lock before its
+# transaction is rolled back and retried
+MIGRATION_LOCK_TIMEOUT = "5s"
+MIGRATION_LOCK_RETRIES = 10
+# Rows per backfill transaction, and the pause between them so replicas and
+# autovacuum keep up
+BACKFILL_BATCH_SIZE = 1000
+BACKFILL_PAUSE_SECONDS = 0.05
+# How often a run waiting for another one to finish tries the lock again
+MIGRATION_POLL_SECONDS = 0.5
+
+
+def with_lock_retries(conn: psycopg.Connection, run):
+    # Runs run(cur) in a transaction whose lock waits time out, and retries
+    # it with backoff when one does
+    for attempt in range(1, MIGRATION_LOCK_RETRIES + 1):
+        try:
+            with conn.transaction():
+                with conn.cursor() as cur:
+                    _ = cur.execute(set_migration_lock_timeout, (MIGRATION_LOCK_TIMEOUT,))
+                    return run(cur)
+        except psycopg.errors.LockNotAvailable:
+            if attempt == MIGRATION_LOCK_RETRIES:
+                raise
+            print(f"[migrations] Lock wait timed out, retrying ({attempt}/{MIGRATION_LOCK_RETRIES})")
+            time.sleep(min(2**attempt, 30))
+
+
+class Transactional:
+    def __init__(self, *queries: str):
+        self.queries = queries
+
+    def run(self, conn: psycopg.Connection):
+        def run(cur):
+            for query in self.queries:
+                _ = cur.execute(query)
+
+        with_lock_retries(conn, run)
+
+
+class ConcurrentIndex:
+    def __init__(self, name: str, query: str):
+        self.name = name
+        self.query = query
+
+    def run(self, conn: psycopg.Connection):
+        row = conn.execute(get_index_validity, (self.name,)).fetchone()
+        if row and not row["valid"]:
+            print(f"[migrations] Dropping invalid index {self.name} left by an interrupted build")
+            _ = conn.execute(SQL(drop_index_concurrently).format(Identifier(self.name)))
+        _ = conn.execute(self.query)
+
+
+class Backfill:
+    def __init__(self, query: str, batch_size: int = BACKFILL_BATCH_SIZE):
+        self.query = query
+        self.batch_size = batch_size
+
+    def run(self, conn: psycopg.Connection):
+        total = 0
+        while True:
+            updated = with_lock_retries(
+                conn,
+                lambda cur: cur.execute(self.query, {"batch_size": self.batch_size}).rowcount,
+            )
+            total += updated
+            if updated == 0:
+                break
+            time.sleep(BACKFILL_PAUSE_SECONDS)
+        if total:
+            print(f"[migrations] Backfilled {total} rows")
+
+
+class Migration:
+    def __init__(self, version: int, name: str, steps: list):
+        self.version = version
+        self.name = name
+        self.steps = steps
+
+
+MIGRATIONS = [
+    # Everything init_db created before migrations were versioned. Each
+    # statement is idempotent, so databases from any earlier version end up
+    # the same. One transaction: author_stats is backfilled together with
+    # the triggers that maintain it. The indexes came after the first
+    # release, so an upgraded database builds them without blocking writes.
+    Migration(
+        1,
+        "baseline",
+        [
+            Transactional(
+                create_events_table,
+                add_events_starts_at_column,
+                add_events_selection_strategy_column,
+                add_events_revision_columns,
+                create_rsvps_table,
+                create_event_winners_table,
+                add_event_winners_selection_columns,
+                create_outbox_table,
+                create_movies_table,
+                backfill_radarr_add_jobs,
+                drop_event_winners_dispatch_columns,
+                drop_event_winners_undispatched_index,
+                create_enqueue_radarr_add_function,
+                create_event_winners_enqueue_trigger,
+                create_notify_changes_function,
+                create_events_notify_trigger,
+                create_rsvps_notify_trigger,
+                create_event_winners_notify_trigger,
+                create_data_version_table,
+                seed_data_version,
+                create_touch_event_function,
+                create_events_touch_trigger,
+                create_touch_parent_event_function,
+                create_rsvps_touch_trigger,
+                create_event_winners_touch_trigger,
+                create_bump_data_version_function,
+                create_events_data_version_trigger,
+                create_rsvps_data_version_trigger,
+                create_event_winners_data_version_trigger,
+                create_author_stats_table,
+                backfill_author_stats,
+                create_recount_author_wins_function,
+                create_count_rsvp_authors_function,
+                create_rsvps_author_stats_insert_trigger,
+                create_rsvps_author_stats_update_trigger,
+                create_rsvps_author_stats_delete_trigger,
+                create_count_author_wins_function,
+                create_event_winners_author_stats_insert_trigger,
+                create_event_winners_author_stats_update_trigger,
+                create_event_winners_author_stats_delete_trigger,
+                create_recount_event_winner_author_function,
+                create_events_author_stats_trigger,
+            ),
+            ConcurrentIndex("events_starts_at_idx", create_events_starts_at_index),
+            ConcurrentIndex("events_genre_id_idx", create_events_genre_index),
+            ConcurrentIndex("events_author_id_idx", create_events_author_index),
+            ConcurrentIndex("event_winners_author_idx", create_event_winners_author_index),
+            ConcurrentIndex("outbox_pending_idx", create_outbox_pending_index),
+            ConcurrentIndex("movies_title_key_idx", create_movies_title_key_index),
+            ConcurrentIndex("movies_updated_at_idx", create_movies_updated_at_index),
+        ],
+    ),
+    # Used to be one UPDATE of every old event inside init_db's transaction
+    Migration(2, "backfill_events_starts_at", [Backfill(backfill_events_starts_at)]),
+    Migration(
+        3,
+        "rsvps_event_id_index",
+        [ConcurrentIndex("rsvps_event_id_id_idx", create_rsvps_event_id_index)],
+    ),
+    Migration(
+        4,
+        "cascade_delete_indexes",
+        [
+            ConcurrentIndex("event_winners_rsvp_id_idx", create_event_winners_rsvp_id_index),
+            ConcurrentIndex("outbox_event_id_idx", create_outbox_event_id_index),
+        ],
+    ),
+    # data_version went from once per statement to once per transaction, so
+    # a bulk import doesn't update and hold it for every chunk
+    Migration(
+        5,
+        "data_version_at_commit",
+        [
+            Transactional(
+                create_data_version_unqueued_function,
+                create_bump_data_version_once_function,
+                drop_data_version_triggers,
+                create_events_data_version_commit_trigger,
+                create_rsvps_data_version_commit_trigger,
+                create_event_winners_data_version_commit_trigger,
+                drop_bump_data_version_function,
+            )
+        ],
+    ),
+    # RSVP author changes and deletes lock author_stats rows in author order
+    Migration(
+        6,
+        "author_stats_lock_order",
+        [Transactional(create_count_rsvp_authors_function)],
+    ),
+]
+
+
+def connect() -> psycopg.Connection:
+    # Autocommit: CREATE INDEX CONCURRENTLY can't run in a transaction, the
+    # other steps open their own
+    return psycopg.connect(DB_URL, autocommit=True, row_factory=dict_row)
+
+
+def lock_migrations(conn: psycopg.Connection):
+    # Polls instead of blocking in pg_advisory_lock: a statement waiting there
+    # holds a snapshot, and CREATE INDEX CONCURRENTLY in the run that has the
+    # lock waits for every older snapshot to go away, a deadlock
+    waited = False
+    while not conn.execute(try_lock_migrations).fetchone()["locked"]:
+        if not waited:
+            print("[migrations] Waiting for another run to finish")
+            waited = True
+        time.sleep(MIGRATION_POLL_SECONDS)
+
+
+def applied_migrations(conn: psycopg.Connection) -> dict[int, dict]:
+    _ = conn.execute(create_schema_migrations_table)
+    return {row["version"]: row for row in conn.execute(get_applied_migrations).fetchall()}
+
+
+def migrate(target: int | None = None) -> list[int]:
+    # Applies the pending migrations up to target (all by default), returns
+    # their versions
+    applied = []
+    with connect() as conn:
+        lock_migrations(conn)
+        done = applied_migrations(conn)
+        for migration in MIGRATIONS:
+            if migration.version in done or (target is not None and migration.version > target):
+                continue
+            print(f"[migrations] Applying {migration.version} {migration.name}")
+            start = perf_counter()
+            for step in migration.steps:
+                step.run(conn)
+            duration_ms = round((perf_counter() - start) * 1000)
+            _ = conn.execute(
+                record_migration,
+                {"version": migration.version, "name": migration.name, "duration_ms": duration_ms},
+            )
+            print(f"[migrations] Applied {migration.version} {migration.name} in {duration_ms} ms")
+            applied.append(migration.version)
+    return applied
+
+
+def migration_status() -> list[dict]:
+    with connect() as conn:
+        done = applied_migrations(conn)
+    return [
+        {
+            "version": migration.version,
+            "name": migration.name,
+            "applied_at": done[migration.version]["applied_at"] if migration.version in done else None,
+        }
+        for migration in MIGRATIONS
+    ]
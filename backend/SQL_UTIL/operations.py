@@ -7,10 +7,75 @@ CREATE TABLE IF NOT EXISTS events (
   date VARCHAR(255) NOT NULL,
   time VARCHAR(50) NOT NULL,
   location VARCHAR(255) NOT NULL,
-  author VARCHAR(255) NOT NULL
+  author VARCHAR(255) NOT NULL,
+  starts_at TIMESTAMPTZ,
+  selection_strategy TEXT NOT NULL DEFAULT 'weighted',
+  revision BIGINT NOT NULL DEFAULT 1,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+)
+"""
+
+# Migration for databases created before events had a typed start time
+add_events_starts_at_column = """
+ALTER TABLE events ADD COLUMN IF NOT EXISTS starts_at TIMESTAMPTZ
+"""
+
+# Online backfill, one batch per transaction (see migrations.py Backfill)
+backfill_events_starts_at = """
+UPDATE events
+SET starts_at = TO_TIMESTAMP(date || ' ' || time, 'MM/DD/YYYY HH24:MI')
+WHERE id IN (
+  SELECT id FROM events
+  WHERE starts_at IS NULL
+  AND date ~ '^[0-9]{1,2}/[0-9]{1,2}/[0-9]{4}$'
+  AND time ~ '^[0-9]{1,2}:[0-9]{2}$'
+  LIMIT %(batch_size)s
+  FOR UPDATE SKIP LOCKED
+)
+"""
+
+create_events_starts_at_index = """
+CREATE INDEX CONCURRENTLY IF NOT EXISTS events_starts_at_idx ON events (starts_at)
+"""
+
+# Filtered event listings walk these backwards from the cursor
+create_events_genre_index = """
+CREATE INDEX CONCURRENTLY IF NOT EXISTS events_genre_id_idx ON events (genre, id)
+"""
+
+create_events_author_index = """
+CREATE INDEX CONCURRENTLY IF NOT EXISTS events_author_id_idx ON events (author, id)
+"""
+
+# Migration for databases created before events chose how their winner is
+# picked, see backend/selection.py
+add_events_selection_strategy_column = """
+ALTER TABLE events ADD COLUMN IF NOT EXISTS selection_strategy TEXT NOT NULL DEFAULT 'weighted'
+"""
+
+# Migration for databases created before events carried a revision. Bumped
+# by triggers whenever the event, its RSVPs or its winner change, it backs
+# the ETags of the per-event endpoints.
+add_events_revision_columns = """
+ALTER TABLE events
+ADD COLUMN IF NOT EXISTS revision BIGINT NOT NULL DEFAULT 1,
+ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+"""
+
+# Single row counter bumped by every transaction that changes events, RSVPs
+# or winners, it backs the ETags of the event listings
+create_data_version_table = """
+CREATE TABLE IF NOT EXISTS data_version (
+  id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+  version BIGINT NOT NULL DEFAULT 1,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 )
 """
 
+seed_data_version = """
+INSERT INTO data_version DEFAULT VALUES ON CONFLICT DO NOTHING
+"""
+
 create_rsvps_table = """
 CREATE TABLE IF NOT EXISTS rsvps (
   id BIGSERIAL PRIMARY KEY,
@@ -33,14 +98,102 @@ CREATE TABLE IF NOT EXISTS event_winners (
   author VARCHAR(255) NOT NULL,
   radarr_sent_at TIMESTAMPTZ,
   radarr_status TEXT NOT NULL DEFAULT 'unsent',
+  strategy TEXT,
+  seed BIGINT,
   UNIQUE (event_id), 
   PRIMARY KEY (event_id, movie)
 )
 """
 
+# Migration for databases created before picks were recorded with the
+# strategy and seed that replay them
+add_event_winners_selection_columns = """
+ALTER TABLE event_winners
+ADD COLUMN IF NOT EXISTS strategy TEXT,
+ADD COLUMN IF NOT EXISTS seed BIGINT
+"""
+
+# Side effects of database changes (e.g. adding a winner to Radarr) are
+# written here in the same transaction as the change, and carried out later
+# by the dispatch stage. One job per (kind, event). Pending jobs become
+# available again after a failure (with backoff) or when the lease of a
+# dispatcher that died expires.
+create_outbox_table = """
+CREATE TABLE IF NOT EXISTS outbox (
+  id BIGSERIAL PRIMARY KEY,
+  kind TEXT NOT NULL,
+  event_id BIGINT NOT NULL,
+  FOREIGN KEY (event_id) REFERENCES events(id) ON DELETE CASCADE,
+  payload JSONB NOT NULL,
+  status TEXT NOT NULL DEFAULT 'pending',
+  attempts INT NOT NULL DEFAULT 0,
+  available_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  claimed_until TIMESTAMPTZ,
+  last_error TEXT,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  processed_at TIMESTAMPTZ,
+  UNIQUE (kind, event_id)
+)
+"""
+
+# Done jobs are the vast majority of the table, keep the pending lookup small
+create_outbox_pending_index = """
+CREATE INDEX CONCURRENTLY IF NOT EXISTS outbox_pending_idx
+ON outbox (available_at)
+WHERE status = 'pending'
+"""
+
+radarr_add_job = "radarr_add"
+
+# Every new winner gets its Radarr job in the same transaction, whoever inserts it
+create_enqueue_radarr_add_function = """
+CREATE OR REPLACE FUNCTION enqueue_movie_picker_radarr_add() RETURNS trigger AS $$
+BEGIN
+  INSERT INTO outbox (kind, event_id, payload)
+  VALUES (
+    'radarr_add',
+    NEW.event_id,
+    JSONB_BUILD_OBJECT('rsvp_id', NEW.rsvp_id, 'movie', NEW.movie, 'author', NEW.author)
+  )
+  ON CONFLICT (kind, event_id) DO NOTHING;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+create_event_winners_enqueue_trigger = """
+CREATE OR REPLACE TRIGGER event_winners_enqueue_radarr_add
+AFTER INSERT ON event_winners
+FOR EACH ROW EXECUTE FUNCTION enqueue_movie_picker_radarr_add()
+"""
+
+# Migration for databases that tracked Radarr sends on event_winners: winners
+# that weren't sent yet get a job, then the old claim columns go
+backfill_radarr_add_jobs = """
+INSERT INTO outbox (kind, event_id, payload)
+SELECT 'radarr_add', event_id,
+       JSONB_BUILD_OBJECT('rsvp_id', rsvp_id, 'movie', movie, 'author', author)
+FROM event_winners
+WHERE radarr_status <> 'sent'
+ON CONFLICT (kind, event_id) DO NOTHING
+"""
+
+drop_event_winners_dispatch_columns = """
+ALTER TABLE event_winners
+DROP COLUMN IF EXISTS radarr_attempts,
+DROP COLUMN IF EXISTS radarr_claimed_until
+"""
+
+drop_event_winners_undispatched_index = """
+DROP INDEX IF EXISTS event_winners_undispatched_idx
+"""
+
 insert_event = """
-INSERT INTO events (title, genre, date, time, location, author)
-VALUES (%s, %s, %s, %s, %s, %s) RETURNING id
+INSERT INTO events (title, genre, date, time, location, author, selection_strategy, starts_at)
+VALUES (
+  %s, %s, %s, %s, %s, %s, %s,
+  TO_TIMESTAMP(%s || ' ' || %s, 'MM/DD/YYYY HH24:MI')
+) RETURNING id
 """
 
 insert_rsvp = """
@@ -50,11 +203,98 @@ ON CONFLICT (event_id, author) DO NOTHING
 RETURNING id
 """
 
+# Bulk inserts, one statement per chunk with one array per column. Rows are
+# inserted in the order they were sent (ORDER BY n).
+insert_events_bulk = """
+INSERT INTO events (title, genre, date, time, location, author, selection_strategy, starts_at)
+SELECT title, genre, date, time, location, author, selection_strategy,
+       TO_TIMESTAMP(date || ' ' || time, 'MM/DD/YYYY HH24:MI')
+FROM UNNEST(
+  %s::TEXT[], %s::TEXT[], %s::TEXT[], %s::TEXT[], %s::TEXT[], %s::TEXT[], %s::TEXT[]
+) WITH ORDINALITY AS r(title, genre, date, time, location, author, selection_strategy, n)
+ORDER BY n
+RETURNING id
+"""
+
+# Returns the conflict key of each inserted row, skipped rows return nothing
+insert_rsvps_bulk = """
+INSERT INTO rsvps (event_id, author, movie)
+SELECT event_id, author, movie
+FROM UNNEST(%s::BIGINT[], %s::TEXT[], %s::TEXT[]) WITH ORDINALITY AS r(event_id, author, movie, n)
+ORDER BY n
+ON CONFLICT (event_id, author) DO NOTHING
+RETURNING id, event_id, author
+"""
+
+# SET clause fragment for patch_event, params are the new date and time (or NULL)
+update_event_starts_at = """
+starts_at = TO_TIMESTAMP(
+  COALESCE(%s, date) || ' ' || COALESCE(%s, time), 'MM/DD/YYYY HH24:MI'
+)
+"""
+
+# Keyset pagination, newest first. {filters} is composed by the API from the
+# cursor and filter params (always at least TRUE), the last param is the limit
 get_events_query = """
-SELECT id, title, genre, date, time, location, author 
-FROM events 
+SELECT id, title, genre, date, time, location, author, selection_strategy
+FROM events
+WHERE {filters}
 ORDER BY id DESC
-LIMIT 15
+LIMIT %s
+"""
+
+# One page of events (same {filters}/limit as get_events_query) with their
+# RSVPs, RSVP totals and winner, in a single round-trip
+get_event_details_query = """
+SELECT e.id, e.title, e.genre, e.date, e.time, e.location, e.author, e.selection_strategy,
+       COALESCE(r.rsvps, '[]'::JSON) AS rsvps,
+       r.rsvp_count,
+       COALESCE(r.total_weight, 0) AS total_weight,
+       CASE WHEN w.event_id IS NULL THEN NULL
+            ELSE JSON_BUILD_OBJECT('rsvp_id', w.rsvp_id, 'movie', w.movie, 'author', w.author)
+       END AS winner
+FROM (
+  SELECT id, title, genre, date, time, location, author, selection_strategy
+  FROM events
+  WHERE {filters}
+  ORDER BY id DESC
+  LIMIT %s
+) e
+CROSS JOIN LATERAL (
+  SELECT JSON_AGG(
+           JSON_BUILD_OBJECT(
+             'event_id', event_id, 'rsvp_id', id, 'author', author,
+             'movie', movie, 'weight', weight
+           ) ORDER BY id DESC
+         ) AS rsvps,
+         COUNT(*) AS rsvp_count,
+         SUM(weight) AS total_weight
+  FROM rsvps
+  WHERE event_id = e.id
+) r
+LEFT JOIN event_winners w ON w.event_id = e.id
+ORDER BY e.id DESC
+"""
+
+# Locks the events in id order before a bulk RSVP insert, so concurrent
+# batches and single writes can't deadlock on events (the inserts' triggers
+# touch them), and the events can't be deleted meanwhile
+lock_existing_event_ids = """
+SELECT id FROM events WHERE id = ANY(%s)
+ORDER BY id
+FOR NO KEY UPDATE
+"""
+
+# Then its authors' author_stats rows, created if missing, in the order the
+# author_stats triggers lock them. A single statement locks its authors in
+# that order, a batch of several statements has to take all of them before
+# the first one, or it could lock them in a different order than the
+# watcher's winner insert or another batch.
+lock_author_stats = """
+INSERT INTO author_stats AS s (author)
+SELECT DISTINCT author FROM UNNEST(%s::TEXT[]) AS a(author)
+ORDER BY author
+ON CONFLICT (author) DO UPDATE SET updated_at = s.updated_at
 """
 
 get_rsvps_for_event = """
@@ -64,6 +304,15 @@ WHERE event_id = %s
 ORDER BY id DESC
 """
 
+# {} is the SET clause composed by the API from the provided fields
+patch_event_query = """
+UPDATE events SET {} WHERE id = %s RETURNING id
+"""
+
+patch_rsvp_query = """
+UPDATE rsvps SET {} WHERE id = %s RETURNING id
+"""
+
 delete_event_query = """
 DELETE FROM events
 WHERE id = %s
@@ -74,19 +323,802 @@ DELETE FROM rsvps
 WHERE id = %s
 """
 
-get_events_within_the_half_hour = """
-SELECT *
-FROM events
-WHERE TO_TIMESTAMP(date || ' ' || time, 'MM/DD/YYYY HH24:MI')
-BETWEEN NOW() AND (NOW() + INTERVAL '1 hour')
-AND id NOT IN (SELECT event_id FROM event_winners);
+# Due events with RSVPs (of positive weight) but no winner yet, locked for the transaction that
+# picks their winners. Other watchers skip the locked rows instead of
+# waiting, so any number of them can run at once. The watcher runs it inside
+# claim_due_event_candidates.
+claim_due_events = """
+SELECT e.id
+FROM events e
+WHERE e.starts_at BETWEEN NOW() AND (NOW() + INTERVAL '1 hour')
+AND NOT EXISTS (SELECT 1 FROM event_winners w WHERE w.event_id = e.id)
+AND EXISTS (SELECT 1 FROM rsvps r WHERE r.event_id = e.id AND COALESCE(r.weight, 1) > 0)
+ORDER BY e.starts_at
+LIMIT %(batch_size)s
+FOR NO KEY UPDATE OF e SKIP LOCKED
+"""
+
+# Everything backend/selection.py needs to pick the winners of many events
+# in one pass. days_since_win is measured from the author's last win before
+# the event (not before now), so replaying an old pick sees the same history.
+# That is author_stats.last_win_at unless the author has won since the event
+# started (a replay), then event_winners is searched. Infinity for authors
+# who never won and for other strategies.
+selection_candidates = """
+SELECT r.event_id, r.id AS rsvp_id, r.author, r.movie,
+       COALESCE(r.weight, 1) AS weight,
+       e.selection_strategy AS strategy,
+       COALESCE(CASE WHEN e.selection_strategy = 'fair' THEN
+         EXTRACT(EPOCH FROM e.starts_at - CASE
+           WHEN s.last_win_at IS NULL OR s.last_win_at < e.starts_at THEN s.last_win_at
+           ELSE (
+             SELECT MAX(we.starts_at)
+             FROM event_winners w
+             JOIN events we ON we.id = w.event_id
+             WHERE w.author = r.author
+             AND we.starts_at < e.starts_at
+           )
+         END)::FLOAT8 / 86400
+       END, 'Infinity') AS days_since_win
+FROM rsvps r
+JOIN events e ON e.id = r.event_id
+LEFT JOIN author_stats s ON s.author = r.author
 """
 
-insert_event_winner = """
-INSERT INTO event_winners (event_id, rsvp_id, movie, author)
-VALUES (%s, %s, %s, %s);
+# The candidates as one row of column arrays, NULL when there are none. All
+# aggregates of a row see the candidates in the same order, and
+# backend/selection.py builds its numpy columns straight from the arrays
+# rather than from a row per RSVP
+selection_candidate_columns = """
+SELECT array_agg(event_id) AS event_ids, array_agg(rsvp_id) AS rsvp_ids,
+       array_agg(author) AS authors, array_agg(movie) AS movies,
+       array_agg(weight) AS weights, array_agg(strategy) AS strategies,
+       array_agg(days_since_win) AS days_since_win
+FROM (
 """
+get_selection_candidates = (
+    selection_candidate_columns
+    + selection_candidates
+    + "WHERE r.event_id = ANY(%(event_ids)s)\n) AS c\n"
+)
+
+# claim_due_events and get_selection_candidates in one statement, for the
+# watcher: claims a batch of due events (locked until the transaction ends)
+# and returns the candidate columns of all of them, one round-trip for both
+claim_due_event_candidates = (
+    "WITH claimed AS MATERIALIZED ("
+    + claim_due_events
+    + ")\n"
+    + selection_candidate_columns
+    + selection_candidates
+    + "WHERE r.event_id IN (SELECT id FROM claimed)\n) AS c\n"
+)
 
+# Replays and author_stats recounts look up past wins by author
+create_event_winners_author_index = """
+CREATE INDEX CONCURRENTLY IF NOT EXISTS event_winners_author_idx ON event_winners (author)
+"""
+
+# One statement for a whole batch of picks, params are one array per column.
+# A watcher that read an event before another one committed its pick can
+# still get here, the unique event_id makes that row a no-op.
+insert_event_winners = """
+INSERT INTO event_winners (event_id, rsvp_id, movie, author, strategy, seed)
+SELECT * FROM UNNEST(
+  %s::BIGINT[], %s::BIGINT[], %s::TEXT[], %s::TEXT[], %s::TEXT[], %s::BIGINT[]
+)
+ON CONFLICT (event_id) DO NOTHING
+RETURNING event_id, movie, author
+"""
+
+get_event_winner_audit = """
+SELECT event_id, rsvp_id, movie, author, strategy, seed
+FROM event_winners
+WHERE event_id = %s
+"""
+
+# The event's revision comes along so the winner endpoint can answer
+# conditional requests in the same round-trip, rsvp_id is NULL until a pick
 get_event_winner_query = """
-SELECT * FROM event_winners WHERE event_id = %s
+SELECT e.revision, e.updated_at, w.rsvp_id
+FROM events e
+LEFT JOIN event_winners w ON w.event_id = e.id
+WHERE e.id = %s
+"""
+
+# Channel the watcher (and anything else interested) LISTENs on for changes
+# to events and RSVPs. Winner picks go to their own channel so the watcher
+# isn't woken by its own inserts.
+changes_channel = "movie_picker_changes"
+winners_channel = "movie_picker_winners"
+
+create_notify_changes_function = """
+CREATE OR REPLACE FUNCTION notify_movie_picker_changes() RETURNS trigger AS $$
+DECLARE
+  changed JSONB;
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    changed := to_jsonb(OLD);
+  ELSE
+    changed := to_jsonb(NEW);
+  END IF;
+  -- The channel is the trigger's first argument
+  PERFORM pg_notify(
+    TG_ARGV[0],
+    json_build_object(
+      'table', TG_TABLE_NAME,
+      'op', TG_OP,
+      'event_id', COALESCE(changed->>'event_id', changed->>'id')::BIGINT,
+      'id', (changed->>'id')::BIGINT,
+      'rsvp_id', (changed->>'rsvp_id')::BIGINT
+    )::TEXT
+  );
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+create_events_notify_trigger = """
+CREATE OR REPLACE TRIGGER events_notify_changes
+AFTER INSERT OR DELETE OR UPDATE OF title, genre, date, time, location, author, selection_strategy, starts_at
+ON events
+FOR EACH ROW EXECUTE FUNCTION notify_movie_picker_changes('movie_picker_changes')
+"""
+
+create_rsvps_notify_trigger = """
+CREATE OR REPLACE TRIGGER rsvps_notify_changes
+AFTER INSERT OR UPDATE OR DELETE ON rsvps
+FOR EACH ROW EXECUTE FUNCTION notify_movie_picker_changes('movie_picker_changes')
+"""
+
+# Only changes to the pick itself, Radarr status updates aren't interesting
+create_event_winners_notify_trigger = """
+CREATE OR REPLACE TRIGGER event_winners_notify_changes
+AFTER INSERT OR DELETE OR UPDATE OF rsvp_id, movie, author ON event_winners
+FOR EACH ROW EXECUTE FUNCTION notify_movie_picker_changes('movie_picker_winners')
+"""
+
+# Columns the API can change on an event. Revision bumps from RSVP and winner
+# changes only touch revision/updated_at, so they don't re-fire the events
+# triggers below.
+create_touch_event_function = """
+CREATE OR REPLACE FUNCTION touch_movie_picker_event() RETURNS trigger AS $$
+BEGIN
+  NEW.revision := OLD.revision + 1;
+  NEW.updated_at := NOW();
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+create_events_touch_trigger = """
+CREATE OR REPLACE TRIGGER events_touch
+BEFORE UPDATE OF title, genre, date, time, location, author, selection_strategy, starts_at ON events
+FOR EACH ROW EXECUTE FUNCTION touch_movie_picker_event()
+"""
+
+create_touch_parent_event_function = """
+CREATE OR REPLACE FUNCTION touch_movie_picker_parent_event() RETURNS trigger AS $$
+DECLARE
+  changed_event_id BIGINT;
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    changed_event_id := OLD.event_id;
+  ELSE
+    changed_event_id := NEW.event_id;
+  END IF;
+  UPDATE events
+  SET revision = revision + 1, updated_at = NOW()
+  WHERE id = changed_event_id;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+create_rsvps_touch_trigger = """
+CREATE OR REPLACE TRIGGER rsvps_touch_event
+AFTER INSERT OR UPDATE OR DELETE ON rsvps
+FOR EACH ROW EXECUTE FUNCTION touch_movie_picker_parent_event()
+"""
+
+create_event_winners_touch_trigger = """
+CREATE OR REPLACE TRIGGER event_winners_touch_event
+AFTER INSERT OR DELETE OR UPDATE OF rsvp_id, movie, author ON event_winners
+FOR EACH ROW EXECUTE FUNCTION touch_movie_picker_parent_event()
+"""
+
+# Replaced by bump_movie_picker_data_version_once (migration 5), still
+# created by the baseline migration
+create_bump_data_version_function = """
+CREATE OR REPLACE FUNCTION bump_movie_picker_data_version() RETURNS trigger AS $$
+BEGIN
+  UPDATE data_version SET version = version + 1, updated_at = NOW();
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+create_events_data_version_trigger = """
+CREATE OR REPLACE TRIGGER events_bump_data_version
+AFTER INSERT OR DELETE OR UPDATE OF title, genre, date, time, location, author, selection_strategy, starts_at
+ON events
+FOR EACH STATEMENT EXECUTE FUNCTION bump_movie_picker_data_version()
+"""
+
+create_rsvps_data_version_trigger = """
+CREATE OR REPLACE TRIGGER rsvps_bump_data_version
+AFTER INSERT OR UPDATE OR DELETE ON rsvps
+FOR EACH STATEMENT EXECUTE FUNCTION bump_movie_picker_data_version()
+"""
+
+create_event_winners_data_version_trigger = """
+CREATE OR REPLACE TRIGGER event_winners_bump_data_version
+AFTER INSERT OR DELETE OR UPDATE OF rsvp_id, movie, author ON event_winners
+FOR EACH STATEMENT EXECUTE FUNCTION bump_movie_picker_data_version()
+"""
+
+# Bumps data_version once per transaction, as it commits. The triggers below
+# are deferred constraint triggers, so the row is only locked for the commit
+# itself, not for the whole of a bulk import or a watcher batch, and it is the
+# last lock any writer takes. Their WHEN only queues the first change of each
+# transaction: a flag local to the transaction (rolled back with a savepoint
+# that made the change) instead of one deferred event per row.
+create_data_version_unqueued_function = """
+CREATE OR REPLACE FUNCTION movie_picker_data_version_unqueued() RETURNS boolean AS $$
+BEGIN
+  IF current_setting('movie_picker.data_version_queued', true) = 'on' THEN
+    RETURN false;
+  END IF;
+  PERFORM set_config('movie_picker.data_version_queued', 'on', true);
+  RETURN true;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+create_bump_data_version_once_function = """
+CREATE OR REPLACE FUNCTION bump_movie_picker_data_version_once() RETURNS trigger AS $$
+BEGIN
+  UPDATE data_version SET version = version + 1, updated_at = NOW();
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+# Constraint triggers can't be created OR REPLACE, and take the names of the
+# statement triggers they replace
+drop_data_version_triggers = """
+DROP TRIGGER IF EXISTS events_bump_data_version ON events;
+DROP TRIGGER IF EXISTS rsvps_bump_data_version ON rsvps;
+DROP TRIGGER IF EXISTS event_winners_bump_data_version ON event_winners
+"""
+
+create_events_data_version_commit_trigger = """
+CREATE CONSTRAINT TRIGGER events_bump_data_version
+AFTER INSERT OR DELETE OR UPDATE OF title, genre, date, time, location, author, selection_strategy, starts_at
+ON events
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW
+WHEN (movie_picker_data_version_unqueued())
+EXECUTE FUNCTION bump_movie_picker_data_version_once()
+"""
+
+create_rsvps_data_version_commit_trigger = """
+CREATE CONSTRAINT TRIGGER rsvps_bump_data_version
+AFTER INSERT OR UPDATE OR DELETE ON rsvps
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW
+WHEN (movie_picker_data_version_unqueued())
+EXECUTE FUNCTION bump_movie_picker_data_version_once()
+"""
+
+create_event_winners_data_version_commit_trigger = """
+CREATE CONSTRAINT TRIGGER event_winners_bump_data_version
+AFTER INSERT OR DELETE OR UPDATE OF rsvp_id, movie, author ON event_winners
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW
+WHEN (movie_picker_data_version_unqueued())
+EXECUTE FUNCTION bump_movie_picker_data_version_once()
+"""
+
+drop_bump_data_version_function = """
+DROP FUNCTION IF EXISTS bump_movie_picker_data_version()
+"""
+
+# Per-author RSVP and win history, kept up to date by the triggers below so
+# fairness and the authors API read one row instead of aggregating
+# rsvps/event_winners. last_win_at is the start of the author's latest
+# winning event.
+create_author_stats_table = """
+CREATE TABLE IF NOT EXISTS author_stats (
+  author VARCHAR(255) PRIMARY KEY,
+  rsvp_count BIGINT NOT NULL DEFAULT 0,
+  win_count BIGINT NOT NULL DEFAULT 0,
+  last_win_at TIMESTAMPTZ,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+)
+"""
+
+# Fills author_stats from the existing history, only while it is still empty
+# (the first init_db after the table was added). Runs in the baseline
+# migration's transaction with the trigger creation, so no change falls in
+# between.
+backfill_author_stats = """
+INSERT INTO author_stats (author, rsvp_count, win_count, last_win_at)
+SELECT a.author, COALESCE(r.rsvp_count, 0), COALESCE(w.win_count, 0), w.last_win_at
+FROM (SELECT author FROM rsvps UNION SELECT author FROM event_winners) a
+LEFT JOIN (
+  SELECT author, COUNT(*) AS rsvp_count FROM rsvps GROUP BY author
+) r ON r.author = a.author
+LEFT JOIN (
+  SELECT w.author, COUNT(*) AS win_count, MAX(e.starts_at) AS last_win_at
+  FROM event_winners w
+  JOIN events e ON e.id = w.event_id
+  GROUP BY w.author
+) w ON w.author = a.author
+WHERE NOT EXISTS (SELECT 1 FROM author_stats)
+"""
+
+# Deleted or reassigned wins can't be applied as a decrement (last_win_at may
+# move back), those authors are recounted from event_winners instead
+create_recount_author_wins_function = """
+CREATE OR REPLACE FUNCTION recount_movie_picker_author_wins(authors TEXT[]) RETURNS void AS $$
+  INSERT INTO author_stats AS s (author, win_count, last_win_at)
+  SELECT a.author, COUNT(w.event_id), MAX(e.starts_at)
+  FROM UNNEST(authors) AS a(author)
+  LEFT JOIN event_winners w ON w.author = a.author
+  LEFT JOIN events e ON e.id = w.event_id
+  GROUP BY a.author
+  ORDER BY a.author
+  ON CONFLICT (author) DO UPDATE
+  SET win_count = EXCLUDED.win_count, last_win_at = EXCLUDED.last_win_at, updated_at = NOW()
+$$ LANGUAGE sql
+"""
+
+# Statement level with transition tables: a bulk RSVP insert is one upsert
+# per author, not one per row. Every branch locks its authors' rows in author
+# order, so concurrent statements (two RSVPs swapping authors, two events
+# deleted with the same authors) don't deadlock on each other's rows.
+create_count_rsvp_authors_function = """
+CREATE OR REPLACE FUNCTION count_movie_picker_rsvp_authors() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    INSERT INTO author_stats AS s (author, rsvp_count)
+    SELECT author, COUNT(*) FROM new_rows GROUP BY author ORDER BY author
+    ON CONFLICT (author) DO UPDATE
+    SET rsvp_count = s.rsvp_count + EXCLUDED.rsvp_count, updated_at = NOW();
+  ELSIF TG_OP = 'DELETE' THEN
+    PERFORM 1 FROM author_stats
+    WHERE author IN (SELECT author FROM old_rows)
+    ORDER BY author
+    FOR UPDATE;
+
+    UPDATE author_stats s
+    SET rsvp_count = s.rsvp_count - o.n, updated_at = NOW()
+    FROM (SELECT author, COUNT(*) AS n FROM old_rows GROUP BY author) o
+    WHERE s.author = o.author;
+  ELSE
+    -- Only RSVPs whose author changed, weight and movie edits don't count.
+    -- Old authors lose them and new ones gain them in one upsert, so both
+    -- sides are locked in author order
+    INSERT INTO author_stats AS s (author, rsvp_count)
+    SELECT author, SUM(delta)
+    FROM (
+      SELECT o.author, -1 AS delta
+      FROM old_rows o
+      JOIN new_rows n ON n.id = o.id AND n.author <> o.author
+      UNION ALL
+      SELECT n.author, 1
+      FROM new_rows n
+      JOIN old_rows o ON o.id = n.id AND o.author <> n.author
+    ) moved
+    GROUP BY author
+    ORDER BY author
+    ON CONFLICT (author) DO UPDATE
+    SET rsvp_count = s.rsvp_count + EXCLUDED.rsvp_count, updated_at = NOW();
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+# Transition tables need one trigger per operation
+create_rsvps_author_stats_insert_trigger = """
+CREATE OR REPLACE TRIGGER rsvps_author_stats_insert
+AFTER INSERT ON rsvps
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION count_movie_picker_rsvp_authors()
+"""
+
+create_rsvps_author_stats_update_trigger = """
+CREATE OR REPLACE TRIGGER rsvps_author_stats_update
+AFTER UPDATE ON rsvps
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION count_movie_picker_rsvp_authors()
+"""
+
+create_rsvps_author_stats_delete_trigger = """
+CREATE OR REPLACE TRIGGER rsvps_author_stats_delete
+AFTER DELETE ON rsvps
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION count_movie_picker_rsvp_authors()
+"""
+
+# New wins are the hot path (the watcher's bulk insert) and are applied as
+# increments. Radarr status updates don't touch the author and are skipped.
+create_count_author_wins_function = """
+CREATE OR REPLACE FUNCTION count_movie_picker_author_wins() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    INSERT INTO author_stats AS s (author, win_count, last_win_at)
+    SELECT n.author, COUNT(*), MAX(e.starts_at)
+    FROM new_rows n
+    LEFT JOIN events e ON e.id = n.event_id
+    GROUP BY n.author
+    ORDER BY n.author
+    ON CONFLICT (author) DO UPDATE
+    SET win_count = s.win_count + EXCLUDED.win_count,
+        last_win_at = GREATEST(s.last_win_at, EXCLUDED.last_win_at),
+        updated_at = NOW();
+  ELSIF TG_OP = 'DELETE' THEN
+    PERFORM recount_movie_picker_author_wins(ARRAY(SELECT DISTINCT author FROM old_rows));
+  ELSE
+    PERFORM recount_movie_picker_author_wins(ARRAY(
+      SELECT o.author FROM old_rows o JOIN new_rows n USING (event_id)
+      WHERE o.author <> n.author
+      UNION
+      SELECT n.author FROM old_rows o JOIN new_rows n USING (event_id)
+      WHERE o.author <> n.author
+    ));
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+create_event_winners_author_stats_insert_trigger = """
+CREATE OR REPLACE TRIGGER event_winners_author_stats_insert
+AFTER INSERT ON event_winners
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION count_movie_picker_author_wins()
+"""
+
+create_event_winners_author_stats_update_trigger = """
+CREATE OR REPLACE TRIGGER event_winners_author_stats_update
+AFTER UPDATE ON event_winners
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION count_movie_picker_author_wins()
+"""
+
+create_event_winners_author_stats_delete_trigger = """
+CREATE OR REPLACE TRIGGER event_winners_author_stats_delete
+AFTER DELETE ON event_winners
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION count_movie_picker_author_wins()
+"""
+
+# Moving an event that already has a winner moves its author's last_win_at
+create_recount_event_winner_author_function = """
+CREATE OR REPLACE FUNCTION recount_movie_picker_event_winner_author() RETURNS trigger AS $$
+BEGIN
+  PERFORM recount_movie_picker_author_wins(ARRAY(
+    SELECT author FROM event_winners WHERE event_id = NEW.id
+  ));
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+create_events_author_stats_trigger = """
+CREATE OR REPLACE TRIGGER events_author_stats
+AFTER UPDATE OF starts_at ON events
+FOR EACH ROW
+WHEN (OLD.starts_at IS DISTINCT FROM NEW.starts_at)
+EXECUTE FUNCTION recount_movie_picker_event_winner_author()
+"""
+
+get_author_stats = """
+SELECT author, rsvp_count, win_count, last_win_at
+FROM author_stats
+WHERE author = %s
+"""
+
+# Keyset pagination by author name, the last param is the limit
+get_author_stats_page = """
+SELECT author, rsvp_count, win_count, last_win_at
+FROM author_stats
+WHERE %(cursor)s::TEXT IS NULL OR author > %(cursor)s
+ORDER BY author
+LIMIT %(limit)s
+"""
+
+# Full-table exports (backend/export.py), in primary key order. They run
+# unchanged through a server-side cursor (NDJSON) or wrapped in copy_to_csv.
+export_events = """
+SELECT id, title, genre, date, time, location, author, starts_at,
+       selection_strategy, revision, updated_at
+FROM events
+ORDER BY id
+"""
+
+export_rsvps = """
+SELECT id AS rsvp_id, event_id, author, movie, weight
+FROM rsvps
+ORDER BY id
+"""
+
+export_winners = """
+SELECT event_id, rsvp_id, movie, author, strategy, seed, radarr_status, radarr_sent_at
+FROM event_winners
+ORDER BY event_id
+"""
+
+# {} is one of the export queries
+copy_to_csv = """
+COPY ({}) TO STDOUT WITH (FORMAT csv, HEADER)
+"""
+
+# Local copy of Radarr movie metadata (from lookups and the library) so
+# autocomplete and the watcher's tmdbId resolution don't need Radarr.
+# title_key is backend/movie_index.py's title_key() of the title.
+create_movies_table = """
+CREATE TABLE IF NOT EXISTS movies (
+  tmdb_id BIGINT PRIMARY KEY,
+  title VARCHAR(255) NOT NULL,
+  title_key VARCHAR(255) NOT NULL,
+  year INT,
+  is_available BOOLEAN,
+  in_library BOOLEAN NOT NULL DEFAULT FALSE,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+)
+"""
+
+# Exact and prefix matches on the normalized title
+create_movies_title_key_index = """
+CREATE INDEX CONCURRENTLY IF NOT EXISTS movies_title_key_idx ON movies (title_key text_pattern_ops)
+"""
+
+# The API's in-memory index reads what changed since its last refresh
+create_movies_updated_at_index = """
+CREATE INDEX CONCURRENTLY IF NOT EXISTS movies_updated_at_idx ON movies (updated_at)
+"""
+
+# Params are one array per column. Rows are written in tmdb_id order so
+# concurrent saves of overlapping results don't deadlock, and unchanged
+# rows aren't rewritten (or re-read by every index refresh).
+upsert_movies = """
+INSERT INTO movies AS m (tmdb_id, title, title_key, year, is_available, in_library)
+SELECT t.*, %(in_library)s
+FROM UNNEST(
+  %(tmdb_ids)s::BIGINT[], %(titles)s::TEXT[], %(title_keys)s::TEXT[],
+  %(years)s::INT[], %(is_available)s::BOOLEAN[]
+) AS t
+ORDER BY 1
+ON CONFLICT (tmdb_id) DO UPDATE
+SET title = EXCLUDED.title,
+    title_key = EXCLUDED.title_key,
+    year = COALESCE(EXCLUDED.year, m.year),
+    is_available = COALESCE(EXCLUDED.is_available, m.is_available),
+    in_library = m.in_library OR EXCLUDED.in_library,
+    updated_at = NOW()
+WHERE (m.title, m.year, m.is_available, m.in_library) IS DISTINCT FROM (
+  EXCLUDED.title, COALESCE(EXCLUDED.year, m.year),
+  COALESCE(EXCLUDED.is_available, m.is_available), m.in_library OR EXCLUDED.in_library
+)
+"""
+
+# Everything when since is NULL (the first load)
+get_movies_since = """
+SELECT tmdb_id, title, title_key, year, is_available, in_library, updated_at
+FROM movies
+WHERE %(since)s::TIMESTAMPTZ IS NULL
+OR updated_at >= %(since)s::TIMESTAMPTZ - MAKE_INTERVAL(secs => %(overlap_seconds)s)
+"""
+
+get_movie_by_title_key = """
+SELECT tmdb_id, title, year, is_available
+FROM movies
+WHERE title_key = %s
+ORDER BY in_library DESC, year DESC NULLS LAST
+LIMIT 1
+"""
+
+# Validators for the conditional GETs, read before the (bigger) query they
+# guard so a changed ETag never describes older data
+get_data_version = """
+SELECT version, updated_at FROM data_version
+"""
+
+get_event_revision = """
+SELECT revision, updated_at FROM events WHERE id = %s
+"""
+
+# What the watcher sleeps until, in one round-trip. NULL when there is none.
+#   window_seconds: until the next event (without a winner) enters the
+#     watcher's one hour window
+#   peer_seconds: until there is work worth another look, due events still
+#     waiting for a winner (a peer is picking them, or died while doing so)
+#     and, when this watcher dispatches, the next outbox job to become
+#     available (after a backoff or an expired lease)
+get_watcher_deadlines = """
+SELECT
+  (
+    SELECT EXTRACT(EPOCH FROM (e.starts_at - INTERVAL '1 hour' - NOW()))
+    FROM events e
+    WHERE e.starts_at > (NOW() + INTERVAL '1 hour')
+    AND NOT EXISTS (SELECT 1 FROM event_winners w WHERE w.event_id = e.id)
+    ORDER BY e.starts_at
+    LIMIT 1
+  ) AS window_seconds,
+  LEAST(
+    (
+      SELECT %(due_recheck_seconds)s::FLOAT8
+      FROM events e
+      WHERE e.starts_at BETWEEN NOW() AND (NOW() + INTERVAL '1 hour')
+      AND NOT EXISTS (SELECT 1 FROM event_winners w WHERE w.event_id = e.id)
+      AND EXISTS (SELECT 1 FROM rsvps r WHERE r.event_id = e.id AND COALESCE(r.weight, 1) > 0)
+      LIMIT 1
+    ),
+    (
+      SELECT EXTRACT(EPOCH FROM (
+        MIN(GREATEST(available_at, COALESCE(claimed_until, available_at))) - NOW()
+      ))::FLOAT8
+      FROM outbox
+      WHERE status = 'pending'
+      AND %(dispatching)s
+    )
+  ) AS peer_seconds
+"""
+
+# Leases a batch of available jobs of one kind to this dispatcher. Rows
+# another dispatcher is claiming are skipped, and the lease of one that died
+# mid-send expires so someone else retries the job.
+claim_outbox_jobs = """
+UPDATE outbox o
+SET claimed_until = NOW() + MAKE_INTERVAL(secs => %(lease_seconds)s)
+FROM (
+  SELECT id
+  FROM outbox
+  WHERE status = 'pending'
+  AND kind = %(kind)s
+  AND available_at <= NOW()
+  AND (claimed_until IS NULL OR claimed_until < NOW())
+  ORDER BY available_at
+  LIMIT %(batch_size)s
+  FOR UPDATE SKIP LOCKED
+) claimed
+WHERE o.id = claimed.id
+RETURNING o.id, o.event_id, o.payload, o.attempts
+"""
+
+# Only pending jobs, finishing a job twice (a dispatcher whose lease expired
+# mid-send) is a no-op
+complete_outbox_job = """
+UPDATE outbox
+SET status = 'done', processed_at = NOW(), claimed_until = NULL, last_error = NULL
+WHERE id = %(id)s AND status = 'pending'
+"""
+
+# The dispatcher records a job's outcome on the outbox row and its winner
+# in one statement (one round-trip, atomic without a transaction block).
+# The winner only follows a job that was still pending: a dispatcher whose
+# lease expired mid-send can't overwrite what the one that took over recorded
+record_outbox_job_sent = """
+WITH job AS (
+  UPDATE outbox
+  SET status = 'done', processed_at = NOW(), claimed_until = NULL, last_error = NULL
+  WHERE id = %(id)s AND status = 'pending'
+  RETURNING event_id
+)
+UPDATE event_winners
+SET radarr_status = 'sent', radarr_sent_at = NOW()
+WHERE event_id = %(event_id)s
+AND event_id IN (SELECT event_id FROM job)
+"""
+
+# Exponential backoff from 1 minute up to an hour, 'dead' after the last attempt
+record_outbox_job_failed = """
+WITH job AS (
+  UPDATE outbox
+  SET attempts = attempts + 1,
+      last_error = %(error)s,
+      claimed_until = NULL,
+      available_at = NOW() + LEAST(INTERVAL '30 seconds' * POWER(2, attempts + 1), INTERVAL '1 hour'),
+      status = CASE WHEN attempts + 1 >= %(max_attempts)s THEN 'dead' ELSE status END
+  WHERE id = %(id)s AND status = 'pending'
+  RETURNING event_id
+)
+UPDATE event_winners
+SET radarr_status = 'failed'
+WHERE event_id = %(event_id)s
+AND event_id IN (SELECT event_id FROM job)
+"""
+
+# Versions of backend/SQL_UTIL/migrations.py applied to this database
+create_schema_migrations_table = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+  version INT PRIMARY KEY,
+  name TEXT NOT NULL,
+  applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  duration_ms INT NOT NULL
+)
+"""
+
+get_applied_migrations = """
+SELECT version, name, applied_at, duration_ms FROM schema_migrations ORDER BY version
+"""
+
+record_migration = """
+INSERT INTO schema_migrations (version, name, duration_ms)
+VALUES (%(version)s, %(name)s, %(duration_ms)s)
+ON CONFLICT (version) DO NOTHING
+"""
+
+# Held for the whole run (session level), so replicas starting at the same
+# time migrate one after the other. Tried rather than waited for, see
+# lock_migrations in migrations.py
+try_lock_migrations = """
+SELECT pg_try_advisory_lock(hashtext('movie_picker_migrations')) AS locked
+"""
+
+# Backstop for queries without a request deadline (the watcher's) or whose
+# cancel got lost. Session-wide, set on every async pool connection.
+set_statement_timeout = """
+SELECT set_config('statement_timeout', %s, false)
+"""
+
+# Run on every new async pool connection when warmup is on: loads the
+# catalog entries of the tables the API reads into the new backend, which
+# would otherwise slow down its first real query by a few ms
+warm_connection = """
+SELECT (SELECT version FROM data_version) AS version, EXISTS (
+  SELECT 1 FROM events e
+  LEFT JOIN rsvps r ON r.event_id = e.id
+  LEFT JOIN event_winners w ON w.event_id = e.id
+  LEFT JOIN author_stats s ON s.author = r.author
+  LEFT JOIN movies m ON m.title_key = r.movie
+  WHERE e.id = -1
+) AS found
+"""
+
+# A COPY export is one statement for the whole table, exempt from the
+# statement_timeout above until its transaction ends
+disable_statement_timeout_locally = """
+SELECT set_config('statement_timeout', '0', true)
+"""
+
+# Lock waits are capped in migrations so an ALTER queued behind a long
+# transaction doesn't block every query on the table behind it, the step is
+# retried instead
+set_migration_lock_timeout = """
+SELECT set_config('lock_timeout', %s, true)
+"""
+
+# A CREATE INDEX CONCURRENTLY that failed or was interrupted leaves an
+# invalid index behind, which IF NOT EXISTS would then skip
+get_index_validity = """
+SELECT i.indisvalid AS valid
+FROM pg_index i
+JOIN pg_class c ON c.oid = i.indexrelid
+WHERE c.relname = %s AND pg_table_is_visible(c.oid)
+"""
+
+drop_index_concurrently = """
+DROP INDEX CONCURRENTLY IF EXISTS {}
+"""
+
+# RSVP listings of an event newest first (get_rsvps_for_event, the details
+# page) read the index backwards instead of sorting
+create_rsvps_event_id_index = """
+CREATE INDEX CONCURRENTLY IF NOT EXISTS rsvps_event_id_id_idx ON rsvps (event_id, id)
+"""
+
+# Deleting an RSVP cascades to its winner through rsvp_id, which had no index
+create_event_winners_rsvp_id_index = """
+CREATE INDEX CONCURRENTLY IF NOT EXISTS event_winners_rsvp_id_idx ON event_winners (rsvp_id)
+"""
+
+# Deleting an event cascades to its outbox jobs, the (kind, event_id) unique
+# index can't be searched by event_id alone
+create_outbox_event_id_index = """
+CREATE INDEX CONCURRENTLY IF NOT EXISTS outbox_event_id_idx ON outbox (event_id)
 """
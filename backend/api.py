@@ -1,40 +1,186 @@
 # backend/api.py
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
-from psycopg.sql import SQL, Identifier
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Annotated
+
+import psycopg
+from fastapi import FastAPI, Header, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from psycopg.sql import SQL, Composed, Identifier
+from psycopg_pool import PoolTimeout
+
+from .bulk import BulkRequestError, bulk_insert
+from .deadline import DeadlineExceeded, DeadlineMiddleware
+from .export import (
+    CONTENT_TYPES,
+    EXPORT_SLOTS,
+    ExportDataset,
+    ExportFormat,
+    export_chunks,
+)
+from .http_cache import conditional_json
+from .idempotency import idempotent
+from .live import ChangeBroadcaster
+from .metrics import REQUEST_TIMEOUTS, MetricsMiddleware
+from .movie_index import MOVIE_INDEX
+from .movie_search import search_cache_stats, search_movies
+from .radarr import RadarrClient, RadarrError
+from .responses import (
+    AuthorsPageOut,
+    AuthorStatsOut,
+    EventDetailsPageOut,
+    EventsPageOut,
+    EventWinnerOut,
+    Message,
+    MoviesOut,
+    ORJSONResponse,
+    RSVPsOut,
+)
+from .selection import DEFAULT_STRATEGY, SelectionStrategy, fair_factor
 
 # psycopg using dict row factory
-from .SQL_UTIL.db import POOL
+from .SQL_UTIL.db import ASYNC_POOL, close_async_pool, open_async_pool
 from .SQL_UTIL.operations import (
+    get_author_stats,
+    get_author_stats_page,
     get_event_winner_query,
     get_rsvps_for_event,
     insert_event,
+    insert_events_bulk,
     insert_rsvp,
+    insert_rsvps_bulk,
     delete_event_query,
     delete_rsvp_query,
     get_events_query,
+    get_event_details_query,
+    get_data_version,
+    get_event_revision,
+    patch_event_query,
+    patch_rsvp_query,
+    update_event_starts_at,
+)
+from pydantic import AfterValidator, BaseModel, Field
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the async pool once the event loop is running, close it on shutdown
+    seconds = await open_async_pool("api")
+    print(f"[api] Database pool ready in {seconds * 1000:.0f} ms")
+    await BROADCASTER.start()
+    await MOVIE_INDEX.start(RADARR)
+    yield
+    await MOVIE_INDEX.stop()
+    await BROADCASTER.stop()
+    await RADARR.aclose()
+    await close_async_pool()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+# Bulk imports set their own, longer deadline once the upload is read (backend/bulk.py)
+app.add_middleware(
+    DeadlineMiddleware,
+    exempt={("POST", "/api/events/bulk"), ("POST", "/api/rsvps/bulk")},
 )
-from pydantic import BaseModel
+app.add_middleware(MetricsMiddleware)
+
+# Shared keep-alive client for movie lookups
+RADARR = RadarrClient()
+# Single LISTEN connection feeding every /api/live subscriber
+BROADCASTER = ChangeBroadcaster()
+# Comment lines sent on idle streams so proxies don't time them out
+LIVE_KEEPALIVE_SECONDS = 15
+
+
+# Out of time (backend/deadline.py): fail fast instead of tying up workers
+# and pool connections for answers nobody is waiting for
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded(request: Request, e: DeadlineExceeded):
+    print(f"[api] {request.method} {request.url.path}: {e}")
+    REQUEST_TIMEOUTS.labels("deadline").inc()
+    return ORJSONResponse(status_code=504, content={"message": "Request timed out"})
+
+
+@app.exception_handler(PoolTimeout)
+async def pool_timeout(request: Request, e: PoolTimeout):
+    # Every connection busy for the whole budget: overloaded, come back later
+    print(f"[api] {request.method} {request.url.path}: {e}")
+    REQUEST_TIMEOUTS.labels("pool").inc()
+    return ORJSONResponse(
+        status_code=503,
+        content={"message": "Database busy, try again"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(psycopg.errors.QueryCanceled)
+async def query_canceled(request: Request, e: psycopg.errors.QueryCanceled):
+    # statement_timeout, for queries the deadline didn't cancel first
+    print(f"[api] {request.method} {request.url.path}: {e}")
+    REQUEST_TIMEOUTS.labels("statement_timeout").inc()
+    return ORJSONResponse(status_code=504, content={"message": "Request timed out"})
+
+
+def validate_event_date(value: str) -> str:
+    # The frontend sends dates as M/D/YYYY, matching TO_TIMESTAMP's MM/DD/YYYY
+    _ = datetime.strptime(value, "%m/%d/%Y")
+    return value
+
 
-app = FastAPI()
+def validate_event_time(value: str) -> str:
+    _ = datetime.strptime(value, "%H:%M")
+    return value
+
+
+EventDate = Annotated[str, AfterValidator(validate_event_date)]
+EventTime = Annotated[str, AfterValidator(validate_event_time)]
 
 
 class Event(BaseModel):
     title: str
     genre: str
-    date: str
-    time: str
+    date: EventDate
+    time: EventTime
     location: str
     author: str
+    selection_strategy: SelectionStrategy = DEFAULT_STRATEGY
 
 
 class EventPatch(BaseModel):
     title: str | None = None
     genre: str | None = None
-    date: str | None = None
-    time: str | None = None
+    date: EventDate | None = None
+    time: EventTime | None = None
     location: str | None = None
     author: str | None = None
+    selection_strategy: SelectionStrategy | None = None
+
+
+# Page sizes for the event listings
+DEFAULT_EVENTS_PAGE_SIZE = 15
+MAX_EVENTS_PAGE_SIZE = 100
+
+
+class EventsPage(BaseModel):
+    # Pass the previous response's next_cursor as cursor to get the next page
+    limit: int = Field(DEFAULT_EVENTS_PAGE_SIZE, ge=1, le=MAX_EVENTS_PAGE_SIZE)
+    cursor: int | None = None
+    genre: str | None = None
+    author: str | None = None
+    starts_after: datetime | None = None
+    starts_before: datetime | None = None
+
+
+DEFAULT_AUTHORS_PAGE_SIZE = 50
+MAX_AUTHORS_PAGE_SIZE = 500
+
+
+class AuthorsPage(BaseModel):
+    # Authors by name, pass the previous response's next_cursor as cursor
+    limit: int = Field(DEFAULT_AUTHORS_PAGE_SIZE, ge=1, le=MAX_AUTHORS_PAGE_SIZE)
+    cursor: str | None = None
 
 
 class RSVP(BaseModel):
@@ -50,99 +196,250 @@ class RSVPPatch(BaseModel):
     weight: int | None = None
 
 
-@app.get("/api/health")
+@app.get("/api/health", response_model=Message)
 async def root():
-    return JSONResponse(content={"message": "Welcome to the Events API!"})
+    return ORJSONResponse(content={"message": "Welcome to the Events API!"})
+
+
+def build_events_page_query(
+    page: EventsPage, template: str
+) -> tuple[Composed, list[int | str | datetime]]:
+    filters: list[SQL] = []
+    params: list[int | str | datetime] = []
+
+    # Keyset pagination: everything older than the last event already seen
+    if page.cursor is not None:
+        filters.append(SQL("id < %s"))
+        params.append(page.cursor)
+    if page.genre is not None:
+        filters.append(SQL("genre = %s"))
+        params.append(page.genre)
+    if page.author is not None:
+        filters.append(SQL("author = %s"))
+        params.append(page.author)
+    if page.starts_after is not None:
+        filters.append(SQL("starts_at >= %s"))
+        params.append(page.starts_after)
+    if page.starts_before is not None:
+        filters.append(SQL("starts_at < %s"))
+        params.append(page.starts_before)
+
+    where = SQL(" AND ").join(filters) if filters else SQL("TRUE")
+    # Fetch one extra row to know whether there is a next page
+    params.append(page.limit + 1)
+    return SQL(template).format(filters=where), params
+
+
+@app.get("/metrics")
+async def metrics():
+    # Prometheus scrape endpoint, not proxied by the frontend
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+async def events_page_response(
+    route: str, page: EventsPage, template: str, if_none_match: str | None
+) -> Response:
+    query, params = build_events_page_query(page, template)
+    async with ASYNC_POOL.connection() as conn:
+        async with conn.cursor() as cur:
+            # Read the version first: the page query runs on a newer snapshot,
+            # so the ETag can be older than the data but never newer
+            _ = await cur.execute(get_data_version)
+            version = await cur.fetchone()
+
+            async def build():
+                _ = await cur.execute(query, params)
+                events = await cur.fetchall()
+                next_cursor = (
+                    events[page.limit - 1]["id"] if len(events) > page.limit else None
+                )
+                return {"events": events[: page.limit], "next_cursor": next_cursor}
+
+            return await conditional_json(
+                route,
+                version["version"],
+                version["updated_at"],
+                if_none_match,
+                build,
+                cache_key=(route, page.model_dump_json()),
+            )
 
 
-@app.get("/api/events")
-async def get_events():
-    events = []
-    with POOL.connection() as conn:
-        with conn.cursor() as cur:
-            _ = cur.execute(get_events_query)
-            events = cur.fetchall()
+@app.get("/api/events", response_model=EventsPageOut)
+async def get_events(
+    page: Annotated[EventsPage, Query()],
+    if_none_match: Annotated[str | None, Header()] = None,
+):
+    return await events_page_response(
+        "/api/events", page, get_events_query, if_none_match
+    )
 
-    return JSONResponse(content={"events": events})
 
+@app.get("/api/events/details", response_model=EventDetailsPageOut)
+async def get_event_details(
+    page: Annotated[EventsPage, Query()],
+    if_none_match: Annotated[str | None, Header()] = None,
+):
+    # Same paging as /api/events, but each event also carries its rsvps,
+    # rsvp_count, total_weight and winner ({rsvp_id, movie, author} or null)
+    return await events_page_response(
+        "/api/events/details", page, get_event_details_query, if_none_match
+    )
 
-@app.get("/api/rsvps/{event_id}")
-async def get_rsvps(event_id: int):
-    rsvps = []
-    with POOL.connection() as conn:
-        with conn.cursor() as cur:
-            _ = cur.execute(get_rsvps_for_event, (event_id,))
-            rsvps = cur.fetchall()
 
-    return JSONResponse(content={"rsvps": rsvps})
+@app.get("/api/rsvps/{event_id}", response_model=RSVPsOut)
+async def get_rsvps(
+    event_id: int, if_none_match: Annotated[str | None, Header()] = None
+):
+    async with ASYNC_POOL.connection() as conn:
+        async with conn.cursor() as cur:
+            _ = await cur.execute(get_event_revision, (event_id,))
+            revision = await cur.fetchone()
+
+            async def build():
+                _ = await cur.execute(get_rsvps_for_event, (event_id,))
+                return {"rsvps": await cur.fetchall()}
+
+            if not revision:
+                # Unknown event, nothing to version
+                return ORJSONResponse(content=await build())
+
+            return await conditional_json(
+                "/api/rsvps/{event_id}",
+                revision["revision"],
+                revision["updated_at"],
+                if_none_match,
+                build,
+                cache_key=("/api/rsvps/{event_id}", event_id),
+            )
 
 
+# Both creates take an optional Idempotency-Key header (backend/idempotency.py):
+# retries with the same key get the first answer back instead of a new row
 @app.post("/api/events")
-async def create_event(event: Event):
-    event_id = 0
-    with POOL.connection() as conn:
-        with conn.cursor() as cur:
-            _ = cur.execute(
-                insert_event,
-                (
-                    event.title,
-                    event.genre,
-                    event.date,
-                    event.time,
-                    event.location,
-                    event.author,
-                ),
+async def create_event(
+    event: Event, idempotency_key: Annotated[str | None, Header()] = None
+):
+    async def create() -> Response:
+        event_id = 0
+        async with ASYNC_POOL.connection() as conn:
+            async with conn.cursor() as cur:
+                _ = await cur.execute(insert_event, event_insert_params(event))
+                event_id = await cur.fetchone()
+                if not event_id:
+                    return ORJSONResponse(
+                        status_code=500,
+                        content={"message": "Failed to create event."},
+                    )
+                event_id = event_id["id"] if event_id else -1
+        return ORJSONResponse(
+            content={
+                "message": f"Event '{event.title}' created successfully with id `{event_id}`."
+            }
+        )
+
+    return await idempotent("create_event", idempotency_key, event, create)
+
+
+@app.post("/api/rsvps", responses={409: {"model": Message}})
+async def rsvp_event(
+    RSVP: RSVP, idempotency_key: Annotated[str | None, Header()] = None
+):
+    async def create() -> Response:
+        async with ASYNC_POOL.connection() as conn:
+            async with conn.cursor() as cur:
+                _ = await cur.execute(insert_rsvp, (RSVP.event_id, RSVP.author, RSVP.movie))
+                # Returns the rsvp_id of the newly created RSVP
+                res = await cur.fetchone()
+        # ON CONFLICT (event_id, author) DO NOTHING inserted nothing
+        if not res:
+            return ORJSONResponse(
+                status_code=409,
+                content={
+                    "message": f"{RSVP.author} already RSVPed to event {RSVP.event_id}."
+                },
             )
-            event_id = cur.fetchone()
-            if not event_id:
-                return JSONResponse(
-                    status_code=500,
-                    content={"message": "Failed to create event."},
-                )
-            event_id = event_id["id"] if event_id else -1
-    return JSONResponse(
-        content={
-            "message": f"Event '{event.title}' created successfully with id `{event_id}`."
-        }
-    )
+        return ORJSONResponse(
+            content={
+                "message": f"RSVP for event {RSVP.event_id} created successfully with id {res['id']}"
+            }
+        )
 
+    return await idempotent("rsvp_event", idempotency_key, RSVP, create)
 
-@app.post("/api/rsvps")
-async def rsvp_event(RSVP: RSVP):
-    with POOL.connection() as conn:
-        with conn.cursor() as cur:
-            _ = cur.execute(insert_rsvp, (RSVP.event_id, RSVP.author, RSVP.movie))
-            # Returns the rsvp_id of the newly created RSVP
-            res = cur.fetchone()
-            rsvp_id = res["id"] if res else -1
-    return JSONResponse(
-        content={
-            "message": f"RSVP for event {RSVP.event_id} created successfully with id {rsvp_id}"
-        }
+
+def event_insert_params(event: Event) -> tuple:
+    # insert_event takes date and time twice, the second pair fills starts_at
+    return event_bulk_params(event) + (event.date, event.time)
+
+
+def event_bulk_params(event: Event) -> tuple:
+    return (
+        event.title,
+        event.genre,
+        event.date,
+        event.time,
+        event.location,
+        event.author,
+        event.selection_strategy,
     )
 
 
+def bulk_response(results: list[dict]) -> ORJSONResponse:
+    created = sum(1 for result in results if result["status"] == "created")
+    return ORJSONResponse(content={"created": created, "results": results})
+
+
+@app.post("/api/events/bulk")
+async def create_events_bulk(request: Request):
+    # Body is a JSON array of events, or NDJSON with one event per line
+    try:
+        results = await bulk_insert(request, Event, insert_events_bulk, event_bulk_params)
+    except BulkRequestError as e:
+        return ORJSONResponse(status_code=e.status_code, content={"message": e.message})
+    return bulk_response(results)
+
+
+@app.post("/api/rsvps/bulk")
+async def rsvp_events_bulk(request: Request):
+    # Same ON CONFLICT (event_id, author) DO NOTHING semantics as POST /api/rsvps,
+    # skipped rows are reported with status "conflict"
+    try:
+        results = await bulk_insert(
+            request,
+            RSVP,
+            insert_rsvps_bulk,
+            lambda rsvp: (rsvp.event_id, rsvp.author, rsvp.movie),
+            key_of=lambda params: params[:2],
+            event_id_of=lambda rsvp: rsvp.event_id,
+            author_of=lambda rsvp: rsvp.author,
+        )
+    except BulkRequestError as e:
+        return ORJSONResponse(status_code=e.status_code, content={"message": e.message})
+    return bulk_response(results)
+
+
 @app.delete("/api/events/{event_id}")
 async def delete_event(event_id: int):
-    with POOL.connection() as conn:
-        with conn.cursor() as cur:
+    async with ASYNC_POOL.connection() as conn:
+        async with conn.cursor() as cur:
             # change this
-            _ = cur.execute(delete_event_query, (event_id,))
-    return JSONResponse(content={"message": f"Event {event_id} deleted successfully."})
+            _ = await cur.execute(delete_event_query, (event_id,))
+    return ORJSONResponse(content={"message": f"Event {event_id} deleted successfully."})
 
 
 @app.delete("/api/rsvps/{rsvp_id}")
 async def delete_rsvp(rsvp_id: int):
-    with POOL.connection() as conn:
-        with conn.cursor() as cur:
-            _ = cur.execute((delete_rsvp_query), (rsvp_id,))
-    return JSONResponse(content={"message": f"RSVP {rsvp_id} deleted successfully."})
+    async with ASYNC_POOL.connection() as conn:
+        async with conn.cursor() as cur:
+            _ = await cur.execute((delete_rsvp_query), (rsvp_id,))
+    return ORJSONResponse(content={"message": f"RSVP {rsvp_id} deleted successfully."})
 
 
 @app.patch("/api/events/{event_id}")
-def patch_event(event_id: int, event: EventPatch):
+async def patch_event(event_id: int, event: EventPatch):
     cols: list[str] = []
-    vals: list[str] = []
+    vals: list[str | None] = []
 
     if event.title is not None:
         cols.append("title")
@@ -162,32 +459,40 @@ def patch_event(event_id: int, event: EventPatch):
     if event.author is not None:
         cols.append("author")
         vals.append(event.author)
+    if event.selection_strategy is not None:
+        cols.append("selection_strategy")
+        vals.append(event.selection_strategy)
 
     if not cols:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=400, content={"message": "No fields provided for update."}
         )
 
     # "column" = %s, "column2" = %s, ...
     set_clause = SQL(", ").join(SQL("{} = %s").format(Identifier(col)) for col in cols)
 
-    query = SQL("UPDATE events SET {} WHERE id = %s RETURNING id").format(set_clause)
+    if event.date is not None or event.time is not None:
+        # Keep the typed start time in sync with the date/time strings
+        set_clause = SQL(", ").join([set_clause, SQL(update_event_starts_at)])
+        vals += [event.date, event.time]
+
+    query = SQL(patch_event_query).format(set_clause)
 
-    with POOL.connection() as conn:
-        with conn.cursor() as cur:
-            _ = cur.execute(query, (*vals, event_id))
-            if not cur.fetchone():
-                return JSONResponse(
+    async with ASYNC_POOL.connection() as conn:
+        async with conn.cursor() as cur:
+            _ = await cur.execute(query, (*vals, event_id))
+            if not await cur.fetchone():
+                return ORJSONResponse(
                     status_code=404, content={"message": f"Event {event_id} not found"}
                 )
 
-    return JSONResponse(
+    return ORJSONResponse(
         content={"message": f"Event {event_id} patched", "updated_fields": cols}
     )
 
 
 @app.patch("/api/rsvps/{rsvp_id}")
-def patch_rsvp(rsvp_id: int, rsvp: RSVPPatch):
+async def patch_rsvp(rsvp_id: int, rsvp: RSVPPatch):
     cols: list[str] = []
     vals: list[str | int] = []
 
@@ -202,83 +507,173 @@ def patch_rsvp(rsvp_id: int, rsvp: RSVPPatch):
         vals.append(rsvp.weight)
 
     if not cols:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=400, content={"message": "No fields provided for update."}
         )
 
     # "column" = %s, "column2" = %s, ...
     set_clause = SQL(", ").join(SQL("{} = %s").format(Identifier(col)) for col in cols)
 
-    query = SQL("UPDATE rsvps SET {} WHERE id = %s RETURNING id").format(set_clause)
+    query = SQL(patch_rsvp_query).format(set_clause)
 
-    with POOL.connection() as conn:
-        with conn.cursor() as cur:
-            _ = cur.execute(query, (*vals, rsvp_id))
-            if not cur.fetchone():
-                return JSONResponse(
+    async with ASYNC_POOL.connection() as conn:
+        async with conn.cursor() as cur:
+            _ = await cur.execute(query, (*vals, rsvp_id))
+            if not await cur.fetchone():
+                return ORJSONResponse(
                     status_code=404, content={"message": f"RSVP {rsvp_id} not found"}
                 )
 
-    return JSONResponse(
+    return ORJSONResponse(
         content={"message": f"RSVP {rsvp_id} patched", "updated_fields": cols}
     )
 
 
-@app.get("/api/events/winner/{event_id}")
-def get_event_winner(event_id: int):
-    with POOL.connection() as conn:
-        with conn.cursor() as cur:
-            _ = cur.execute(get_event_winner_query, (event_id,))
-            winner = cur.fetchone()
-            if not winner:
-                return JSONResponse(
+@app.get(
+    "/api/events/winner/{event_id}",
+    response_model=EventWinnerOut,
+    responses={404: {"model": Message}},
+)
+async def get_event_winner(
+    event_id: int, if_none_match: Annotated[str | None, Header()] = None
+):
+    async with ASYNC_POOL.connection() as conn:
+        async with conn.cursor() as cur:
+            _ = await cur.execute(get_event_winner_query, (event_id,))
+            winner = await cur.fetchone()
+            if not winner or winner["rsvp_id"] is None:
+                return ORJSONResponse(
                     status_code=404,
                     content={"message": f"No winner found for event {event_id}"},
                 )
-            rsvp_winner_id = winner["rsvp_id"] if winner else None
-    return JSONResponse(content={"rsvp_winner_id": rsvp_winner_id})
-
-
-@app.get("/api/movies/{movie}")
-def get_movies(movie: str):
-    import os
-    import requests
-
-    # Grab Radarr URL and API key from environment variables
-    radarr_url = os.environ.get("MOVIE_PICKER_RADARR_URL")
-    radarr_api_key = os.environ.get("MOVIE_PICKER_RADARR_API_KEY")
-
-    if not radarr_url or not radarr_api_key:
-        print("[get_movies] Radarr URL or API key not set in environment variables")
-        print(f"[get_movies] Radarr URL: {radarr_url}")
-        print(f"[get_movies] Radarr API Key: {radarr_api_key}")
-
-    # Build and send the Radarr lookup request for movie data
-    radarr_lookup_endpoint = f"{radarr_url}/api/v3/movie/lookup"
-    params = {
-        "term": movie,
-        "apikey": radarr_api_key,
-    }
-    print(f"[get_movies] Radarr looking up movie: {params['term']}")
-    lookup_response = requests.get(
-        radarr_lookup_endpoint,
-        params=params,
+
+    async def build():
+        return {"rsvp_winner_id": winner["rsvp_id"]}
+
+    return await conditional_json(
+        "/api/events/winner/{event_id}",
+        winner["revision"],
+        winner["updated_at"],
+        if_none_match,
+        build,
     )
 
-    if not lookup_response.ok:
-        print(
-            f"[get_movies] Radarr lookup failed: {lookup_response.status_code} - {lookup_response.text}"
+
+def author_stats_response(stats: dict) -> dict:
+    # fair_factor: what the fair strategy would multiply the author's RSVP
+    # weight by for an event starting now
+    days_since_win = float("inf")
+    if stats["last_win_at"]:
+        since = datetime.now(timezone.utc) - stats["last_win_at"]
+        days_since_win = since.total_seconds() / 86400
+    return {**stats, "fair_factor": round(float(fair_factor(days_since_win)), 4)}
+
+
+@app.get("/api/authors", response_model=AuthorsPageOut)
+async def get_authors(page: Annotated[AuthorsPage, Query()]):
+    async with ASYNC_POOL.connection() as conn:
+        async with conn.cursor() as cur:
+            # Fetch one extra row to know whether there is a next page
+            _ = await cur.execute(
+                get_author_stats_page, {"cursor": page.cursor, "limit": page.limit + 1}
+            )
+            authors = await cur.fetchall()
+
+    next_cursor = authors[page.limit - 1]["author"] if len(authors) > page.limit else None
+    return ORJSONResponse(
+        content={
+            "authors": [author_stats_response(a) for a in authors[: page.limit]],
+            "next_cursor": next_cursor,
+        }
+    )
+
+
+@app.get(
+    "/api/authors/{author}",
+    response_model=AuthorStatsOut,
+    responses={404: {"model": Message}},
+)
+async def get_author(author: str):
+    async with ASYNC_POOL.connection() as conn:
+        async with conn.cursor() as cur:
+            _ = await cur.execute(get_author_stats, (author,))
+            stats = await cur.fetchone()
+
+    if not stats:
+        return ORJSONResponse(
+            status_code=404, content={"message": f"No RSVPs found for author {author}"}
         )
+    return ORJSONResponse(content=author_stats_response(stats))
+
+
+@app.get("/api/export/{dataset}")
+async def export_dataset(
+    dataset: ExportDataset,
+    fmt: Annotated[ExportFormat, Query(alias="format")] = "ndjson",
+):
+    # The whole table streamed as NDJSON or CSV, for analytics (backend/export.py)
+    if EXPORT_SLOTS.locked():
+        return ORJSONResponse(
+            status_code=503,
+            content={"message": "Another export is running, try again later"},
+            headers={"Retry-After": "10"},
+        )
+    return StreamingResponse(
+        export_chunks(dataset, fmt),
+        media_type=CONTENT_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{fmt}"'},
+    )
 
-    results = lookup_response.json()
-    print(
-        f"[get_movies] Radarr lookup response: {lookup_response.status_code} - {results[0] if results else 'No results found'}"
+
+@app.get("/api/live")
+async def live_feed(event_id: int | None = None):
+    # Server-Sent Events stream of changes to events, RSVPs and winners, one
+    # JSON message per change: {table, op, event_id, id, rsvp_id}.
+    # On {"op": "RESYNC"} clients should refetch, messages were dropped.
+    async def stream():
+        async with BROADCASTER.subscribe(event_id) as queue:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(
+                        queue.get(), timeout=LIVE_KEEPALIVE_SECONDS
+                    )
+                    yield f"data: {message}\n\n"
+                except TimeoutError:
+                    yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
-    if not results:
-        print("[get_movies] No results found in Radarr lookup")
-        return JSONResponse(content={"movies": []})
 
-    # limit to 5 results
-    res = [movie_obj["title"] for movie_obj in results[:5]] if results else []
-    return JSONResponse(content={"movies": res})
+@app.get("/api/live/stats")
+async def live_feed_stats():
+    return ORJSONResponse(
+        content={
+            "subscribers": len(BROADCASTER.subscribers),
+            "resyncs": BROADCASTER.resyncs,
+        }
+    )
+
+
+@app.get("/api/movies/cache")
+async def get_movies_cache_stats():
+    return ORJSONResponse(content=search_cache_stats())
+
+
+@app.get("/api/movies/{movie}", response_model=MoviesOut)
+async def get_movies(movie: str):
+    try:
+        res = await search_movies(RADARR, movie)
+    except RadarrError as e:
+        print(f"[get_movies] Radarr lookup failed: {e}")
+        return ORJSONResponse(
+            status_code=502, content={"message": "Movie lookup failed", "movies": []}
+        )
+
+    if not res:
+        print("[get_movies] No results found in Radarr lookup")
+    return ORJSONResponse(content={"movies": res})
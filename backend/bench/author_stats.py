@@ -0,0 +1,173 @@
+# backend/bench/author_stats.py
+# Checks that the trigger-maintained author_stats rows match a full
+# aggregate of rsvps/event_winners after bulk inserts, author changes,
+# deletes and moved events, and measures what the triggers cost a bulk RSVP
+# insert and what a lookup saves over aggregating the history.
+#
+# Everything runs in a transaction that is rolled back at the end. From the
+# root directory:
+#   python -m backend.bench.author_stats --events 10000 --authors 500
+import argparse
+from time import perf_counter
+
+from ..selection import new_seed, pick_winners, winner_columns
+from ..SQL_UTIL.db import POOL
+from ..SQL_UTIL.operations import (
+    get_author_stats,
+    get_selection_candidates,
+    insert_event_winners,
+)
+
+seed_events = """
+INSERT INTO events (title, genre, date, time, location, author, starts_at)
+SELECT 'Bench ' || n, 'Action', '', '', 'Bench', 'bench-stats',
+       NOW() - (n || ' hours')::INTERVAL
+FROM generate_series(1, %(events)s) AS n
+"""
+
+# Every event gets RSVPs from rsvps_per_event consecutive authors
+seed_rsvps = """
+INSERT INTO rsvps (event_id, author, movie, weight)
+SELECT e.id, 'bench-stats ' || ((e.id + k) %% %(authors)s), 'Movie ' || k, 1 + k %% 3
+FROM events e, generate_series(1, %(rsvps_per_event)s) AS k
+WHERE e.author = 'bench-stats'
+"""
+
+get_seeded_event_ids = "SELECT id FROM events WHERE author = 'bench-stats' ORDER BY id"
+
+rename_rsvp_authors = """
+UPDATE rsvps SET author = author || ' renamed'
+WHERE id IN (SELECT id FROM rsvps WHERE author LIKE 'bench-stats %%' ORDER BY id LIMIT %s)
+"""
+
+reweigh_rsvps = """
+UPDATE rsvps SET weight = weight + 1
+WHERE id IN (SELECT id FROM rsvps WHERE author LIKE 'bench-stats %%' ORDER BY id DESC LIMIT %s)
+"""
+
+delete_rsvps = """
+DELETE FROM rsvps
+WHERE id IN (SELECT id FROM rsvps WHERE author LIKE 'bench-stats %%' ORDER BY id LIMIT %s OFFSET 5000)
+"""
+
+delete_events = """
+DELETE FROM events
+WHERE id IN (SELECT id FROM events WHERE author = 'bench-stats' ORDER BY id DESC LIMIT %s)
+"""
+
+move_events = """
+UPDATE events SET starts_at = starts_at + INTERVAL '400 days'
+WHERE id IN (SELECT id FROM events WHERE author = 'bench-stats' ORDER BY id LIMIT %s)
+"""
+
+# What author_stats should hold, aggregated from scratch
+expected_stats = """
+SELECT a.author, COALESCE(r.rsvp_count, 0) AS rsvp_count,
+       COALESCE(w.win_count, 0) AS win_count, w.last_win_at
+FROM (SELECT author FROM rsvps UNION SELECT author FROM event_winners) a
+LEFT JOIN (SELECT author, COUNT(*) AS rsvp_count FROM rsvps GROUP BY author) r
+  ON r.author = a.author
+LEFT JOIN (
+  SELECT w.author, COUNT(*) AS win_count, MAX(e.starts_at) AS last_win_at
+  FROM event_winners w JOIN events e ON e.id = w.event_id
+  GROUP BY w.author
+) w ON w.author = a.author
+WHERE a.author LIKE 'bench-stats %%'
+"""
+
+actual_stats = """
+SELECT author, rsvp_count, win_count, last_win_at
+FROM author_stats
+WHERE author LIKE 'bench-stats %%' AND (rsvp_count <> 0 OR win_count <> 0)
+"""
+
+# How fairness read an author's history before author_stats
+aggregate_author = """
+SELECT (SELECT COUNT(*) FROM rsvps WHERE author = %(author)s) AS rsvp_count,
+       COUNT(*) AS win_count, MAX(e.starts_at) AS last_win_at
+FROM event_winners w JOIN events e ON e.id = w.event_id
+WHERE w.author = %(author)s
+"""
+
+
+def compare(conn, step: str) -> bool:
+    expected = {row["author"]: row for row in conn.execute(expected_stats).fetchall()}
+    actual = {row["author"]: row for row in conn.execute(actual_stats).fetchall()}
+    if expected == actual:
+        print(f"[author_stats] {step}: {len(actual)} authors match")
+        return True
+    wrong = [a for a in expected.keys() | actual.keys() if expected.get(a) != actual.get(a)]
+    print(f"[author_stats] FAIL {step}: {len(wrong)} authors differ, e.g. {wrong[0]!r}:")
+    print(f"[author_stats]   expected {expected.get(wrong[0])}, got {actual.get(wrong[0])}")
+    return False
+
+
+def timed_insert(conn, params: dict, with_triggers: bool) -> float:
+    with conn.transaction(force_rollback=True):
+        if not with_triggers:
+            _ = conn.execute("ALTER TABLE rsvps DISABLE TRIGGER rsvps_author_stats_insert")
+        start = perf_counter()
+        _ = conn.execute(seed_rsvps, params)
+        return perf_counter() - start
+
+
+def run(events: int, authors: int, rsvps_per_event: int, lookups: int) -> bool:
+    params = {"events": events, "authors": authors, "rsvps_per_event": rsvps_per_event}
+    ok = True
+    with POOL.connection() as conn:
+        with conn.transaction(force_rollback=True):
+            _ = conn.execute(seed_events, params)
+
+            plain = timed_insert(conn, params, with_triggers=False)
+            counted = timed_insert(conn, params, with_triggers=True)
+            rows = events * rsvps_per_event
+            print(f"[author_stats] Bulk insert of {rows} RSVPs: {plain:.2f}s without the stats trigger, {counted:.2f}s with it")
+
+            _ = conn.execute(seed_rsvps, params)
+            event_ids = [row["id"] for row in conn.execute(get_seeded_event_ids).fetchall()]
+            candidates = conn.execute(get_selection_candidates, {"event_ids": event_ids}).fetchone()
+            winners = pick_winners(candidates, {event_id: new_seed() for event_id in event_ids})
+            _ = conn.execute(insert_event_winners, winner_columns(winners))
+            ok &= compare(conn, "After the bulk insert and picks")
+
+            _ = conn.execute(rename_rsvp_authors, (events // 10,))
+            _ = conn.execute(reweigh_rsvps, (events // 10,))
+            ok &= compare(conn, "After author and weight changes")
+
+            _ = conn.execute(delete_rsvps, (events // 10,))
+            _ = conn.execute(delete_events, (events // 10,))
+            ok &= compare(conn, "After deleting RSVPs (and their wins) and events")
+
+            _ = conn.execute(move_events, (events // 10,))
+            ok &= compare(conn, "After moving events")
+
+            _ = conn.execute("ANALYZE rsvps, event_winners, events, author_stats")
+            names = [f"bench-stats {i % authors}" for i in range(lookups)]
+            start = perf_counter()
+            for name in names:
+                _ = conn.execute(aggregate_author, {"author": name}).fetchone()
+            aggregated = perf_counter() - start
+            start = perf_counter()
+            for name in names:
+                _ = conn.execute(get_author_stats, (name,)).fetchone()
+            looked_up = perf_counter() - start
+            print(f"[author_stats] {lookups} author reads: {aggregated * 1000 / lookups:.2f} ms aggregating, {looked_up * 1000 / lookups:.2f} ms from author_stats")
+
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    _ = parser.add_argument("--events", type=int, default=10_000)
+    _ = parser.add_argument("--authors", type=int, default=500)
+    _ = parser.add_argument("--rsvps-per-event", type=int, default=8)
+    _ = parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+    ok = run(args.events, args.authors, args.rsvps_per_event, args.lookups)
+    POOL.close()
+    print("[author_stats] OK" if ok else "[author_stats] FAIL")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# backend/bench/bulk_ingest.py
+# Compares ingesting events and RSVPs one POST at a time against the bulk
+# endpoints. Needs a running API and the same MOVIE_PICKER_DB_URL (used to
+# delete the seeded rows afterwards). From the root directory:
+#   python -m backend.bench.bulk_ingest --url http://localhost:8000 --rows 2000
+import argparse
+import asyncio
+import json
+from time import perf_counter
+
+import httpx
+
+from ..SQL_UTIL.db import POOL
+
+BENCH_AUTHOR = "bench-bulk"
+
+
+def event_row(n: int) -> dict:
+    return {
+        "title": f"Bench {n}",
+        "genre": "Action",
+        "date": "1/1/2020",
+        "time": "19:00",
+        "location": "Bench",
+        "author": BENCH_AUTHOR,
+    }
+
+
+async def post_each(client: httpx.AsyncClient, path: str, rows: list[dict], concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def post(row: dict):
+        async with semaphore:
+            _ = (await client.post(path, json=row)).raise_for_status()
+
+    _ = await asyncio.gather(*(post(row) for row in rows))
+
+
+async def post_bulk(client: httpx.AsyncClient, path: str, rows: list[dict]):
+    # NDJSON, the same format a spreadsheet export would be converted to
+    body = "\n".join(json.dumps(row) for row in rows)
+    response = await client.post(
+        path, content=body, headers={"content-type": "application/x-ndjson"}
+    )
+    _ = response.raise_for_status()
+    return response.json()
+
+
+async def timed(label: str, rows: int, coroutine):
+    start = perf_counter()
+    result = await coroutine
+    elapsed = perf_counter() - start
+    print(f"[bulk_ingest] {label:<22} {rows / elapsed:10.1f} rows/s ({elapsed:.2f}s)")
+    return result
+
+
+async def run(url: str, rows: int, concurrency: int):
+    async with httpx.AsyncClient(base_url=url, timeout=120) as client:
+        events = [event_row(n) for n in range(rows)]
+        await timed("events single-row", rows, post_each(client, "/api/events", events, concurrency))
+        created = await timed("events bulk", rows, post_bulk(client, "/api/events/bulk", events))
+
+        # Each event gets one single-row and one bulk RSVP, under different authors
+        event_ids = [result["id"] for result in created["results"]]
+        rsvps = [
+            {"event_id": event_id, "author": author, "movie": "Bench Movie"}
+            for event_id in event_ids
+            for author in ("bench-a", "bench-b")
+        ]
+        single, bulk = rsvps[::2], rsvps[1::2]
+        await timed("rsvps single-row", len(single), post_each(client, "/api/rsvps", single, concurrency))
+        await timed("rsvps bulk", len(bulk), post_bulk(client, "/api/rsvps/bulk", bulk))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    _ = parser.add_argument("--url", default="http://localhost:8000")
+    _ = parser.add_argument("--rows", type=int, default=2000)
+    _ = parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args.url, args.rows, args.concurrency))
+    finally:
+        with POOL.connection() as conn:
+            _ = conn.execute("DELETE FROM events WHERE author = %s", (BENCH_AUTHOR,))
+        POOL.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+# backend/bench/deadlines.py
+# Fault injection for the request deadlines (backend/deadline.py). Starts a
+# fake Radarr that answers after --radarr-latency seconds and the API with a
+# --timeout second budget, then
+#   - sends autocomplete lookups that all have to go to the hung Radarr
+#   - locks an event row and sends PATCHes that queue behind the lock,
+#     more than the pool has connections
+# Every request has to be answered (502/503/504) within the budget plus
+# --slack, the waiting queries must be cancelled in Postgres, /api/health has
+# to stay fast throughout, and the API has to work normally once the lock is
+# released. From the root directory:
+#   python -m backend.bench.deadlines --timeout 1 --radarr-latency 5
+# The seeded event is deleted at the end.
+import argparse
+import asyncio
+import contextlib
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from time import perf_counter
+
+import httpx
+import psycopg
+from psycopg.rows import dict_row
+
+from ..SQL_UTIL.db import DB_URL
+
+seed_event = """
+INSERT INTO events (title, genre, date, time, location, author, starts_at)
+VALUES ('Bench deadlines', 'Action', '', '', 'Bench', 'bench-deadlines', NOW() + INTERVAL '7 days')
+RETURNING id
+"""
+
+lock_event = "SELECT id FROM events WHERE id = %s FOR UPDATE"
+
+# The API's UPDATEs still waiting for the lock
+count_lock_waiters = """
+SELECT COUNT(*) AS waiting FROM pg_stat_activity
+WHERE wait_event_type = 'Lock' AND query LIKE '%%UPDATE events%%'
+"""
+
+delete_seeded = "DELETE FROM events WHERE author = 'bench-deadlines'"
+
+
+@contextlib.contextmanager
+def server(name: str, app: str, port: int, env: dict, log_dir: str, poll: float = 0.1):
+    url = f"http://127.0.0.1:{port}"
+    log_path = os.path.join(log_dir, f"{name}.log")
+    with open(log_path, "w") as log:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning"],
+            env={**os.environ, **env},
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+        try:
+            for _ in range(int(10 / poll)):
+                with contextlib.suppress(httpx.HTTPError):
+                    _ = httpx.get(url + "/", timeout=1)
+                    break
+                if process.poll() is not None:
+                    raise SystemExit(f"[deadlines] {name} exited, see {log_path}")
+                time.sleep(poll)
+            yield url
+        finally:
+            process.terminate()
+            _ = process.wait()
+
+
+class HealthProbe:
+    # Hits /api/health every interval while a phase runs
+
+    def __init__(self, client: httpx.AsyncClient, interval: float = 0.05):
+        self.client = client
+        self.interval = interval
+        self.timings: list[float] = []
+        self.task: asyncio.Task | None = None
+
+    async def run(self):
+        while True:
+            start = perf_counter()
+            _ = await self.client.get("/api/health")
+            self.timings.append(perf_counter() - start)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self.timings = []
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> float:
+        if self.task:
+            _ = self.task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.task
+        return max(self.timings) if self.timings else 0.0
+
+
+async def timed(client: httpx.AsyncClient, method: str, path: str, **kwargs) -> tuple[int, float]:
+    start = perf_counter()
+    response = await client.request(method, path, **kwargs)
+    return response.status_code, perf_counter() - start
+
+
+def report(phase: str, results: list[tuple[int, float]], health: float, allowed: set[int], limit: float) -> bool:
+    statuses: dict[int, int] = {}
+    for status, _elapsed in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    slowest = max(elapsed for _status, elapsed in results)
+    print(f"[deadlines] {phase}: statuses {dict(sorted(statuses.items()))}, slowest {slowest:.2f}s, slowest /api/health {health * 1000:.0f} ms")
+    ok = True
+    if not set(statuses) <= allowed:
+        print(f"[deadlines] FAIL: {phase} answered {sorted(set(statuses) - allowed)}")
+        ok = False
+    if slowest > limit:
+        print(f"[deadlines] FAIL: {phase} took longer than {limit:.2f}s")
+        ok = False
+    if health > 0.5:
+        print(f"[deadlines] FAIL: /api/health was slow during {phase}")
+        ok = False
+    return ok
+
+
+async def run(args, api_url: str, event_id: int) -> bool:
+    ok = True
+    limit = args.timeout + args.slack
+    async with httpx.AsyncClient(base_url=api_url, timeout=60) as client:
+        probe = HealthProbe(client)
+
+        probe.start()
+        results = await asyncio.gather(
+            *(timed(client, "GET", f"/api/movies/zzq deadline {i}") for i in range(args.requests))
+        )
+        ok &= report("Hung Radarr", results, await probe.stop(), {502, 504}, limit)
+
+        with psycopg.connect(DB_URL, row_factory=dict_row) as locker:
+            _ = locker.execute(lock_event, (event_id,))
+            probe.start()
+            results = await asyncio.gather(
+                *(
+                    timed(client, "PATCH", f"/api/events/{event_id}", json={"title": f"Bench deadlines {i}"})
+                    for i in range(args.requests)
+                )
+            )
+            ok &= report("Locked row", results, await probe.stop(), {503, 504}, limit)
+
+            with psycopg.connect(DB_URL, autocommit=True, row_factory=dict_row) as conn:
+                waiting = conn.execute(count_lock_waiters).fetchone()["waiting"]
+            print(f"[deadlines] UPDATEs still waiting for the lock in Postgres: {waiting}")
+            if waiting:
+                print("[deadlines] FAIL: timed out queries were not cancelled")
+                ok = False
+            locker.rollback()
+
+        # Everything back to normal once the lock is gone
+        results = await asyncio.gather(
+            *(
+                timed(client, "PATCH", f"/api/events/{event_id}", json={"title": f"Bench deadlines {i}"})
+                for i in range(args.requests)
+            ),
+            *(timed(client, "GET", f"/api/rsvps/{event_id}") for _ in range(args.requests)),
+        )
+        statuses = sorted({status for status, _elapsed in results})
+        print(f"[deadlines] After the lock is released: statuses {statuses}")
+        if statuses != [200]:
+            print("[deadlines] FAIL: the API did not recover")
+            ok = False
+
+        timeouts = [
+            line
+            for line in (await client.get("/metrics")).text.splitlines()
+            if line.startswith("movie_picker_http_timeouts_total")
+        ]
+        print(f"[deadlines] {', '.join(timeouts)}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    _ = parser.add_argument("--timeout", type=float, default=1.0, help="the API's request budget")
+    _ = parser.add_argument("--slack", type=float, default=0.5, help="allowed on top of the budget")
+    _ = parser.add_argument("--radarr-latency", type=float, default=5.0)
+    _ = parser.add_argument("--requests", type=int, default=30)
+    _ = parser.add_argument("--port", type=int, default=8766)
+    _ = parser.add_argument("--radarr-port", type=int, default=7879)
+    args = parser.parse_args()
+
+    with psycopg.connect(DB_URL, autocommit=True, row_factory=dict_row) as conn:
+        _ = conn.execute(delete_seeded)
+        event_id = conn.execute(seed_event).fetchone()["id"]
+
+    log_dir = tempfile.mkdtemp(prefix="deadlines-")
+    print(f"[deadlines] Logs in {log_dir}")
+    radarr_env = {"FAKE_RADARR_LATENCY": str(args.radarr_latency)}
+    try:
+        with server("fake_radarr", "backend.bench.fake_radarr:app", args.radarr_port, radarr_env, log_dir) as radarr_url:
+            api_env = {
+                "MOVIE_PICKER_REQUEST_TIMEOUT": str(args.timeout),
+                "MOVIE_PICKER_RADARR_URL": radarr_url,
+                "MOVIE_PICKER_RADARR_API_KEY": "bench",
+            }
+            with server("api", "backend.api:app", args.port, api_env, log_dir) as api_url:
+                ok = asyncio.run(run(args, api_url, event_id))
+    finally:
+        with psycopg.connect(DB_URL, autocommit=True) as conn:
+            _ = conn.execute(delete_seeded)
+
+    print("[deadlines] OK" if ok else "[deadlines] FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# backend/bench/dispatch_radarr.py
+# Times the Radarr dispatch stage against a (fake) Radarr. Start
+# backend/bench/fake_radarr.py first, then from the root directory:
+#   MOVIE_PICKER_RADARR_URL=http://localhost:7878 MOVIE_PICKER_RADARR_API_KEY=x \
+#     python -m backend.bench.dispatch_radarr --winners 200
+# Seeded rows are deleted again at the end.
+import argparse
+import asyncio
+from time import perf_counter
+
+from ..dispatch import dispatch_pending
+from ..radarr import RadarrClient
+from ..SQL_UTIL.db import ASYNC_POOL, close_async_pool, open_async_pool
+
+seed_winners = """
+WITH new_events AS (
+  INSERT INTO events (title, genre, date, time, location, author, starts_at)
+  SELECT 'Bench ' || n, 'Action', '', '', 'Bench', 'bench-dispatch',
+         NOW() - INTERVAL '1 day'
+  FROM generate_series(1, %s) AS n
+  RETURNING id
+), new_rsvps AS (
+  INSERT INTO rsvps (event_id, author, movie)
+  SELECT id, 'bench', 'Bench Movie ' || id FROM new_events
+  RETURNING id, event_id, author, movie
+)
+INSERT INTO event_winners (event_id, rsvp_id, movie, author)
+SELECT event_id, id, movie, author FROM new_rsvps
+"""
+
+count_statuses = """
+SELECT w.radarr_status, COUNT(*) AS count
+FROM event_winners w JOIN events e ON e.id = w.event_id
+WHERE e.author = 'bench-dispatch'
+GROUP BY w.radarr_status
+"""
+
+# Failed jobs back off for a minute or more, the bench retries right away
+skip_backoff = """
+UPDATE outbox SET available_at = NOW()
+WHERE status = 'pending'
+AND event_id IN (SELECT id FROM events WHERE author = 'bench-dispatch')
+"""
+
+# The movies dispatch looked up (and saved to the movies table) go too
+delete_seeded = """
+DELETE FROM events WHERE author = 'bench-dispatch';
+DELETE FROM movies WHERE title LIKE 'Bench Movie %'
+"""
+
+
+async def run(winners: int, runs: int):
+    await open_async_pool("watcher")
+    radarr = RadarrClient()
+    try:
+        async with ASYNC_POOL.connection() as conn:
+            _ = await conn.execute(seed_winners, (winners,))
+
+        for run_number in range(1, runs + 1):
+            start = perf_counter()
+            failed = await dispatch_pending(radarr)
+            elapsed = perf_counter() - start
+            print(f"[dispatch_radarr] Run {run_number}: {elapsed:.2f}s, {failed} failed")
+            if not failed:
+                break
+            async with ASYNC_POOL.connection() as conn:
+                _ = await conn.execute(skip_backoff)
+
+        async with ASYNC_POOL.connection() as conn:
+            cur = await conn.execute(count_statuses)
+            for row in await cur.fetchall():
+                print(f"[dispatch_radarr] {row['radarr_status']}: {row['count']}")
+    finally:
+        async with ASYNC_POOL.connection() as conn:
+            _ = await conn.execute(delete_seeded)
+        await radarr.aclose()
+        await close_async_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    _ = parser.add_argument("--winners", type=int, default=100)
+    _ = parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.winners, args.runs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# backend/bench/etag_polling.py
+# Simulates clients polling the read endpoints while a writer changes an
+# event now and then, once without and once with If-None-Match. Reports the
+# 304 rate, latency and, with --server-pid (same host), the server CPU time
+# spent per request. From the root directory:
+#   python -m backend.bench.etag_polling --url http://localhost:8000 \
+#     --event-id 1 --server-pid $(pgrep -f uvicorn)
+import argparse
+import asyncio
+import os
+from time import perf_counter
+
+import httpx
+
+
+def cpu_seconds(pid: int) -> float:
+    # utime + stime from /proc/<pid>/stat, in clock ticks
+    with open(f"/proc/{pid}/stat") as stat:
+        fields = stat.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def poller(
+    client: httpx.AsyncClient,
+    paths: list[str],
+    conditional: bool,
+    deadline: float,
+    interval: float,
+    counts: dict[int, int],
+    latencies: list[float],
+):
+    etags: dict[str, str] = {}
+    while perf_counter() < deadline:
+        for path in paths:
+            headers = {"If-None-Match": etags[path]} if conditional and path in etags else {}
+            start = perf_counter()
+            response = await client.get(path, headers=headers)
+            latencies.append(perf_counter() - start)
+            counts[response.status_code] = counts.get(response.status_code, 0) + 1
+            if "etag" in response.headers:
+                etags[path] = response.headers["etag"]
+        await asyncio.sleep(interval)
+
+
+async def writer(
+    client: httpx.AsyncClient, event_id: int, deadline: float, interval: float
+) -> int:
+    writes = 0
+    while perf_counter() < deadline:
+        await asyncio.sleep(interval)
+        response = await client.patch(
+            f"/api/events/{event_id}", json={"location": f"Bench {writes}"}
+        )
+        _ = response.raise_for_status()
+        writes += 1
+    return writes
+
+
+async def run_mode(args, conditional: bool):
+    paths = [
+        f"/api/events/details?limit={args.limit}",
+        "/api/events?limit=15",
+        f"/api/rsvps/{args.event_id}",
+    ]
+    limits = httpx.Limits(max_connections=args.clients + 1)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as client:
+        counts: dict[int, int] = {}
+        latencies: list[float] = []
+        cpu_before = cpu_seconds(args.server_pid) if args.server_pid else 0.0
+        deadline = perf_counter() + args.duration
+        writes, *_ = await asyncio.gather(
+            writer(client, args.event_id, deadline, args.write_interval),
+            *(
+                poller(client, paths, conditional, deadline, args.poll_interval, counts, latencies)
+                for _ in range(args.clients)
+            ),
+        )
+        cpu_used = cpu_seconds(args.server_pid) - cpu_before if args.server_pid else 0.0
+
+    requests = len(latencies)
+    latencies.sort()
+    mode = "conditional" if conditional else "plain"
+    print(f"[etag_polling] {mode}: {requests} requests, {writes} writes")
+    print(f"[etag_polling]   status counts {dict(sorted(counts.items()))}")
+    print(f"[etag_polling]   304 rate {counts.get(304, 0) / requests:.1%}")
+    print(
+        f"[etag_polling]   latency median {latencies[requests // 2] * 1000:.2f} ms,"
+        + f" p99 {latencies[int(requests * 0.99)] * 1000:.2f} ms"
+    )
+    if args.server_pid:
+        print(
+            f"[etag_polling]   server CPU {cpu_used:.2f}s,"
+            + f" {cpu_used / requests * 1e6:.0f} us/request"
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    _ = parser.add_argument("--url", default="http://localhost:8000")
+    _ = parser.add_argument("--event-id", type=int, required=True)
+    _ = parser.add_argument("--clients", type=int, default=50)
+    _ = parser.add_argument("--limit", type=int, default=50, help="page size polled on /events/details")
+    _ = parser.add_argument("--duration", type=float, default=20)
+    _ = parser.add_argument("--poll-interval", type=float, default=0.2)
+    _ = parser.add_argument("--write-interval", type=float, default=2)
+    _ = parser.add_argument("--server-pid", type=int)
+    args = parser.parse_args()
+
+    await run_mode(args, conditional=False)
+    await run_mode(args, conditional=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+# backend/bench/event_details.py
+# Compares rendering one page of events the old way (list, then RSVPs and
+# winner per event) against the single /api/events/details call, against a
+# running API. From the root directory:
+#   python -m backend.bench.event_details --url http://localhost:8000 --pages 50
+import argparse
+import asyncio
+from time import perf_counter
+
+import httpx
+
+# Browsers open about this many connections per host
+BROWSER_CONNECTIONS = 6
+
+
+async def fan_out(client: httpx.AsyncClient, limit: int) -> int:
+    events = (await client.get("/api/events", params={"limit": limit})).json()["events"]
+    paths = [f"/api/rsvps/{event['id']}" for event in events]
+    paths += [f"/api/events/winner/{event['id']}" for event in events]
+    _ = await asyncio.gather(*(client.get(path) for path in paths))
+    return 1 + len(paths)
+
+
+async def combined(client: httpx.AsyncClient, limit: int) -> int:
+    _ = (await client.get("/api/events/details", params={"limit": limit})).raise_for_status()
+    return 1
+
+
+async def measure(label: str, render, client: httpx.AsyncClient, pages: int, limit: int):
+    timings: list[float] = []
+    requests = 0
+    for _ in range(pages):
+        start = perf_counter()
+        requests += await render(client, limit)
+        timings.append(perf_counter() - start)
+    timings.sort()
+    print(
+        f"[event_details] {label:<10} {requests / pages:5.0f} requests/page, "
+        f"p50 {timings[len(timings) // 2] * 1000:7.2f} ms, "
+        f"p99 {timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000:7.2f} ms"
+    )
+
+
+async def run(url: str, pages: int, limit: int):
+    limits = httpx.Limits(max_connections=BROWSER_CONNECTIONS)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        await measure("fan-out", fan_out, client, pages, limit)
+        await measure("details", combined, client, pages, limit)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    _ = parser.add_argument("--url", default="http://localhost:8000")
+    _ = parser.add_argument("--pages", type=int, default=50)
+    _ = parser.add_argument("--limit", type=int, default=15)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.pages, args.limit))
+
+
+if __name__ == "__main__":
+    main()
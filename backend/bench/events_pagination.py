@@ -0,0 +1,88 @@
+# backend/bench/events_pagination.py
+# Compares the cost of GET /api/events pages at increasing depth, keyset
+# (cursor) pagination against the equivalent OFFSET query, over a large
+# seeded events table. Seeds inside a transaction that is rolled back at the
+# end. From the root directory:
+#   python -m backend.bench.events_pagination --events 1000000
+import argparse
+from time import perf_counter
+
+from ..api import EventsPage, build_events_page_query
+from ..SQL_UTIL.db import POOL
+from ..SQL_UTIL.operations import get_events_query
+
+GENRES = ["Action", "Comedy", "Drama", "Horror", "Sci-Fi", "Romance", "Thriller"]
+
+seed_events = """
+INSERT INTO events (title, genre, date, time, location, author, starts_at)
+SELECT 'Bench ' || n, (%(genres)s::TEXT[])[1 + n %% 7], '', '', 'Bench',
+       'bench-' || (n %% 50), NOW() - n * INTERVAL '1 hour'
+FROM generate_series(1, %(events)s) AS n
+"""
+
+offset_query = """
+SELECT id, title, genre, date, time, location, author
+FROM events
+WHERE {filters}
+ORDER BY id DESC
+OFFSET %s
+LIMIT %s
+"""
+
+
+def timed(conn, query, params, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        _ = conn.execute(query, params).fetchall()
+        best = min(best, perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    _ = parser.add_argument("--events", type=int, default=1_000_000)
+    _ = parser.add_argument("--limit", type=int, default=15)
+    _ = parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with POOL.connection() as conn:
+        with conn.transaction(force_rollback=True):
+            print(f"[events_pagination] Seeding {args.events} events")
+            _ = conn.execute(seed_events, {"events": args.events, "genres": GENRES})
+            _ = conn.execute("ANALYZE events")
+            max_id = conn.execute("SELECT MAX(id) AS id FROM events").fetchone()["id"]
+
+            # Rows already paged past: the first page, powers of ten, the last page
+            depths = [0]
+            while depths[-1] * 10 < args.events:
+                depths.append(depths[-1] * 10 if depths[-1] else 10)
+            depths.append(args.events - args.limit)
+
+            for genre in (None, "Horror"):
+                print(f"[events_pagination] genre={genre}")
+                for depth in depths:
+                    # Rows to skip, for the genre filter only every 7th row matches
+                    skipped = depth // 7 if genre else depth
+                    page = EventsPage(
+                        limit=args.limit,
+                        genre=genre,
+                        cursor=max_id - depth + 1 if depth else None,
+                    )
+                    query, params = build_events_page_query(page, get_events_query)
+                    keyset_ms = timed(conn, query, params, args.repeat)
+
+                    page.cursor = None
+                    query, params = build_events_page_query(page, offset_query)
+                    params.insert(-1, skipped)
+                    offset_ms = timed(conn, query, params, args.repeat)
+
+                    print(
+                        f"[events_pagination] depth {depth:>9}: keyset {keyset_ms:8.3f} ms, offset {offset_ms:8.3f} ms"
+                    )
+
+    POOL.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# backend/bench/explain_due_events.py
+# Checks that the watcher's due-events queries stay index range scans plus an
+# anti-join on event_winners, even with a large events table.
+#
+# Seeds rows inside a transaction that is rolled back at the end, so it can be
+# pointed at a scratch copy of the database. From the root directory:
+#   python -m backend.bench.explain_due_events --events 1000000
+import argparse
+import json
+import sys
+
+from psycopg import Connection
+
+from ..SQL_UTIL.db import POOL
+from ..SQL_UTIL.operations import (
+    claim_due_event_candidates,
+    get_watcher_deadlines,
+)
+
+# Spread the seeded events over roughly two years around now, with a winner
+# for every past event, like a long-running install would have
+seed_events = """
+INSERT INTO events (title, genre, date, time, location, author, starts_at)
+SELECT 'Bench ' || n, 'Action', '', '', 'Bench', 'bench',
+       NOW() - INTERVAL '365 days' + n * (INTERVAL '730 days' / %(events)s)
+FROM generate_series(1, %(events)s) AS n
+"""
+
+seed_rsvps = """
+INSERT INTO rsvps (event_id, author, movie)
+SELECT id, 'bench', 'Bench Movie' FROM events WHERE author = 'bench'
+"""
+
+seed_winners = """
+INSERT INTO event_winners (event_id, rsvp_id, movie, author)
+SELECT r.event_id, r.id, r.movie, r.author
+FROM rsvps r JOIN events e ON e.id = r.event_id
+WHERE e.author = 'bench' AND e.starts_at < NOW()
+"""
+
+
+def plan_node_types(plan: dict) -> list[tuple[str, str | None]]:
+    nodes = [(plan["Node Type"], plan.get("Relation Name"))]
+    for child in plan.get("Plans", []):
+        # Correlated subplans only run for some rows, the candidates' one
+        # only for replays of old events
+        if child.get("Parent Relationship") == "SubPlan":
+            continue
+        nodes += plan_node_types(child)
+    return nodes
+
+
+def explain(
+    conn: Connection, query: str, params: tuple | dict = ()
+) -> list[tuple[str, str | None]]:
+    row = conn.execute(
+        "EXPLAIN (FORMAT JSON) " + query.rstrip().rstrip(";"), params or None
+    ).fetchone()
+    plan = row["QUERY PLAN"][0]["Plan"]
+    print(json.dumps(plan, indent=2))
+    return plan_node_types(plan)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    _ = parser.add_argument("--events", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    failed = False
+    with POOL.connection() as conn:
+        with conn.transaction(force_rollback=True):
+            print(f"[explain_due_events] Seeding {args.events} events")
+            _ = conn.execute(seed_events, {"events": args.events})
+            _ = conn.execute(seed_rsvps)
+            _ = conn.execute(seed_winners)
+            _ = conn.execute("ANALYZE events, rsvps, event_winners")
+
+            for name, query, params in (
+                ("claim_due_event_candidates", claim_due_event_candidates, {"batch_size": 50}),
+                (
+                    "get_watcher_deadlines",
+                    get_watcher_deadlines,
+                    {"due_recheck_seconds": 5, "dispatching": True},
+                ),
+            ):
+                nodes = explain(conn, query, params)
+                if ("Seq Scan", "events") in nodes:
+                    print(f"[explain_due_events] FAIL: {name} scans all of events")
+                    failed = True
+                else:
+                    print(f"[explain_due_events] OK: {name} -> {nodes}")
+
+    POOL.close()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
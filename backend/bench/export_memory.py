@@ -0,0 +1,251 @@
+# backend/bench/export_memory.py
+# Checks that exports (backend/export.py) stream with flat memory. Seeds
+# --events events with --rsvps-per-event RSVPs each (2 million rows by
+# default, every tenth event with a winner), starts the API and exports every
+# dataset in both formats while sampling the API's RSS. Fails when an export
+# grows it by more than --max-growth-mb, when a row is missing, when a client
+# that hangs up halfway keeps the export's connection busy, or when the CLI
+# uses more memory for the biggest table than for the smallest.
+# From the root directory:
+#   python -m backend.bench.export_memory --events 400000 --rsvps-per-event 4
+# Seeding takes a few minutes. The seeded rows are deleted at the end unless
+# --keep is given, and kept rows are reused by the next run.
+import argparse
+import csv
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from time import perf_counter
+
+import httpx
+import psutil
+import psycopg
+from psycopg.rows import dict_row
+
+from ..SQL_UTIL.db import DB_URL
+from .deadlines import server
+
+seed_events = """
+INSERT INTO events (title, genre, date, time, location, author, starts_at)
+SELECT 'Bench export ' || n, 'Action', '1/1/2030', '19:00', 'Bench, "quoted"',
+       'bench-export', NOW() - (n || ' minutes')::INTERVAL
+FROM generate_series(1, %(events)s) AS n
+"""
+
+seed_rsvps = """
+INSERT INTO rsvps (event_id, author, movie, weight)
+SELECT e.id, 'bench-export ' || k, 'Movie ' || k, 1 + k %% 3
+FROM events e, generate_series(1, %(rsvps_per_event)s) AS k
+WHERE e.author = 'bench-export'
+"""
+
+seed_winners = """
+INSERT INTO event_winners (event_id, rsvp_id, movie, author, strategy, seed)
+SELECT DISTINCT ON (r.event_id) r.event_id, r.id, r.movie, r.author, 'weighted', 0
+FROM rsvps r
+JOIN events e ON e.id = r.event_id
+WHERE e.author = 'bench-export' AND e.id %% 10 = 0
+ORDER BY r.event_id, r.id
+"""
+
+count_seeded = "SELECT COUNT(*) AS seeded FROM events WHERE author = 'bench-export'"
+delete_seeded = "DELETE FROM events WHERE author = 'bench-export'"
+
+count_rows = {
+    "events": "SELECT COUNT(*) AS rows FROM events",
+    "rsvps": "SELECT COUNT(*) AS rows FROM rsvps",
+    "winners": "SELECT COUNT(*) AS rows FROM event_winners",
+}
+
+# Export queries still running, DECLARE/FETCH or COPY
+count_exports = """
+SELECT COUNT(*) AS running FROM pg_stat_activity
+WHERE pid <> pg_backend_pid() AND state <> 'idle'
+AND (query LIKE 'COPY (%%' OR query LIKE '%%export_%%')
+"""
+
+
+class RSSSampler:
+    # Peak resident memory of a process, sampled in a thread
+
+    def __init__(self, pid: int, interval: float = 0.02):
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.peak = 0
+        self.running = False
+        self.thread: threading.Thread | None = None
+
+    def rss(self) -> int:
+        return self.process.memory_info().rss
+
+    def run(self):
+        while self.running:
+            try:
+                self.peak = max(self.peak, self.rss())
+            except psutil.NoSuchProcess:
+                return
+            time.sleep(self.interval)
+
+    def start(self):
+        self.peak = self.rss()
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> int:
+        self.running = False
+        if self.thread:
+            self.thread.join()
+        return self.peak
+
+
+def count_exported(path: str, fmt: str) -> int:
+    with open(path, newline="") as f:
+        if fmt == "csv":
+            # Header row, and fields may hold quoted newlines
+            return sum(1 for _ in csv.reader(f)) - 1
+        return sum(1 for _ in f)
+
+
+def api_pid(port: int) -> int:
+    # The uvicorn process listening on port
+    for conn in psutil.net_connections(kind="tcp"):
+        if conn.laddr and conn.laddr.port == port and conn.status == psutil.CONN_LISTEN:
+            return conn.pid
+    raise SystemExit(f"[export_memory] Nothing listens on port {port}")
+
+
+def export_over_http(client: httpx.Client, sampler: RSSSampler, dataset: str, fmt: str, expected: int, args) -> bool:
+    path = os.path.join(args.log_dir, f"{dataset}.{fmt}")
+    baseline = sampler.rss()
+    sampler.start()
+    start = perf_counter()
+    first_byte = None
+    size = 0
+    with client.stream("GET", f"/api/export/{dataset}", params={"format": fmt}) as response:
+        with open(path, "wb") as f:
+            for chunk in response.iter_bytes():
+                if first_byte is None:
+                    first_byte = perf_counter() - start
+                size += len(chunk)
+                _ = f.write(chunk)
+        status = response.status_code
+    elapsed = perf_counter() - start
+    growth = (sampler.stop() - baseline) / 1e6
+    rows = count_exported(path, fmt) if status == 200 else 0
+    os.remove(path)
+
+    print(
+        f"[export_memory] {dataset:<8} {fmt:<6} {rows:>9} rows, {size / 1e6:7.1f} MB in {elapsed:5.1f}s "
+        f"({size / 1e6 / elapsed:6.1f} MB/s, first byte {(first_byte or 0) * 1000:5.0f} ms), "
+        f"API RSS +{growth:5.1f} MB"
+    )
+    ok = True
+    if status != 200 or rows != expected:
+        print(f"[export_memory] FAIL: {dataset} {fmt}: status {status}, {rows} of {expected} rows")
+        ok = False
+    if growth > args.max_growth_mb:
+        print(f"[export_memory] FAIL: {dataset} {fmt} grew the API by more than {args.max_growth_mb} MB")
+        ok = False
+    return ok
+
+
+def hang_up_halfway(client: httpx.Client, args) -> bool:
+    # Read a little of the biggest export and hang up. The export's queries
+    # must stop and the next export must get the slot.
+    with client.stream("GET", "/api/export/rsvps") as response:
+        for _chunk in response.iter_bytes():
+            break
+
+    running = -1
+    for _ in range(50):
+        with psycopg.connect(DB_URL, autocommit=True, row_factory=dict_row) as conn:
+            running = conn.execute(count_exports).fetchone()["running"]
+        if not running:
+            break
+        time.sleep(0.1)
+    status = client.get("/api/export/winners").status_code
+    print(f"[export_memory] Client hung up halfway: export queries still running {running}, next export {status}")
+    if running or status != 200:
+        print("[export_memory] FAIL: the abandoned export was not cleaned up")
+        return False
+    return True
+
+
+def export_with_cli(dataset: str, fmt: str, args) -> int:
+    # Peak RSS of python -m backend.export
+    path = os.path.join(args.log_dir, f"cli-{dataset}.{fmt}")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "backend.export", dataset, "--format", fmt, "--output", path],
+        stderr=subprocess.DEVNULL,
+    )
+    sampler = RSSSampler(process.pid)
+    sampler.start()
+    _ = process.wait()
+    peak = sampler.stop()
+    os.remove(path)
+    print(f"[export_memory] CLI {dataset:<8} {fmt:<6} peak RSS {peak / 1e6:6.1f} MB")
+    return peak
+
+
+def run(args) -> bool:
+    ok = True
+    with psycopg.connect(DB_URL, autocommit=True, row_factory=dict_row) as conn:
+        expected = {dataset: conn.execute(query).fetchone()["rows"] for dataset, query in count_rows.items()}
+
+    with server("api", "backend.api:app", args.port, {}, args.log_dir) as api_url:
+        sampler = RSSSampler(api_pid(args.port))
+        with httpx.Client(base_url=api_url, timeout=120) as client:
+            # Warm up pool connections and imports before measuring
+            _ = client.get("/api/export/winners").raise_for_status()
+            for dataset in ("winners", "events", "rsvps"):
+                for fmt in ("ndjson", "csv"):
+                    ok &= export_over_http(client, sampler, dataset, fmt, expected[dataset], args)
+            ok &= hang_up_halfway(client, args)
+
+    smallest = export_with_cli("winners", "ndjson", args)
+    for fmt in ("ndjson", "csv"):
+        biggest = export_with_cli("rsvps", fmt, args)
+        if (biggest - smallest) / 1e6 > args.max_growth_mb:
+            print(f"[export_memory] FAIL: the CLI needed {(biggest - smallest) / 1e6:.1f} MB more for rsvps")
+            ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    _ = parser.add_argument("--events", type=int, default=400_000)
+    _ = parser.add_argument("--rsvps-per-event", type=int, default=4)
+    _ = parser.add_argument("--max-growth-mb", type=float, default=64)
+    _ = parser.add_argument("--port", type=int, default=8767)
+    _ = parser.add_argument("--keep", action="store_true", help="keep the seeded rows for the next run")
+    args = parser.parse_args()
+
+    with psycopg.connect(DB_URL, autocommit=True, row_factory=dict_row) as conn:
+        if not conn.execute(count_seeded).fetchone()["seeded"]:
+            start = perf_counter()
+            params = {"events": args.events, "rsvps_per_event": args.rsvps_per_event}
+            with conn.transaction():
+                _ = conn.execute(seed_events, params)
+                _ = conn.execute(seed_rsvps, params)
+                _ = conn.execute(seed_winners, {})
+            print(f"[export_memory] Seeded {args.events} events x {args.rsvps_per_event} RSVPs in {perf_counter() - start:.0f}s")
+
+    args.log_dir = tempfile.mkdtemp(prefix="export-memory-")
+    print(f"[export_memory] Logs and exports in {args.log_dir}")
+    try:
+        ok = run(args)
+    finally:
+        if not args.keep:
+            with psycopg.connect(DB_URL, autocommit=True) as conn:
+                _ = conn.execute(delete_seeded)
+
+    print("[export_memory] OK" if ok else "[export_memory] FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
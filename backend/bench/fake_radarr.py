@@ -0,0 +1,124 @@
+# backend/bench/fake_radarr.py
+# Minimal stand-in for the parts of the Radarr v3 API we use, for benchmarks
+# and local testing without a real Radarr. From the root directory:
+#   FAKE_RADARR_LATENCY=0.2 FAKE_RADARR_FAILURE_RATE=0.1 \
+#     uvicorn backend.bench.fake_radarr:app --port 7878
+# then point MOVIE_PICKER_RADARR_URL at http://localhost:7878 (any API key works)
+import asyncio
+import os
+import random
+from time import monotonic
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+# Seconds added to every response, and the share of requests answered with a 503
+LATENCY = float(os.environ.get("FAKE_RADARR_LATENCY", 0))
+FAILURE_RATE = float(os.environ.get("FAKE_RADARR_FAILURE_RATE", 0))
+
+app = FastAPI()
+
+# Request counters, so benchmarks can check how often Radarr was actually hit
+STATS = {
+    "lookup": 0,
+    "add": 0,
+    "rootfolder": 0,
+    "qualityprofile": 0,
+    "library": 0,
+    "failed": 0,
+}
+LIBRARY: dict[int, dict] = {}
+# Add requests per movie title, to spot movies sent more than once
+ADDS_BY_TITLE: dict[str, int] = {}
+# Every request fails with a 503 until then, see POST /outage
+OUTAGE = {"until": 0.0}
+# Most requests handled at the same time, to check client-side rate limits
+CONCURRENCY = {"now": 0, "max": 0}
+
+
+def fake_movie(term: str, index: int) -> dict:
+    tmdb_id = abs(hash((term.casefold(), index))) % 1_000_000
+    return {
+        "title": f"{term.title()} {index}" if index else term.title(),
+        "year": 1980 + tmdb_id % 45,
+        "tmdbId": tmdb_id,
+        "isAvailable": True,
+    }
+
+
+async def simulate():
+    CONCURRENCY["now"] += 1
+    CONCURRENCY["max"] = max(CONCURRENCY["max"], CONCURRENCY["now"])
+    try:
+        if LATENCY:
+            await asyncio.sleep(LATENCY)
+    finally:
+        CONCURRENCY["now"] -= 1
+    if random.random() < FAILURE_RATE or monotonic() < OUTAGE["until"]:
+        STATS["failed"] += 1
+        return JSONResponse(status_code=503, content={"message": "Fake outage"})
+    return None
+
+
+@app.get("/api/v3/movie/lookup")
+async def lookup(term: str):
+    STATS["lookup"] += 1
+    if failure := await simulate():
+        return failure
+    return [fake_movie(term, i) for i in range(10)]
+
+
+@app.get("/api/v3/rootfolder")
+async def rootfolder():
+    STATS["rootfolder"] += 1
+    if failure := await simulate():
+        return failure
+    return [{"path": "/movies"}]
+
+
+@app.get("/api/v3/qualityprofile")
+async def qualityprofile():
+    STATS["qualityprofile"] += 1
+    if failure := await simulate():
+        return failure
+    return [{"id": 1, "name": "Any"}, {"id": 5, "name": "Ultra-HD"}]
+
+
+@app.get("/api/v3/movie")
+async def library():
+    STATS["library"] += 1
+    if failure := await simulate():
+        return failure
+    return list(LIBRARY.values())
+
+
+@app.post("/api/v3/movie")
+async def add_movie(movie: dict):
+    STATS["add"] += 1
+    title = movie.get("title", "")
+    ADDS_BY_TITLE[title] = ADDS_BY_TITLE.get(title, 0) + 1
+    if failure := await simulate():
+        return failure
+    if movie.get("tmdbId") in LIBRARY:
+        return JSONResponse(
+            status_code=400,
+            content=[{"errorCode": "MovieExistsValidator"}],
+        )
+    LIBRARY[movie["tmdbId"]] = movie
+    return JSONResponse(status_code=201, content=movie)
+
+
+@app.post("/outage")
+async def outage(seconds: float):
+    OUTAGE["until"] = monotonic() + seconds
+    return {"outage_seconds": seconds}
+
+
+@app.get("/stats")
+async def stats():
+    return {**STATS, "max_concurrency": CONCURRENCY["max"]}
+
+
+@app.get("/stats/adds")
+async def adds_by_title():
+    return ADDS_BY_TITLE
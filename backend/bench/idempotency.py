@@ -0,0 +1,210 @@
+# backend/bench/idempotency.py
+# Checks Idempotency-Key handling on the create endpoints (backend/idempotency.py)
+# against a running API:
+#   - retries: --keys events are each sent --copies times at once and once
+#     more afterwards with the same key. There must be exactly one event per
+#     key, one answer without Idempotent-Replayed per key, and the same body
+#     for all of them. The same creates without a key are sent for comparison.
+#   - replay latency: a create against the replay of its answer
+#   - a key reused with another body gets 422, a duplicate RSVP without a key
+#     409, and one with the key of the first RSVP its 200 again
+#   - eviction: the API keeps --cache-size keys, so after --keys creates the
+#     first key runs again while the last one is still replayed
+# From the root directory:
+#   python -m backend.bench.idempotency --keys 200 --copies 4
+# The created rows are deleted at the end.
+import argparse
+import asyncio
+import re
+import sys
+import tempfile
+import uuid
+from statistics import median
+from time import perf_counter
+
+import httpx
+import psycopg
+from psycopg.rows import dict_row
+
+from ..SQL_UTIL.db import DB_URL
+from .deadlines import server
+
+BENCH_AUTHOR = "bench-idempotency"
+
+count_created = "SELECT COUNT(*) AS created FROM events WHERE author = %s"
+delete_created = "DELETE FROM events WHERE author LIKE 'bench-idempotency%%'"
+
+IDEMPOTENCY_LINE = re.compile(r'movie_picker_http_idempotency_total\{result="(\w+)",route="(\w+)"\} (\S+)')
+
+
+def event_body(author: str, n: int) -> dict:
+    return {
+        "title": f"Bench idempotency {n}",
+        "genre": "Action",
+        "date": "01/01/2030",
+        "time": "19:00",
+        "location": "Bench",
+        "author": author,
+    }
+
+
+def created(author: str) -> int:
+    with psycopg.connect(DB_URL, autocommit=True, row_factory=dict_row) as conn:
+        return conn.execute(count_created, (author,)).fetchone()["created"]
+
+
+async def post(client: httpx.AsyncClient, path: str, body: dict, key: str | None) -> httpx.Response:
+    headers = {"Idempotency-Key": key} if key else {}
+    return await client.post(path, json=body, headers=headers)
+
+
+async def retries(client: httpx.AsyncClient, args) -> bool:
+    semaphore = asyncio.Semaphore(args.concurrency)
+    keys = [str(uuid.uuid4()) for _ in range(args.keys)]
+
+    async def send(n: int, key: str | None, author: str) -> list[httpx.Response]:
+        async with semaphore:
+            body = event_body(author, n)
+            responses = list(await asyncio.gather(*(post(client, "/api/events", body, key) for _ in range(args.copies))))
+            responses.append(await post(client, "/api/events", body, key))
+            return responses
+
+    ok = True
+    start = perf_counter()
+    answers = await asyncio.gather(*(send(n, key, BENCH_AUTHOR) for n, key in enumerate(keys)))
+    elapsed = perf_counter() - start
+    with_key = created(BENCH_AUTHOR)
+    first_answers = 0
+    for responses in answers:
+        first_answers += sum(1 for r in responses if "idempotent-replayed" not in r.headers)
+        if len({(r.status_code, r.content) for r in responses}) != 1 or responses[0].status_code != 200:
+            ok = False
+
+    no_key_author = f"{BENCH_AUTHOR} no key"
+    _ = await asyncio.gather(*(send(n, None, no_key_author) for n in range(args.keys)))
+    without_key = created(no_key_author)
+
+    sent = args.keys * (args.copies + 1)
+    print(
+        f"[idempotency] {sent} creates for {args.keys} keys in {elapsed:.2f}s: {with_key} events, "
+        f"{first_answers} first answers, the rest replayed or shared. Without a key: {without_key} events"
+    )
+    if with_key != args.keys or first_answers != args.keys:
+        print("[idempotency] FAIL: retries with a key created more than one event, or answered it more than once")
+        ok = False
+    elif not ok:
+        print("[idempotency] FAIL: retries with the same key got different answers")
+    return ok
+
+
+async def replay_latency(client: httpx.AsyncClient, args) -> bool:
+    executed: list[float] = []
+    replayed: list[float] = []
+    for n in range(args.samples):
+        key = str(uuid.uuid4())
+        body = event_body(f"{BENCH_AUTHOR} latency", n)
+        for timings in (executed, replayed):
+            start = perf_counter()
+            _ = (await post(client, "/api/events", body, key)).raise_for_status()
+            timings.append(perf_counter() - start)
+    print(
+        f"[idempotency] Create p50 {median(executed) * 1000:.2f} ms, "
+        f"replay p50 {median(replayed) * 1000:.2f} ms over {args.samples} keys"
+    )
+    return True
+
+
+async def conflicts(client: httpx.AsyncClient) -> bool:
+    key = str(uuid.uuid4())
+    body = event_body(f"{BENCH_AUTHOR} conflicts", 0)
+    first = await post(client, "/api/events", body, key)
+    event_id = int(re.search(r"`(\d+)`", first.json()["message"]).group(1))
+    reused = await post(client, "/api/events", {**body, "title": "Another title"}, key)
+
+    rsvp = {"event_id": event_id, "author": BENCH_AUTHOR, "movie": "Bench Movie"}
+    rsvp_key = str(uuid.uuid4())
+    rsvp_first = await post(client, "/api/rsvps", rsvp, rsvp_key)
+    duplicate = await post(client, "/api/rsvps", rsvp, None)
+    retried = await post(client, "/api/rsvps", rsvp, rsvp_key)
+    too_long = await post(client, "/api/rsvps", rsvp, "k" * 256)
+
+    print(
+        f"[idempotency] Key reused for another body {reused.status_code}, RSVP {rsvp_first.status_code}, "
+        f"duplicate RSVP without a key {duplicate.status_code}, retried with its key {retried.status_code}, "
+        f"key too long {too_long.status_code}"
+    )
+    ok = (
+        reused.status_code == 422
+        and rsvp_first.status_code == 200
+        and duplicate.status_code == 409
+        and retried.status_code == 200
+        and retried.content == rsvp_first.content
+        and too_long.status_code == 400
+    )
+    if not ok:
+        print("[idempotency] FAIL: unexpected status or body")
+    return ok
+
+
+async def eviction(client: httpx.AsyncClient, args) -> bool:
+    author = f"{BENCH_AUTHOR} eviction"
+    keys = [str(uuid.uuid4()) for _ in range(args.cache_size + 1)]
+    for n, key in enumerate(keys):
+        _ = (await post(client, "/api/events", event_body(author, n), key)).raise_for_status()
+    last = await post(client, "/api/events", event_body(author, len(keys) - 1), keys[-1])
+    first = await post(client, "/api/events", event_body(author, 0), keys[0])
+    last_replayed = "idempotent-replayed" in last.headers
+    first_replayed = "idempotent-replayed" in first.headers
+    print(
+        f"[idempotency] {len(keys)} keys for a store of {args.cache_size}: "
+        f"last key replayed {last_replayed}, first key replayed {first_replayed}"
+    )
+    if not last_replayed or first_replayed:
+        print("[idempotency] FAIL: the store didn't evict its oldest key")
+        return False
+    return True
+
+
+async def run(url: str, args) -> bool:
+    ok = True
+    async with httpx.AsyncClient(base_url=url, timeout=30) as client:
+        ok &= await retries(client, args)
+        ok &= await replay_latency(client, args)
+        ok &= await conflicts(client)
+        ok &= await eviction(client, args)
+        metrics = (await client.get("/metrics")).text
+    results = {
+        f"{route} {result}": float(value)
+        for result, route, value in IDEMPOTENCY_LINE.findall(metrics)
+    }
+    print("[idempotency] Outcomes: " + ", ".join(f"{k} {v:.0f}" for k, v in sorted(results.items())))
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    _ = parser.add_argument("--keys", type=int, default=200)
+    _ = parser.add_argument("--copies", type=int, default=4, help="sent at once per key, then one more retry")
+    _ = parser.add_argument("--concurrency", type=int, default=16, help="keys in flight at once")
+    _ = parser.add_argument("--samples", type=int, default=100, help="keys timed for the replay latency")
+    _ = parser.add_argument("--cache-size", type=int, default=1000, help="the API's MOVIE_PICKER_IDEMPOTENCY_CACHE_SIZE")
+    _ = parser.add_argument("--port", type=int, default=8769)
+    args = parser.parse_args()
+    if args.cache_size < args.keys + args.samples + 1:
+        raise SystemExit("[idempotency] --cache-size must hold the keys of the retry and latency phases")
+
+    log_dir = tempfile.mkdtemp(prefix="idempotency-")
+    env = {"MOVIE_PICKER_IDEMPOTENCY_CACHE_SIZE": str(args.cache_size)}
+    try:
+        with server("api", "backend.api:app", args.port, env, log_dir) as url:
+            ok = asyncio.run(run(url, args))
+    finally:
+        with psycopg.connect(DB_URL, autocommit=True) as conn:
+            _ = conn.execute(delete_created)
+
+    print("[idempotency] OK" if ok else "[idempotency] FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
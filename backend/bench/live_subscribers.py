@@ -0,0 +1,89 @@
+# backend/bench/live_subscribers.py
+# Opens many /api/live (SSE) subscribers against a running API, triggers a
+# change and measures how long it takes to reach all of them. With
+# --server-pid (same host) it also reports the server's memory per
+# subscriber. From the root directory:
+#   python -m backend.bench.live_subscribers --url http://localhost:8000 \
+#     --subscribers 2000 --event-id 1 --server-pid $(pgrep -f uvicorn)
+# Needs a file descriptor limit above the subscriber count (ulimit -n).
+import argparse
+import asyncio
+from time import perf_counter
+
+import httpx
+
+
+def rss_kib(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+async def subscriber(
+    client: httpx.AsyncClient,
+    connected: asyncio.Event,
+    ready: list[int],
+    total: int,
+    received: list[float],
+):
+    async with client.stream("GET", "/api/live") as response:
+        async for line in response.aiter_lines():
+            if line.startswith("retry:"):
+                ready.append(1)
+                if len(ready) == total:
+                    connected.set()
+            elif line.startswith("data:"):
+                received.append(perf_counter())
+                return
+
+
+async def run(url: str, subscribers: int, event_id: int, server_pid: int | None):
+    limits = httpx.Limits(max_connections=subscribers + 1)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=None) as client:
+        rss_before = rss_kib(server_pid) if server_pid else 0
+
+        connected = asyncio.Event()
+        ready: list[int] = []
+        received: list[float] = []
+        start = perf_counter()
+        tasks = [
+            asyncio.create_task(subscriber(client, connected, ready, subscribers, received))
+            for _ in range(subscribers)
+        ]
+        await connected.wait()
+        print(f"[live_subscribers] {subscribers} subscribers connected in {perf_counter() - start:.2f}s")
+
+        stats = (await client.get("/api/live/stats")).json()
+        print(f"[live_subscribers] Server reports {stats['subscribers']} subscribers")
+        if server_pid:
+            rss_after = rss_kib(server_pid)
+            per_subscriber = (rss_after - rss_before) * 1024 / subscribers
+            print(f"[live_subscribers] Server RSS {rss_before} KiB -> {rss_after} KiB")
+            print(f"[live_subscribers] ~{per_subscriber:.0f} bytes per subscriber")
+
+        # Any update fires the events trigger, even to the same value
+        sent = perf_counter()
+        event = await client.patch(f"/api/events/{event_id}", json={"location": "Bench"})
+        _ = event.raise_for_status()
+        _ = await asyncio.gather(*tasks)
+        latencies = sorted(t - sent for t in received)
+        print(f"[live_subscribers] Fan-out to {len(latencies)} subscribers:")
+        print(f"[live_subscribers]   first {latencies[0] * 1000:.1f} ms")
+        print(f"[live_subscribers]   median {latencies[len(latencies) // 2] * 1000:.1f} ms")
+        print(f"[live_subscribers]   last {latencies[-1] * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    _ = parser.add_argument("--url", default="http://localhost:8000")
+    _ = parser.add_argument("--subscribers", type=int, default=1000)
+    _ = parser.add_argument("--event-id", type=int, required=True)
+    _ = parser.add_argument("--server-pid", type=int)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.subscribers, args.event_id, args.server_pid))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# backend/bench/load_api.py
+# Concurrent load benchmark for the read routes of backend/api.py
+#
+# Start the API against a populated database, then run from the root directory:
+#   python -m backend.bench.load_api --url http://localhost:8000 --clients 100
+# Run it on two commits at the same concurrency to compare p50/p99 latency.
+import argparse
+import asyncio
+from time import perf_counter
+
+import httpx
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, round(pct / 100 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+async def client_loop(
+    client: httpx.AsyncClient,
+    paths: list[str],
+    requests_per_client: int,
+    latencies: list[float],
+    errors: list[int],
+):
+    for i in range(requests_per_client):
+        path = paths[i % len(paths)]
+        start = perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 500:
+                errors.append(response.status_code)
+        except httpx.HTTPError:
+            errors.append(0)
+        latencies.append(perf_counter() - start)
+
+
+async def run(url: str, clients: int, requests_per_client: int):
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        # Build the request mix from whatever events exist in the database
+        events = (await client.get("/api/events")).json()["events"]
+        paths = ["/api/health", "/api/events"]
+        paths += [f"/api/rsvps/{event['id']}" for event in events]
+        paths += [f"/api/events/winner/{event['id']}" for event in events]
+
+        latencies: list[float] = []
+        errors: list[int] = []
+        start = perf_counter()
+        await asyncio.gather(
+            *(
+                client_loop(client, paths, requests_per_client, latencies, errors)
+                for _ in range(clients)
+            )
+        )
+        elapsed = perf_counter() - start
+
+    latencies.sort()
+    print(f"[load_api] {clients} clients x {requests_per_client} requests")
+    print(f"[load_api] Throughput: {len(latencies) / elapsed:.1f} req/s")
+    print(f"[load_api] p50: {percentile(latencies, 50) * 1000:.2f} ms")
+    print(f"[load_api] p99: {percentile(latencies, 99) * 1000:.2f} ms")
+    print(f"[load_api] Errors: {len(errors)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    _ = parser.add_argument("--url", default="http://localhost:8000")
+    _ = parser.add_argument("--clients", type=int, default=100)
+    _ = parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.clients, args.requests))
+
+
+if __name__ == "__main__":
+    main()
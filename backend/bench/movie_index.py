@@ -0,0 +1,108 @@
+# backend/bench/movie_index.py
+# Autocomplete and tmdbId resolution latency of the local movie index:
+#   - MovieIndex built from a synthetic catalog, searched with prefixes of
+#     its titles as users type them
+#   - get_movie_by_title_key against the movies table, seeded inside a
+#     transaction that is rolled back at the end
+# From the root directory:
+#   python -m backend.bench.movie_index --movies 100000
+import argparse
+import random
+from statistics import quantiles
+from time import perf_counter
+
+from ..movie_index import MovieIndex, movie_rows, title_key
+from ..SQL_UTIL.db import POOL
+from ..SQL_UTIL.operations import get_movie_by_title_key, upsert_movies
+
+WORDS = (
+    "star wars trek dark knight return of the jedi alien matrix godfather part "
+    "back to future jurassic park world inside out into wild night day last "
+    "first lost city king queen dead man woman love story house fire ice blood "
+    "moon sun river road home war peace time machine ghost empire strikes"
+).split()
+
+
+def catalog(movies: int, rng: random.Random) -> list[dict]:
+    return [
+        {
+            "tmdbId": tmdb_id,
+            "title": " ".join(rng.choice(WORDS).title() for _ in range(rng.randint(1, 5))),
+            "year": rng.randint(1930, 2025),
+            "isAvailable": True,
+        }
+        for tmdb_id in range(10_000_000, 10_000_000 + movies)
+    ]
+
+
+def percentiles(samples: list[float]) -> str:
+    cuts = quantiles(samples, n=100)
+    return f"p50 {cuts[49] * 1e6:.1f} us, p99 {cuts[98] * 1e6:.1f} us"
+
+
+def bench_index(results: list[dict], searches: int, rng: random.Random):
+    index = MovieIndex()
+    start = perf_counter()
+    index.add(movie_rows(results))
+    print(f"[movie_index] Built an index of {len(index)} movies in {perf_counter() - start:.2f}s")
+
+    terms = []
+    for _ in range(searches):
+        title = rng.choice(results)["title"]
+        terms.append(title[: rng.randint(1, len(title))])
+    timings = []
+    for term in terms:
+        start = perf_counter()
+        _ = index.search(term, 5)
+        timings.append(perf_counter() - start)
+    print(f"[movie_index] {searches} prefix searches: {percentiles(timings)}")
+
+    start = perf_counter()
+    index.add(movie_rows(catalog(10, random.Random(2))))
+    print(f"[movie_index] Adding 10 lookup results to it: {(perf_counter() - start) * 1000:.2f} ms")
+
+
+def bench_resolve(results: list[dict], lookups: int, rng: random.Random):
+    rows = movie_rows(results)
+    with POOL.connection() as conn:
+        with conn.transaction(force_rollback=True):
+            _ = conn.execute(
+                upsert_movies,
+                {
+                    "tmdb_ids": [row["tmdb_id"] for row in rows],
+                    "titles": [row["title"] for row in rows],
+                    "title_keys": [row["title_key"] for row in rows],
+                    "years": [row["year"] for row in rows],
+                    "is_available": [row["is_available"] for row in rows],
+                    "in_library": False,
+                },
+            )
+            _ = conn.execute("ANALYZE movies")
+            timings = []
+            for _ in range(lookups):
+                title = rng.choice(results)["title"]
+                start = perf_counter()
+                row = conn.execute(get_movie_by_title_key, (title_key(title),)).fetchone()
+                timings.append(perf_counter() - start)
+                assert row is not None
+    print(f"[movie_index] {lookups} tmdbId resolutions from the movies table: {percentiles(timings)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    _ = parser.add_argument("--movies", type=int, default=100_000)
+    _ = parser.add_argument("--searches", type=int, default=10_000)
+    _ = parser.add_argument("--lookups", type=int, default=2000)
+    _ = parser.add_argument("--no-db", action="store_true")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    results = catalog(args.movies, rng)
+    bench_index(results, args.searches, rng)
+    if not args.no_db:
+        bench_resolve(results, args.lookups, rng)
+    POOL.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# backend/bench/movie_search_trace.py
+# Replays a typing trace through the movie search path and counts how many
+# lookups reach Radarr with and without the search cache. Runs in-process
+# against a stub Radarr, from the root directory:
+#   python -m backend.bench.movie_search_trace --users 50
+import argparse
+import asyncio
+import random
+
+from ..movie_search import LOOKUP_CACHE, search_cache_stats, search_movies
+
+# The frontend debounces keystrokes by this long before searching
+DEBOUNCE_SECONDS = 0.1
+# Simulated Radarr lookup latency
+LOOKUP_LATENCY_SECONDS = 0.05
+
+CATALOG = [
+    "Star Wars", "Star Trek", "Star Trek Into Darkness", "Stardust", "Starship Troopers",
+    "A Star Is Born", "Stargate", "Star Wars: The Empire Strikes Back",
+    "Star Wars: Return of the Jedi", "Star Wars: A New Hope", "Star Trek Beyond",
+    "The Matrix", "The Matrix Reloaded", "The Matrix Revolutions", "The Matrix Resurrections",
+    "The Dark Knight", "The Dark Knight Rises", "The Departed", "The Godfather",
+    "The Godfather Part II", "The Godfather Part III", "The Good, the Bad and the Ugly",
+    "Alien", "Aliens", "Alien 3", "Alien: Resurrection", "Alien: Covenant", "Alien: Romulus",
+    "Back to the Future", "Back to the Future Part II", "Back to the Future Part III",
+    "Jurassic Park", "Jurassic World", "Jurassic World: Dominion", "Jaws", "Jaws 2",
+    "Inception", "Interstellar", "Insomnia", "Inside Out", "Inside Out 2", "Into the Wild",
+    "Pulp Fiction", "Paddington", "Paddington 2", "Parasite", "Past Lives", "Prisoners",
+]
+
+
+class StubRadarr:
+    configured = True
+
+    def __init__(self):
+        self.calls = 0
+
+    async def lookup(self, term: str) -> list[dict]:
+        self.calls += 1
+        await asyncio.sleep(LOOKUP_LATENCY_SECONDS)
+        words = term.split()
+        return [
+            {"title": title, "tmdbId": tmdb_id, "year": 2000}
+            for tmdb_id, title in enumerate(CATALOG, start=1)
+            if all(word in title.casefold() for word in words)
+        ]
+
+
+def typing_trace(rng: random.Random) -> list[tuple[float, str]]:
+    # (delay before keystroke, text typed so far) for one user, with a typo
+    # and a backspace now and then
+    title = rng.choice(CATALOG)
+    target = title.casefold()[: rng.randint(4, len(title))]
+    trace: list[tuple[float, str]] = []
+    typed = ""
+    for char in target:
+        if rng.random() < 0.05:
+            trace.append((rng.uniform(0.05, 0.25), typed + "x"))
+        typed += char
+        trace.append((rng.uniform(0.05, 0.25), typed))
+    return trace
+
+
+async def replay(user_trace: list[tuple[float, str]], search, searches: list[str]):
+    # Mirror the frontend's debounce: only search once typing pauses
+    pending: asyncio.Task | None = None
+    for delay, text in user_trace:
+        if pending and not pending.done():
+            _ = pending.cancel()
+        pending = asyncio.create_task(debounced(text, search, searches))
+        await asyncio.sleep(delay)
+    if pending:
+        await asyncio.gather(pending, return_exceptions=True)
+
+
+async def debounced(text: str, search, searches: list[str]):
+    await asyncio.sleep(DEBOUNCE_SECONDS)
+    searches.append(text)
+    _ = await search(text)
+
+
+async def run(users: int, seed: int):
+    rng = random.Random(seed)
+    traces = [typing_trace(rng) for _ in range(users)]
+
+    # Without the cache every debounced search is a Radarr lookup
+    uncached = StubRadarr()
+    searches: list[str] = []
+    await asyncio.gather(*(replay(trace, uncached.lookup, searches) for trace in traces))
+
+    LOOKUP_CACHE.clear()
+    cached = StubRadarr()
+    cached_searches: list[str] = []
+    await asyncio.gather(
+        *(
+            replay(trace, lambda text: search_movies(cached, text), cached_searches)
+            for trace in traces
+        )
+    )
+
+    print(f"[movie_search_trace] {users} users, {len(searches)} debounced searches")
+    print(f"[movie_search_trace] Radarr lookups without cache: {uncached.calls}")
+    print(f"[movie_search_trace] Radarr lookups with cache: {cached.calls}")
+    print(f"[movie_search_trace] Cache stats: {search_cache_stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    _ = parser.add_argument("--users", type=int, default=50)
+    _ = parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(run(args.users, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# backend/bench/multi_watcher.py
+# Runs several watcher replicas against the database and a fake Radarr,
+# seeds due events and checks that every event gets exactly one winner and
+# every winner exactly one Radarr add. With --kill-one a replica is killed
+# mid-run and the others have to take over its claims. Start
+# backend/bench/fake_radarr.py first, then from the root directory:
+#   python -m backend.bench.multi_watcher --watchers 4 --events 200 \
+#     --radarr-url http://localhost:7878
+# Seeded rows are deleted again at the end.
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from ..SQL_UTIL.db import POOL
+
+seed_events = """
+WITH new_events AS (
+  INSERT INTO events (title, genre, date, time, location, author, starts_at)
+  SELECT 'Bench ' || n, 'Action', '', '', 'Bench', 'bench-watchers',
+         NOW() + INTERVAL '30 minutes'
+  FROM generate_series(1, %s) AS n
+  RETURNING id
+)
+INSERT INTO rsvps (event_id, author, movie)
+SELECT id, 'bench ' || k, 'Watchers Movie ' || id || ' ' || k
+FROM new_events, generate_series(1, 3) AS k
+"""
+
+count_progress = """
+SELECT COUNT(DISTINCT e.id) AS events,
+       COUNT(w.event_id) AS winners,
+       COUNT(w.event_id) FILTER (WHERE w.radarr_status = 'sent') AS sent
+FROM events e
+LEFT JOIN event_winners w ON w.event_id = e.id
+WHERE e.author = 'bench-watchers'
+"""
+
+get_seeded_winners = """
+SELECT w.event_id, w.movie
+FROM event_winners w JOIN events e ON e.id = w.event_id
+WHERE e.author = 'bench-watchers'
+"""
+
+# The movies dispatch looked up (and saved to the movies table) go too
+delete_seeded = """
+DELETE FROM events WHERE author = 'bench-watchers';
+DELETE FROM movies WHERE title LIKE 'Watchers Movie %'
+"""
+
+
+def start_watchers(args, log_dir: str) -> list[subprocess.Popen]:
+    watchers = []
+    for i in range(args.watchers):
+        env = {
+            **os.environ,
+            "MOVIE_PICKER_RADARR_URL": args.radarr_url,
+            "MOVIE_PICKER_RADARR_API_KEY": "bench",
+            "MOVIE_PICKER_WATCHER_METRICS_PORT": str(args.metrics_port + i),
+            "MOVIE_PICKER_DISPATCH_LEASE_SECONDS": str(args.lease_seconds),
+            # Unthrottled: at the default rate a batch takes longer than the
+            # short lease and peers would resend it
+            "MOVIE_PICKER_RADARR_RATE": "1000",
+            "MOVIE_PICKER_RADARR_BURST": "1000",
+        }
+        log = open(os.path.join(log_dir, f"watcher-{i}.log"), "w")
+        watchers.append(
+            subprocess.Popen(
+                [sys.executable, "-m", "backend.watcher"],
+                env=env,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+            )
+        )
+    return watchers
+
+
+def wait_for_dispatch(events: int, timeout: float) -> dict:
+    deadline = time.monotonic() + timeout
+    with POOL.connection() as conn:
+        while True:
+            progress = conn.execute(count_progress).fetchone()
+            conn.commit()
+            if progress["sent"] >= events or time.monotonic() > deadline:
+                return progress
+            time.sleep(0.5)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    _ = parser.add_argument("--watchers", type=int, default=4)
+    _ = parser.add_argument("--events", type=int, default=200)
+    _ = parser.add_argument("--radarr-url", default="http://localhost:7878")
+    _ = parser.add_argument("--metrics-port", type=int, default=9200)
+    _ = parser.add_argument("--lease-seconds", type=int, default=10)
+    _ = parser.add_argument("--kill-one", action="store_true")
+    _ = parser.add_argument("--kill-after", type=float, default=0.7)
+    _ = parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    with POOL.connection() as conn:
+        _ = conn.execute(delete_seeded)
+
+    log_dir = tempfile.mkdtemp(prefix="multi_watcher_")
+    print(f"[multi_watcher] Starting {args.watchers} watchers, logs in {log_dir}")
+    watchers = start_watchers(args, log_dir)
+    failed = False
+    try:
+        # Let every replica reach its LISTEN before the events show up
+        time.sleep(3)
+        start = time.monotonic()
+        with POOL.connection() as conn:
+            _ = conn.execute(seed_events, (args.events,))
+        print(f"[multi_watcher] Seeded {args.events} due events")
+
+        if args.kill_one:
+            time.sleep(args.kill_after)
+            watchers[0].send_signal(signal.SIGKILL)
+            print("[multi_watcher] Killed watcher 0")
+
+        progress = wait_for_dispatch(args.events, args.timeout)
+        elapsed = time.monotonic() - start
+        print(
+            f"[multi_watcher] {progress['winners']} winners, {progress['sent']} sent"
+            + f" for {progress['events']} events in {elapsed:.1f}s"
+        )
+
+        with POOL.connection() as conn:
+            winners = conn.execute(get_seeded_winners).fetchall()
+        adds = httpx.get(f"{args.radarr_url}/stats/adds").json()
+        # The fake Radarr names movies after the lookup term, title-cased
+        add_counts = [adds.get(winner["movie"].title(), 0) for winner in winners]
+        duplicates = sum(count - 1 for count in add_counts if count > 1)
+        missing = sum(1 for count in add_counts if count == 0)
+        print(f"[multi_watcher] Radarr adds: {sum(add_counts)}, duplicates {duplicates}, missing {missing}")
+
+        if progress["winners"] != args.events:
+            print("[multi_watcher] FAIL: not every event got exactly one winner")
+            failed = True
+        if missing or progress["sent"] != args.events:
+            print("[multi_watcher] FAIL: not every winner was sent to Radarr")
+            failed = True
+        if duplicates and not args.kill_one:
+            # A killed replica may have sent movies it never recorded, those
+            # get sent again once its lease expires
+            print("[multi_watcher] FAIL: some winners were sent more than once")
+            failed = True
+        if not failed:
+            print("[multi_watcher] OK")
+    finally:
+        for watcher in watchers:
+            watcher.terminate()
+        for watcher in watchers:
+            _ = watcher.wait()
+        with POOL.connection() as conn:
+            _ = conn.execute(delete_seeded)
+        POOL.close()
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# backend/bench/online_migration.py
+# How long RSVP writes stall while the schema changes under them. A writer
+# thread keeps updating random seeded RSVPs while
+#   - an index is built with plain CREATE INDEX, then with the migrations'
+#     ConcurrentIndex step
+#   - every seeded RSVP is updated in one statement, then with the
+#     migrations' Backfill step
+# and the slowest write of each phase is reported. Also checks that
+# ConcurrentIndex replaces an invalid index left by a failed build.
+#
+# Seeded rows and bench indexes are removed at the end. From the root
+# directory:
+#   python -m backend.bench.online_migration --rsvps 500000
+import argparse
+import random
+import threading
+import time
+from time import perf_counter
+
+from ..SQL_UTIL.db import POOL
+from ..SQL_UTIL.migrations import Backfill, ConcurrentIndex, connect
+
+seed_rsvps = """
+WITH new_events AS (
+  INSERT INTO events (title, genre, date, time, location, author, starts_at)
+  SELECT 'Bench ' || n, 'Action', '', '', 'Bench', 'bench-migration', NOW() - INTERVAL '1 day'
+  FROM generate_series(1, %(events)s) AS n
+  RETURNING id
+)
+INSERT INTO rsvps (event_id, author, movie)
+SELECT id, 'bench-migration ' || k, 'Migration Movie ' || k
+FROM new_events, generate_series(1, %(per_event)s) AS k
+"""
+
+get_seeded_rsvp_ids = """
+SELECT r.id FROM rsvps r JOIN events e ON e.id = r.event_id
+WHERE e.author = 'bench-migration'
+"""
+
+touch_rsvp = "UPDATE rsvps SET weight = weight WHERE id = %s"
+
+bench_index = "bench_migration_movie_idx"
+create_plain_index = f"CREATE INDEX {bench_index} ON rsvps (movie)"
+create_concurrent_index = f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {bench_index} ON rsvps (movie)"
+# Fails on the duplicate movies and leaves an invalid index behind
+create_failing_index = f"CREATE UNIQUE INDEX CONCURRENTLY {bench_index} ON rsvps (movie)"
+drop_bench_index = f"DROP INDEX CONCURRENTLY IF EXISTS {bench_index}"
+get_bench_index_validity = f"""
+SELECT i.indisvalid AS valid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+WHERE c.relname = '{bench_index}'
+"""
+
+update_all = """
+UPDATE rsvps SET weight = 2
+WHERE event_id IN (SELECT id FROM events WHERE author = 'bench-migration')
+AND weight IS DISTINCT FROM 2
+"""
+
+update_batch = """
+UPDATE rsvps SET weight = 3
+WHERE id IN (
+  SELECT r.id FROM rsvps r JOIN events e ON e.id = r.event_id
+  WHERE e.author = 'bench-migration' AND r.weight IS DISTINCT FROM 3
+  LIMIT %(batch_size)s
+  FOR UPDATE OF r SKIP LOCKED
+)
+"""
+
+delete_seeded = "DELETE FROM events WHERE author = 'bench-migration'"
+
+
+class Writer(threading.Thread):
+    # Updates random seeded RSVPs back to back, one transaction each
+
+    def __init__(self, rsvp_ids: list[int]):
+        super().__init__(daemon=True)
+        self.rsvp_ids = rsvp_ids
+        self.stop = threading.Event()
+        # (start, end) of every write, and the start of the latest one
+        self.writes: list[tuple[float, float]] = []
+        self.last_start = 0.0
+
+    def run(self):
+        rng = random.Random(1)
+        with connect() as conn:
+            while not self.stop.is_set():
+                self.last_start = start = perf_counter()
+                _ = conn.execute(touch_rsvp, (rng.choice(self.rsvp_ids),))
+                self.writes.append((start, perf_counter()))
+
+    def measure(self, phase: str, change):
+        start = perf_counter()
+        change()
+        end = perf_counter()
+        # A write blocked by the change finishes after it, wait for it
+        while self.last_start < end:
+            time.sleep(0.01)
+        overlapping = [w_end - w_start for w_start, w_end in self.writes if w_end >= start and w_start <= end]
+        slowest = max(overlapping) * 1000 if overlapping else 0.0
+        print(f"[online_migration] {phase}: {end - start:.2f}s, {len(overlapping)} writes meanwhile, slowest {slowest:.1f} ms")
+
+
+def run(rsvps: int, per_event: int) -> bool:
+    ok = True
+    with POOL.connection() as conn:
+        _ = conn.execute(delete_seeded)
+        _ = conn.execute(seed_rsvps, {"events": rsvps // per_event, "per_event": per_event})
+        _ = conn.execute("ANALYZE rsvps, events")
+        rsvp_ids = [row["id"] for row in conn.execute(get_seeded_rsvp_ids).fetchall()]
+    print(f"[online_migration] Seeded {len(rsvp_ids)} RSVPs")
+
+    writer = Writer(rsvp_ids)
+    writer.start()
+    try:
+        with connect() as conn:
+            writer.measure("Plain CREATE INDEX", lambda: conn.execute(create_plain_index))
+            _ = conn.execute(drop_bench_index)
+            step = ConcurrentIndex(bench_index, create_concurrent_index)
+            writer.measure("ConcurrentIndex step", lambda: step.run(conn))
+            _ = conn.execute(drop_bench_index)
+
+            # An interrupted build: the step has to drop it and build again
+            try:
+                _ = conn.execute(create_failing_index)
+            except Exception as e:
+                print(f"[online_migration] Failed build as expected: {type(e).__name__}")
+            step.run(conn)
+            valid = conn.execute(get_bench_index_validity).fetchone()
+            if not valid or not valid["valid"]:
+                print("[online_migration] FAIL: the invalid index was not rebuilt")
+                ok = False
+            else:
+                print("[online_migration] Invalid index left by the failed build was rebuilt")
+            _ = conn.execute(drop_bench_index)
+
+            writer.measure("One UPDATE of every row", lambda: conn.execute(update_all))
+            writer.measure("Backfill step", lambda: Backfill(update_batch).run(conn))
+    finally:
+        writer.stop.set()
+        writer.join()
+        with POOL.connection() as conn:
+            _ = conn.execute(delete_seeded)
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    _ = parser.add_argument("--rsvps", type=int, default=500_000)
+    _ = parser.add_argument("--per-event", type=int, default=10)
+    args = parser.parse_args()
+    ok = run(args.rsvps, args.per_event)
+    POOL.close()
+    print("[online_migration] OK" if ok else "[online_migration] FAIL")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
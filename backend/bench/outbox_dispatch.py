@@ -0,0 +1,184 @@
+# backend/bench/outbox_dispatch.py
+# Checks the outbox dispatch stage against a (fake) Radarr:
+#   - every winner gets exactly one outbox job, in the winner's transaction
+#   - no transaction stays open while Radarr is slow
+#   - jobs claimed by a dispatcher that dies are sent once its lease expires
+#   - a job sent again (completion lost) doesn't add the movie twice
+# Start backend/bench/fake_radarr.py with some latency first, then from the
+# root directory:
+#   FAKE_RADARR_LATENCY=0.2 uvicorn backend.bench.fake_radarr:app --port 7878
+#   MOVIE_PICKER_RADARR_URL=http://localhost:7878 MOVIE_PICKER_RADARR_API_KEY=x \
+#     python -m backend.bench.outbox_dispatch --winners 100
+# Seeded rows are deleted again at the end.
+import argparse
+import asyncio
+import sys
+
+import httpx
+import psycopg
+
+from ..dispatch import claim_jobs, dispatch_pending
+from ..radarr import RADARR_URL, RadarrClient
+from ..SQL_UTIL.db import ASYNC_POOL, DB_URL, close_async_pool, open_async_pool
+from ..SQL_UTIL.operations import complete_outbox_job, radarr_add_job
+
+seed_winners = """
+WITH new_events AS (
+  INSERT INTO events (title, genre, date, time, location, author, starts_at)
+  SELECT 'Bench ' || n, 'Action', '', '', 'Bench', 'bench-outbox',
+         NOW() - INTERVAL '1 day'
+  FROM generate_series(1, %s) AS n
+  RETURNING id
+), new_rsvps AS (
+  INSERT INTO rsvps (event_id, author, movie)
+  SELECT id, 'bench', 'Outbox Movie ' || id FROM new_events
+  RETURNING id, event_id, author, movie
+)
+INSERT INTO event_winners (event_id, rsvp_id, movie, author)
+SELECT event_id, id, movie, author FROM new_rsvps
+"""
+
+count_jobs = """
+SELECT COUNT(*) AS jobs,
+       COUNT(*) FILTER (WHERE o.status = 'done') AS done,
+       COUNT(DISTINCT o.event_id) AS events
+FROM outbox o JOIN events e ON e.id = o.event_id
+WHERE e.author = 'bench-outbox'
+"""
+
+reset_done_jobs = """
+UPDATE outbox SET status = 'pending', processed_at = NULL
+WHERE id IN (
+  SELECT o.id FROM outbox o JOIN events e ON e.id = o.event_id
+  WHERE e.author = 'bench-outbox' AND o.status = 'done'
+  ORDER BY o.id
+  LIMIT %s
+)
+RETURNING id, payload
+"""
+
+# Longest open transaction of any other client right now
+longest_transaction = """
+SELECT COALESCE(MAX(EXTRACT(EPOCH FROM (CLOCK_TIMESTAMP() - xact_start))), 0)::FLOAT8 AS seconds
+FROM pg_stat_activity
+WHERE datname = CURRENT_DATABASE()
+AND backend_type = 'client backend'
+AND pid <> PG_BACKEND_PID()
+AND xact_start IS NOT NULL
+"""
+
+# The movies dispatch looked up (and saved to the movies table) go too
+delete_seeded = """
+DELETE FROM events WHERE author = 'bench-outbox';
+DELETE FROM movies WHERE title LIKE 'Outbox Movie %'
+"""
+
+
+async def fetch_one(query: str, params: tuple = ()) -> dict:
+    async with ASYNC_POOL.connection() as conn:
+        async with conn.cursor() as cur:
+            _ = await cur.execute(query, params or None)
+            return await cur.fetchone()
+
+
+async def sample_transactions(stop: asyncio.Event) -> float:
+    longest = 0.0
+    async with await psycopg.AsyncConnection.connect(DB_URL, autocommit=True) as conn:
+        while not stop.is_set():
+            row = await (await conn.execute(longest_transaction)).fetchone()
+            longest = max(longest, row[0])
+            await asyncio.sleep(0.002)
+    return longest
+
+
+async def run(winners: int, abandoned: int, resent: int) -> bool:
+    await open_async_pool("watcher")
+    radarr = RadarrClient()
+    ok = True
+    try:
+        async with ASYNC_POOL.connection() as conn:
+            _ = await conn.execute(delete_seeded)
+            _ = await conn.execute(seed_winners, (winners,))
+
+        jobs = await fetch_one(count_jobs)
+        print(f"[outbox_dispatch] {winners} winners -> {jobs['jobs']} jobs for {jobs['events']} events")
+        if jobs["jobs"] != winners or jobs["events"] != winners:
+            print("[outbox_dispatch] FAIL: expected exactly one job per winner")
+            ok = False
+
+        # A dispatcher claims some jobs and dies without sending them
+        lost = await claim_jobs(radarr_add_job, abandoned, lease_seconds=1)
+        print(f"[outbox_dispatch] Abandoned {len(lost)} claimed jobs")
+
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(sample_transactions(stop))
+        failed = await dispatch_pending(radarr)
+        stop.set()
+        longest = await sampler
+        done = (await fetch_one(count_jobs))["done"]
+        print(f"[outbox_dispatch] First run: {done} done, {failed} failed")
+        print(f"[outbox_dispatch] Longest transaction while dispatching: {longest * 1000:.1f} ms")
+        if done != winners - len(lost):
+            print("[outbox_dispatch] FAIL: abandoned jobs should wait for their lease")
+            ok = False
+        if longest > 0.05:
+            print("[outbox_dispatch] FAIL: a transaction stayed open while Radarr was called")
+            ok = False
+
+        await asyncio.sleep(1.1)
+        _ = await dispatch_pending(radarr)
+        done = (await fetch_one(count_jobs))["done"]
+        print(f"[outbox_dispatch] After the lease expired: {done} done")
+        if done != winners:
+            print("[outbox_dispatch] FAIL: abandoned jobs were not recovered")
+            ok = False
+
+        # Completion lost after Radarr already added the movie: send again
+        async with ASYNC_POOL.connection() as conn:
+            async with conn.cursor() as cur:
+                _ = await cur.execute(reset_done_jobs, (resent,))
+                reset = await cur.fetchall()
+        _ = await dispatch_pending(radarr)
+        done = (await fetch_one(count_jobs))["done"]
+
+        async with httpx.AsyncClient(base_url=RADARR_URL) as client:
+            library = (await client.get("/api/v3/movie")).json()
+        titles = [movie["title"] for movie in library]
+        doubled = [
+            job["payload"]["movie"]
+            for job in reset
+            if titles.count(job["payload"]["movie"].title()) != 1
+        ]
+        print(f"[outbox_dispatch] Resent {len(reset)} jobs: {done} done, {len(doubled)} movies not exactly once in the library")
+        if done != winners or doubled:
+            print("[outbox_dispatch] FAIL: resending a job is not idempotent")
+            ok = False
+
+        async with ASYNC_POOL.connection() as conn:
+            cur = await conn.execute(complete_outbox_job, {"id": reset[0]["id"]})
+            if cur.rowcount != 0:
+                print("[outbox_dispatch] FAIL: completing a done job changed it")
+                ok = False
+
+        if ok:
+            print("[outbox_dispatch] OK")
+        return ok
+    finally:
+        async with ASYNC_POOL.connection() as conn:
+            _ = await conn.execute(delete_seeded)
+        await radarr.aclose()
+        await close_async_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    _ = parser.add_argument("--winners", type=int, default=100)
+    _ = parser.add_argument("--abandoned", type=int, default=10)
+    _ = parser.add_argument("--resent", type=int, default=5)
+    args = parser.parse_args()
+    ok = asyncio.run(run(args.winners, args.abandoned, args.resent))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+# backend/bench/pool_sizing.py
+# Pool lifecycle and sizing (backend/SQL_UTIL/db.py), against API processes
+# started here. Their database connections go through a proxy that holds
+# every packet for --delay-ms each way, like a database on another host.
+#   - cold start: --burst requests sent the moment the API accepts
+#     connections, with pool warmup (the API only starts once min_size
+#     warmed-up connections are ready) and with a pool that connects on
+#     demand (min_size 0, no warmup)
+#   - steady state: throughput, latency and pool wait time at each of --sizes
+#     (min = max) and with the default api sizing, which grows on demand
+#   - health: idle connections killed in Postgres, and connections recycled
+#     every 2s by max_lifetime, while under load. No request may fail.
+# The response cache is off so every read reaches the pool. From the root
+# directory:
+#   python -m backend.bench.pool_sizing --sizes 2 4 8 16 --concurrency 32
+# The seeded events are deleted at the end.
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+import threading
+import time
+from statistics import median
+from time import perf_counter
+
+import httpx
+import psycopg
+from prometheus_client.parser import text_string_to_metric_families
+from psycopg.conninfo import conninfo_to_dict, make_conninfo
+from psycopg.rows import dict_row
+
+from ..SQL_UTIL.db import DB_URL
+from .deadlines import server
+from .round_trips import DelayProxy
+
+seed_events = """
+WITH new_events AS (
+  INSERT INTO events (title, genre, date, time, location, author, starts_at)
+  SELECT 'Bench pool ' || n, 'Action', '1/1/2030', '19:00', 'Bench', 'bench-pool',
+         NOW() + INTERVAL '30 days'
+  FROM generate_series(1, %(events)s) AS n
+  RETURNING id
+)
+INSERT INTO rsvps (event_id, author, movie)
+SELECT id, 'bench-pool ' || k, 'Movie ' || k
+FROM new_events, generate_series(1, 5) AS k
+"""
+
+get_seeded_event_ids = "SELECT id FROM events WHERE author = 'bench-pool' ORDER BY id"
+delete_seeded = "DELETE FROM events WHERE author = 'bench-pool'"
+
+get_api_backends = """
+SELECT pid, state FROM pg_stat_activity WHERE application_name = 'movie-picker-api'
+"""
+
+terminate_idle_api_backends = """
+SELECT COUNT(pg_terminate_backend(pid)) AS terminated
+FROM pg_stat_activity
+WHERE application_name = 'movie-picker-api' AND state = 'idle'
+"""
+
+
+def percentile(timings: list[float], p: float) -> float:
+    timings = sorted(timings)
+    return timings[min(len(timings) - 1, int(len(timings) * p))] if timings else 0.0
+
+
+async def request(client: httpx.AsyncClient, i: int, event_ids: list[int], rng: random.Random) -> httpx.Response:
+    # Reads of each kind the API serves from the database, and a write
+    kind = i % 4
+    if kind == 0:
+        return await client.get("/api/events/details", params={"limit": 15})
+    if kind == 1:
+        return await client.get(f"/api/rsvps/{rng.choice(event_ids)}")
+    if kind == 2:
+        return await client.get(f"/api/authors/bench-pool {rng.randrange(1, 6)}")
+    return await client.patch(f"/api/events/{rng.choice(event_ids)}", json={"location": f"Bench {i}"})
+
+
+async def drive(client: httpx.AsyncClient, seconds: float, concurrency: int, event_ids: list[int]) -> tuple[list[float], int]:
+    timings: list[float] = []
+    errors = 0
+    deadline = perf_counter() + seconds
+
+    async def worker(n: int):
+        nonlocal errors
+        rng = random.Random(n)
+        i = n
+        while perf_counter() < deadline:
+            start = perf_counter()
+            try:
+                response = await request(client, i, event_ids, rng)
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            timings.append(perf_counter() - start)
+            i += concurrency
+
+    _ = await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return timings, errors
+
+
+async def pool_metrics(client: httpx.AsyncClient) -> dict:
+    # The async pool's wait histogram and get_stats() gauges from /metrics
+    metrics: dict = {"buckets": {}, "sum": 0.0, "count": 0.0}
+    text = (await client.get("/metrics")).text
+    for family in text_string_to_metric_families(text):
+        for sample in family.samples:
+            if sample.labels.get("pool") != "async":
+                continue
+            if sample.name == "movie_picker_pool_wait_seconds_bucket":
+                metrics["buckets"][float(sample.labels["le"])] = sample.value
+            elif sample.name == "movie_picker_pool_wait_seconds_sum":
+                metrics["sum"] = sample.value
+            elif sample.name == "movie_picker_pool_wait_seconds_count":
+                metrics["count"] = sample.value
+            elif sample.name.startswith("movie_picker_pool_"):
+                metrics[sample.name.removeprefix("movie_picker_pool_")] = sample.value
+    return metrics
+
+
+def pool_wait(before: dict, after: dict) -> tuple[float, float]:
+    # Mean and p99 (bucket upper bound) wait between two scrapes, in seconds
+    count = after["count"] - before["count"]
+    if not count:
+        return 0.0, 0.0
+    p99 = float("inf")
+    for le in sorted(after["buckets"]):
+        if after["buckets"][le] - before["buckets"].get(le, 0) >= count * 0.99:
+            p99 = le
+            break
+    return (after["sum"] - before["sum"]) / count, p99
+
+
+def api_env(proxy_url: str, **overrides: str) -> dict:
+    return {"MOVIE_PICKER_DB_URL": proxy_url, "MOVIE_PICKER_RESPONSE_CACHE_SIZE": "0", **overrides}
+
+
+async def burst(url: str, requests: int) -> list[float]:
+    async with httpx.AsyncClient(base_url=url, timeout=30) as client:
+        async def timed(i: int) -> float:
+            start = perf_counter()
+            _ = (await client.get("/api/events/details", params={"limit": 15})).raise_for_status()
+            return perf_counter() - start
+
+        return list(await asyncio.gather(*(timed(i) for i in range(requests))))
+
+
+COLD_START_VARIANTS = {
+    "on demand": {"MOVIE_PICKER_API_POOL_MIN": "0", "MOVIE_PICKER_DB_POOL_WARMUP": "0"},
+    "warmup": {},
+}
+
+
+def cold_start(proxy_url: str, args) -> dict[str, float]:
+    # Median p50 of the first burst by variant
+    results: dict[str, float] = {}
+    for label, overrides in COLD_START_VARIANTS.items():
+        startups: list[float] = []
+        p50s: list[float] = []
+        maxes: list[float] = []
+        for _ in range(args.starts):
+            env = api_env(proxy_url, **overrides)
+            start = perf_counter()
+            with server("api", "backend.api:app", args.port, env, args.log_dir, poll=0.005) as url:
+                startups.append(perf_counter() - start)
+                timings = asyncio.run(burst(url, args.burst))
+            p50s.append(percentile(timings, 0.5))
+            maxes.append(max(timings))
+        print(
+            f"[pool_sizing] Cold start, {label:<9}: API up in {median(startups) * 1000:6.0f} ms, "
+            f"first {args.burst} requests p50 {median(p50s) * 1000:6.1f} ms, max {median(maxes) * 1000:6.1f} ms"
+        )
+        results[label] = median(p50s)
+    return results
+
+
+async def steady(url: str, args, event_ids: list[int], label: str) -> int:
+    async with httpx.AsyncClient(base_url=url, timeout=30, limits=httpx.Limits(max_connections=args.concurrency)) as client:
+        _ = await drive(client, 1, args.concurrency, event_ids)
+        before = await pool_metrics(client)
+        timings, errors = await drive(client, args.seconds, args.concurrency, event_ids)
+        after = await pool_metrics(client)
+    mean_wait, p99_wait = pool_wait(before, after)
+    print(
+        f"[pool_sizing] {label:<14} {len(timings) / args.seconds:7.1f} req/s, p50 {percentile(timings, 0.5) * 1000:6.1f} ms, "
+        f"p99 {percentile(timings, 0.99) * 1000:6.1f} ms, pool wait mean {mean_wait * 1000:6.2f} ms, "
+        f"p99 <= {p99_wait * 1000:g} ms, {after.get('pool_size', 0):g} connections, {errors} errors"
+    )
+    return errors
+
+
+class BackendSampler:
+    # Distinct API backend pids seen in pg_stat_activity
+
+    def __init__(self):
+        self.pids: set[int] = set()
+        self.running = False
+        self.thread: threading.Thread | None = None
+
+    def run(self):
+        with psycopg.connect(DB_URL, autocommit=True, row_factory=dict_row) as conn:
+            while self.running:
+                self.pids.update(row["pid"] for row in conn.execute(get_api_backends).fetchall())
+                time.sleep(0.1)
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> int:
+        self.running = False
+        if self.thread:
+            self.thread.join()
+        return len(self.pids)
+
+
+async def health(url: str, args, event_ids: list[int]) -> bool:
+    size = 4
+    sampler = BackendSampler()
+    sampler.start()
+    async with httpx.AsyncClient(base_url=url, timeout=30) as client:
+        _, errors_before = await drive(client, args.seconds, args.concurrency, event_ids)
+        # Long enough for the connections to count as idle
+        await asyncio.sleep(1)
+        with psycopg.connect(DB_URL, autocommit=True, row_factory=dict_row) as conn:
+            terminated = conn.execute(terminate_idle_api_backends).fetchone()["terminated"]
+        _, errors_after = await drive(client, args.seconds, args.concurrency, event_ids)
+        stats = await pool_metrics(client)
+    seen = sampler.stop()
+    print(
+        f"[pool_sizing] Health: {terminated} idle connections killed, {stats.get('connections_lost', 0):g} "
+        f"caught by the idle check, {seen} connections used over the phase for a pool of {size}, "
+        f"errors {errors_before} before and {errors_after} after the kill"
+    )
+    ok = True
+    if errors_before or errors_after:
+        print("[pool_sizing] FAIL: requests failed on killed or recycled connections")
+        ok = False
+    if not terminated or seen <= size + terminated:
+        print("[pool_sizing] FAIL: connections were not killed or not recycled")
+        ok = False
+    return ok
+
+
+def run(args, proxy_url: str, event_ids: list[int]) -> bool:
+    ok = True
+    first_burst = cold_start(proxy_url, args)
+    if first_burst["warmup"] >= first_burst["on demand"]:
+        print("[pool_sizing] FAIL: warmup didn't make the first requests faster")
+        ok = False
+
+    for size in args.sizes:
+        env = api_env(proxy_url, MOVIE_PICKER_API_POOL_MIN=str(size), MOVIE_PICKER_API_POOL_MAX=str(size))
+        with server("api", "backend.api:app", args.port, env, args.log_dir) as url:
+            if asyncio.run(steady(url, args, event_ids, f"Pool of {size}:")):
+                ok = False
+    with server("api", "backend.api:app", args.port, api_env(proxy_url), args.log_dir) as url:
+        if asyncio.run(steady(url, args, event_ids, "Default sizing:")):
+            ok = False
+
+    env = api_env(
+        proxy_url,
+        MOVIE_PICKER_API_POOL_MIN="4",
+        MOVIE_PICKER_API_POOL_MAX="4",
+        MOVIE_PICKER_DB_POOL_MAX_LIFETIME="2",
+        MOVIE_PICKER_DB_POOL_CHECK_IDLE="0.5",
+    )
+    with server("api", "backend.api:app", args.port, env, args.log_dir) as url:
+        ok &= asyncio.run(health(url, args, event_ids))
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    _ = parser.add_argument("--sizes", type=int, nargs="+", default=[2, 4, 8, 16])
+    _ = parser.add_argument("--concurrency", type=int, default=32)
+    _ = parser.add_argument("--seconds", type=float, default=5)
+    _ = parser.add_argument("--burst", type=int, default=20)
+    _ = parser.add_argument("--starts", type=int, default=3, help="cold starts per variant, the median is shown")
+    _ = parser.add_argument("--delay-ms", type=float, default=10, help="added per packet, each way")
+    _ = parser.add_argument("--events", type=int, default=200)
+    _ = parser.add_argument("--port", type=int, default=8768)
+    args = parser.parse_args()
+
+    with psycopg.connect(DB_URL, autocommit=True, row_factory=dict_row) as conn:
+        _ = conn.execute(delete_seeded)
+        _ = conn.execute(seed_events, {"events": args.events})
+        event_ids = [row["id"] for row in conn.execute(get_seeded_event_ids).fetchall()]
+
+    proxy = DelayProxy(conninfo_to_dict(DB_URL), args.delay_ms / 1000)
+    proxy.start()
+    proxy_url = make_conninfo(DB_URL, host="127.0.0.1", port=proxy.port)
+    args.log_dir = tempfile.mkdtemp(prefix="pool-sizing-")
+    print(f"[pool_sizing] {args.delay_ms:g} ms added per packet, logs in {args.log_dir}")
+    try:
+        ok = run(args, proxy_url, event_ids)
+    finally:
+        with psycopg.connect(DB_URL, autocommit=True) as conn:
+            _ = conn.execute(delete_seeded)
+
+    print("[pool_sizing] OK" if ok else "[pool_sizing] FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# backend/bench/radarr_client.py
+# Checks the shared Radarr client against backend/bench/fake_radarr.py:
+#   - a burst of lookups is spread out by the rate limiter
+#   - identical lookups in flight at the same time reach Radarr once
+#   - root folder / quality profile are fetched once and refreshed in the
+#     background, and still served while Radarr is down
+#   - during an outage the circuit opens and calls fail fast without
+#     reaching Radarr, and it closes again once Radarr is back
+# Start the fake first, then from the root directory:
+#   FAKE_RADARR_LATENCY=0.05 uvicorn backend.bench.fake_radarr:app --port 7878
+#   MOVIE_PICKER_RADARR_URL=http://localhost:7878 MOVIE_PICKER_RADARR_API_KEY=x \
+#     python -m backend.bench.radarr_client
+import argparse
+import asyncio
+import sys
+from time import perf_counter
+
+import httpx
+
+from ..radarr import RADARR_URL, RadarrClient, RadarrError, RadarrUnavailable
+
+
+async def fake_stats(client: httpx.AsyncClient) -> dict:
+    return (await client.get("/stats")).json()
+
+
+async def run(rate: float, burst: int, lookups: int) -> bool:
+    ok = True
+    radarr = RadarrClient(
+        rate=rate,
+        burst=burst,
+        breaker_threshold=3,
+        breaker_reset_seconds=2,
+        settings_ttl=1,
+    )
+    fake = httpx.AsyncClient(base_url=RADARR_URL)
+    try:
+        # Rate limit: lookups beyond the burst wait for tokens
+        before = await fake_stats(fake)
+        start = perf_counter()
+        _ = await asyncio.gather(*(radarr.lookup(f"burst {i}") for i in range(lookups)))
+        elapsed = perf_counter() - start
+        expected = (lookups - burst) / rate
+        print(f"[radarr_client] {lookups} distinct lookups at {rate:g}/s, burst {burst}: {elapsed:.2f}s (at least {expected:.2f}s expected), {radarr.bucket.waits} waited")
+        if elapsed < expected * 0.9:
+            print("[radarr_client] FAIL: the rate limit was exceeded")
+            ok = False
+
+        # Single-flight: one lookup for many identical concurrent ones
+        before = await fake_stats(fake)
+        results = await asyncio.gather(*(radarr.lookup("same movie") for _ in range(50)))
+        sent = (await fake_stats(fake))["lookup"] - before["lookup"]
+        print(f"[radarr_client] 50 identical concurrent lookups -> {sent} Radarr request(s)")
+        if sent != 1 or any(r != results[0] for r in results):
+            print("[radarr_client] FAIL: identical lookups were not coalesced")
+            ok = False
+
+        # Settings cache: fetched once, refreshed in the background when stale
+        before = await fake_stats(fake)
+        _ = await asyncio.gather(*(radarr.settings() for _ in range(100)))
+        fetched = (await fake_stats(fake))["rootfolder"] - before["rootfolder"]
+        await asyncio.sleep(1.1)
+        start = perf_counter()
+        settings = await radarr.settings()
+        stale_read = perf_counter() - start
+        await asyncio.sleep(0.3)
+        refreshed = (await fake_stats(fake))["rootfolder"] - before["rootfolder"] - fetched
+        print(f"[radarr_client] 100 settings reads -> {fetched} fetch, stale read in {stale_read * 1000:.2f} ms then {refreshed} background refresh: {settings}")
+        if fetched != 1 or refreshed != 1 or stale_read > 0.005:
+            print("[radarr_client] FAIL: settings are not cached or not refreshed in the background")
+            ok = False
+
+        # Circuit breaker: an outage opens it, calls then fail fast
+        _ = await fake.post("/outage", params={"seconds": 3})
+        try:
+            _ = await radarr.lookup("during outage")
+        except RadarrError as e:
+            print(f"[radarr_client] First lookup in the outage: {type(e).__name__}")
+        before = await fake_stats(fake)
+        timings = []
+        rejected = 0
+        for i in range(20):
+            start = perf_counter()
+            try:
+                _ = await radarr.lookup(f"fail fast {i}")
+            except RadarrUnavailable:
+                rejected += 1
+            timings.append(perf_counter() - start)
+        reached = (await fake_stats(fake))["lookup"] - before["lookup"]
+        print(f"[radarr_client] Circuit {radarr.breaker.state}: {rejected}/20 lookups failed fast (slowest {max(timings) * 1000:.2f} ms), {reached} reached Radarr")
+        if rejected != 20 or reached != 0:
+            print("[radarr_client] FAIL: the open circuit let calls through")
+            ok = False
+
+        await asyncio.sleep(1.1)
+        start = perf_counter()
+        settings_in_outage = await radarr.settings()
+        print(f"[radarr_client] Settings during the outage: {settings_in_outage} in {(perf_counter() - start) * 1000:.2f} ms")
+        if settings_in_outage != settings:
+            print("[radarr_client] FAIL: cached settings were not served during the outage")
+            ok = False
+
+        # Outage over and reset time passed: the trial call closes the circuit
+        await asyncio.sleep(3)
+        results = await radarr.lookup("after outage")
+        print(f"[radarr_client] After the outage: {len(results)} results, circuit {radarr.breaker.state}")
+        if radarr.breaker.state != "closed":
+            print("[radarr_client] FAIL: the circuit did not close again")
+            ok = False
+
+        print(f"[radarr_client] Fake Radarr stats: {await fake_stats(fake)}")
+    finally:
+        await fake.aclose()
+        await radarr.aclose()
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    _ = parser.add_argument("--rate", type=float, default=20)
+    _ = parser.add_argument("--burst", type=int, default=5)
+    _ = parser.add_argument("--lookups", type=int, default=60)
+    args = parser.parse_args()
+    ok = asyncio.run(run(args.rate, args.burst, args.lookups))
+    print("[radarr_client] OK" if ok else "[radarr_client] FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
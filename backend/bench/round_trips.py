@@ -0,0 +1,370 @@
+# backend/bench/round_trips.py
+# Database round-trips and latency of the watcher tick and of a
+# single-statement API read, through a proxy that delays every packet like a
+# database on another host would. Compares
+#   - per_event: the tick before winners were picked in bulk, a read and an
+#     insert per due event
+#   - batched: the tick before the async pool was autocommit, claim then
+#     candidates then insert in an explicit transaction, and two deadline
+#     queries
+#   - current: backend.watcher as it is now (claim and candidates in one
+#     statement, one deadline query, prepared statements)
+# and then times the prepared hot queries against unprepared runs, without
+# the proxy.
+#
+# Seeded rows are deleted again at the end. From the root directory:
+#   python -m backend.bench.round_trips --due-events 500 --delay-ms 1
+import argparse
+import asyncio
+import io
+import os
+import sys
+import threading
+from contextlib import redirect_stdout
+from statistics import median
+from time import perf_counter
+
+import psycopg
+from psycopg.conninfo import conninfo_to_dict, make_conninfo
+from psycopg.rows import dict_row
+
+# The backend modules are imported once MOVIE_PICKER_DB_URL points at the
+# proxy, the pools read it at import
+DB_URL = os.environ.get("MOVIE_PICKER_DB_URL")
+
+seed_due_events = """
+WITH new_events AS (
+  INSERT INTO events (title, genre, date, time, location, author, starts_at)
+  SELECT 'Bench ' || n, 'Action', '', '', 'Bench', 'bench-round-trips',
+         NOW() + INTERVAL '30 minutes'
+  FROM generate_series(1, %(events)s) AS n
+  RETURNING id
+)
+INSERT INTO rsvps (event_id, author, movie)
+SELECT id, 'bench-round-trips ' || k, 'Round Trips Movie ' || k
+FROM new_events, generate_series(1, 3) AS k
+"""
+
+get_seeded_event_ids = """
+SELECT id FROM events WHERE author = 'bench-round-trips' ORDER BY id
+"""
+
+delete_seeded = """
+DELETE FROM events WHERE author = 'bench-round-trips'
+"""
+
+# No dispatcher runs here, the jobs the winners enqueue go with their events
+delete_seeded_outbox = """
+DELETE FROM outbox WHERE event_id IN (SELECT id FROM events WHERE author = 'bench-round-trips')
+"""
+
+# The two queries get_watcher_deadlines replaced
+legacy_next_event_window = """
+SELECT EXTRACT(EPOCH FROM (e.starts_at - INTERVAL '1 hour' - NOW())) AS seconds
+FROM events e
+WHERE e.starts_at > (NOW() + INTERVAL '1 hour')
+AND NOT EXISTS (SELECT 1 FROM event_winners w WHERE w.event_id = e.id)
+ORDER BY e.starts_at
+LIMIT 1
+"""
+
+legacy_peer_work_check = """
+SELECT LEAST(
+  (
+    SELECT %(due_recheck_seconds)s::FLOAT8
+    FROM events e
+    WHERE e.starts_at BETWEEN NOW() AND (NOW() + INTERVAL '1 hour')
+    AND NOT EXISTS (SELECT 1 FROM event_winners w WHERE w.event_id = e.id)
+    AND EXISTS (SELECT 1 FROM rsvps r WHERE r.event_id = e.id AND COALESCE(r.weight, 1) > 0)
+    LIMIT 1
+  ),
+  (
+    SELECT EXTRACT(EPOCH FROM (
+      MIN(GREATEST(available_at, COALESCE(claimed_until, available_at))) - NOW()
+    ))::FLOAT8
+    FROM outbox
+    WHERE status = 'pending'
+    AND %(dispatching)s
+  )
+) AS seconds
+"""
+
+
+class DelayProxy:
+    # TCP proxy to the database that holds every chunk for delay seconds in
+    # each direction, and counts turns: the client sending again after the
+    # server answered, one per round-trip it waited for
+
+    def __init__(self, target: dict, delay: float):
+        self.target = target
+        self.delay = delay
+        self.turns = 0
+        self.port = 0
+        self.ready = threading.Event()
+
+    def start(self):
+        threading.Thread(target=lambda: asyncio.run(self.serve()), daemon=True).start()
+        _ = self.ready.wait()
+
+    async def serve(self):
+        server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        self.port = server.sockets[0].getsockname()[1]
+        self.ready.set()
+        async with server:
+            await server.serve_forever()
+
+    async def open_target(self):
+        host = self.target.get("host") or "/var/run/postgresql"
+        port = self.target.get("port") or "5432"
+        if host.startswith("/"):
+            return await asyncio.open_unix_connection(f"{host}/.s.PGSQL.{port}")
+        return await asyncio.open_connection(host, int(port))
+
+    async def handle(self, client_reader, client_writer):
+        server_reader, server_writer = await self.open_target()
+        state = {"answered": False}
+        _ = await asyncio.gather(
+            self.pump(client_reader, server_writer, state, from_client=True),
+            self.pump(server_reader, client_writer, state, from_client=False),
+            return_exceptions=True,
+        )
+        client_writer.close()
+        server_writer.close()
+
+    async def pump(self, reader, writer, state: dict, from_client: bool):
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def forward():
+            while True:
+                due, data = await queue.get()
+                if data is None:
+                    writer.close()
+                    return
+                await asyncio.sleep(max(due - perf_counter(), 0))
+                writer.write(data)
+                await writer.drain()
+
+        forwarder = asyncio.create_task(forward())
+        while data := await reader.read(65536):
+            if from_client and state["answered"]:
+                self.turns += 1
+            state["answered"] = not from_client
+            queue.put_nowait((perf_counter() + self.delay, data))
+        queue.put_nowait((0, None))
+        await forwarder
+
+
+def seed(conn: psycopg.Connection, events: int) -> list[int]:
+    _ = conn.execute(delete_seeded_outbox)
+    _ = conn.execute(delete_seeded)
+    _ = conn.execute(seed_due_events, {"events": events})
+    return [row["id"] for row in conn.execute(get_seeded_event_ids).fetchall()]
+
+
+async def per_event_tick(conn: psycopg.AsyncConnection):
+    from ..selection import new_seed, pick_winners, winner_columns
+    from ..SQL_UTIL.operations import (
+        claim_due_events,
+        get_selection_candidates,
+        insert_event_winners,
+    )
+
+    async with conn.cursor() as cur:
+        _ = await cur.execute(claim_due_events, {"batch_size": 1000})
+        for event in await cur.fetchall():
+            _ = await cur.execute(get_selection_candidates, {"event_ids": [event["id"]]})
+            winners = pick_winners(await cur.fetchone(), {event["id"]: new_seed()})
+            _ = await cur.execute(insert_event_winners, winner_columns(winners))
+    await conn.commit()
+    await legacy_deadlines(conn)
+
+
+async def batched_tick(conn: psycopg.AsyncConnection):
+    from ..selection import new_seed, pick_winners, winner_columns
+    from ..SQL_UTIL.operations import (
+        claim_due_events,
+        get_selection_candidates,
+        insert_event_winners,
+    )
+
+    async with conn.cursor() as cur:
+        _ = await cur.execute(claim_due_events, {"batch_size": 1000})
+        event_ids = [event["id"] for event in await cur.fetchall()]
+        if event_ids:
+            _ = await cur.execute(get_selection_candidates, {"event_ids": event_ids})
+            candidates = await cur.fetchone()
+            winners = pick_winners(candidates, {event_id: new_seed() for event_id in event_ids})
+            _ = await cur.execute(insert_event_winners, winner_columns(winners))
+    await conn.commit()
+    await legacy_deadlines(conn)
+
+
+async def legacy_deadlines(conn: psycopg.AsyncConnection):
+    async with conn.cursor() as cur:
+        _ = await cur.execute(legacy_next_event_window)
+        _ = await cur.execute(
+            legacy_peer_work_check, {"due_recheck_seconds": 5, "dispatching": False}
+        )
+    await conn.commit()
+
+
+async def current_tick(_conn):
+    from ..watcher import process_due_events, seconds_until_next_deadline
+
+    await process_due_events()
+    _ = await seconds_until_next_deadline(False)
+
+
+async def timed_tick(proxy: DelayProxy, tick, legacy) -> tuple[float, int]:
+    turns = proxy.turns
+    start = perf_counter()
+    # The watcher logs every winner
+    with redirect_stdout(io.StringIO()):
+        await tick(legacy)
+    return perf_counter() - start, proxy.turns - turns
+
+
+async def measure_ticks(proxy: DelayProxy, direct: psycopg.Connection, args) -> dict:
+    proxy_url = make_conninfo(DB_URL, host="127.0.0.1", port=proxy.port)
+    results = {}
+    async with await psycopg.AsyncConnection.connect(proxy_url, row_factory=dict_row) as legacy:
+        for name, tick in (
+            ("per_event", per_event_tick),
+            ("batched", batched_tick),
+            ("current", current_tick),
+        ):
+            # Unrecorded small rounds first, so every pooled connection has
+            # prepared its statements and cached the trigger functions' plans,
+            # like in a watcher that has been up for a while
+            for _i in range(args.warmup):
+                _ = seed(direct, 10)
+                _ = await timed_tick(proxy, tick, legacy)
+
+            # Every round seeds the due events, a busy tick picks them all
+            # and an idle tick finds nothing to do
+            busy, idle = [], []
+            for _i in range(args.rounds):
+                _ = seed(direct, args.due_events)
+                busy.append(await timed_tick(proxy, tick, legacy))
+                idle.append(await timed_tick(proxy, tick, legacy))
+            results[name] = {
+                "busy": (median(t for t, _ in busy), median(n for _, n in busy)),
+                "idle": (median(t for t, _ in idle), median(n for _, n in idle)),
+            }
+            print(
+                f"[round_trips] {name}: busy tick {results[name]['busy'][0] * 1000:.1f} ms, {results[name]['busy'][1]} round-trips;"
+                + f" idle tick {results[name]['idle'][0] * 1000:.1f} ms, {results[name]['idle'][1]} round-trips"
+            )
+    return results
+
+
+async def measure_read(proxy: DelayProxy, requests: int) -> dict:
+    # One single-statement API read: in a transaction like the pool used to
+    # open, and through the autocommit pool
+    from ..api import get_author
+    from ..SQL_UTIL.operations import get_author_stats
+
+    proxy_url = make_conninfo(DB_URL, host="127.0.0.1", port=proxy.port)
+    results = {}
+    async with await psycopg.AsyncConnection.connect(proxy_url, row_factory=dict_row) as legacy:
+
+        async def in_transaction():
+            async with legacy.cursor() as cur:
+                _ = await cur.execute(get_author_stats, ("bench-round-trips 1",))
+                _ = await cur.fetchone()
+            await legacy.commit()
+
+        for name, read in (
+            ("transaction", in_transaction),
+            ("autocommit", lambda: get_author("bench-round-trips 1")),
+        ):
+            turns = proxy.turns
+            start = perf_counter()
+            for _i in range(requests):
+                _ = await read()
+            elapsed = (perf_counter() - start) / requests
+            per_request = (proxy.turns - turns) / requests
+            results[name] = (elapsed, per_request)
+            print(f"[round_trips] GET /api/authors/{{author}} ({name}): {elapsed * 1000:.2f} ms, {per_request:.1f} round-trips")
+    return results
+
+
+async def measure(proxy: DelayProxy, direct: psycopg.Connection, args) -> tuple[dict, dict]:
+    from ..SQL_UTIL.db import close_async_pool, open_async_pool
+
+    await open_async_pool("watcher")
+    try:
+        ticks = await measure_ticks(proxy, direct, args)
+        reads = await measure_read(proxy, args.requests)
+    finally:
+        await close_async_pool()
+    return ticks, reads
+
+
+def measure_prepared(direct: psycopg.Connection, event_ids: list[int], executions: int):
+    # Server time of the hot queries, parsed and planned every run vs prepared
+    from ..api import EventsPage, build_events_page_query
+    from ..SQL_UTIL.operations import (
+        get_event_details_query,
+        get_rsvps_for_event,
+        get_selection_candidates,
+        get_watcher_deadlines,
+    )
+
+    details_query, details_params = build_events_page_query(EventsPage(), get_event_details_query)
+    for name, query, params in (
+        ("get_rsvps_for_event", get_rsvps_for_event, (event_ids[0],)),
+        ("get_event_details_query", details_query, details_params),
+        ("get_selection_candidates", get_selection_candidates, {"event_ids": event_ids[:50]}),
+        ("get_watcher_deadlines", get_watcher_deadlines, {"due_recheck_seconds": 5, "dispatching": True}),
+    ):
+        timings = {}
+        for prepare in (False, True):
+            _ = direct.execute(query, params, prepare=prepare).fetchall()
+            start = perf_counter()
+            for _i in range(executions):
+                _ = direct.execute(query, params, prepare=prepare).fetchall()
+            timings[prepare] = (perf_counter() - start) / executions * 1000
+        print(f"[round_trips] {name}: {timings[False]:.3f} ms unprepared, {timings[True]:.3f} ms prepared")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    _ = parser.add_argument("--due-events", type=int, default=500)
+    _ = parser.add_argument("--delay-ms", type=float, default=1.0, help="one way, per packet")
+    _ = parser.add_argument("--rounds", type=int, default=5, help="busy and idle tick pairs, medians are reported")
+    _ = parser.add_argument("--warmup", type=int, default=8, help="unrecorded small rounds first")
+    _ = parser.add_argument("--requests", type=int, default=200)
+    _ = parser.add_argument("--executions", type=int, default=500)
+    args = parser.parse_args()
+
+    proxy = DelayProxy(conninfo_to_dict(DB_URL), args.delay_ms / 1000)
+    proxy.start()
+    os.environ["MOVIE_PICKER_DB_URL"] = make_conninfo(DB_URL, host="127.0.0.1", port=proxy.port)
+
+    failed = False
+    with psycopg.connect(DB_URL, autocommit=True, row_factory=dict_row) as direct:
+        try:
+            ticks, reads = asyncio.run(measure(proxy, direct, args))
+            event_ids = seed(direct, args.due_events)
+            measure_prepared(direct, event_ids, args.executions)
+        finally:
+            _ = direct.execute(delete_seeded_outbox)
+            _ = direct.execute(delete_seeded)
+
+    busy = {name: result["busy"] for name, result in ticks.items()}
+    if not busy["current"][1] < busy["batched"][1] < busy["per_event"][1]:
+        print("[round_trips] FAIL: the busy tick does not take fewer round-trips than before")
+        failed = True
+    if busy["current"][0] > busy["batched"][0]:
+        print("[round_trips] FAIL: the busy tick is slower than before")
+        failed = True
+    if reads["autocommit"][1] >= reads["transaction"][1]:
+        print("[round_trips] FAIL: single-statement reads take as many round-trips as before")
+        failed = True
+    print("[round_trips] FAIL" if failed else "[round_trips] OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
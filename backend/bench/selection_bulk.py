@@ -0,0 +1,240 @@
+# backend/bench/selection_bulk.py
+# Compares the old per-event winner picking (one RSVP query, random.choices
+# and a linear scan per event) with backend/selection.py picking every due
+# event in one pass, and checks the picks are reproducible from their seeds
+# and follow the strategies' odds.
+#
+# The database part seeds rows inside a transaction that is rolled back at
+# the end. From the root directory:
+#   python -m backend.bench.selection_bulk --events 10000 --rsvps 8
+import argparse
+import random
+from collections import Counter
+from collections.abc import Callable
+from time import perf_counter
+
+from ..selection import new_seed, pick_winners, winner_columns
+from ..SQL_UTIL.db import POOL
+from ..SQL_UTIL.operations import (
+    claim_due_events,
+    get_rsvps_for_event,
+    get_selection_candidates,
+    insert_event_winners,
+)
+
+seed_events = """
+INSERT INTO events (title, genre, date, time, location, author, starts_at)
+SELECT 'Bench ' || n, 'Action', '', '', 'Bench', 'bench-selection',
+       NOW() + INTERVAL '30 minutes'
+FROM generate_series(1, %(events)s) AS n
+"""
+
+seed_rsvps = """
+INSERT INTO rsvps (event_id, author, movie, weight)
+SELECT id, 'bench ' || k, 'Movie ' || (k %% 3), 1 + (id + k) %% 5
+FROM events, generate_series(1, %(rsvps)s) AS k
+WHERE author = 'bench-selection'
+"""
+
+get_seeded_event_ids = "SELECT id FROM events WHERE author = 'bench-selection'"
+
+# The watcher's insert before bulk selection
+insert_event_winner = """
+INSERT INTO event_winners (event_id, rsvp_id, movie, author)
+VALUES (%s, %s, %s, %s)
+ON CONFLICT (event_id) DO NOTHING
+"""
+
+
+def synthetic_rows(events: int, rsvps: int, rng: random.Random) -> list[dict]:
+    strategies = ("weighted", "fair", "plurality")
+    rows = []
+    for event_id in range(1, events + 1):
+        strategy = strategies[event_id % 3]
+        for k in range(rsvps):
+            rows.append(
+                {
+                    "event_id": event_id,
+                    "rsvp_id": event_id * 100 + k,
+                    "author": f"author {k}",
+                    "movie": f"Movie {rng.randrange(3)}",
+                    "weight": rng.randint(1, 5),
+                    "strategy": strategy,
+                    "days_since_win": rng.choice((float("inf"), rng.uniform(0, 180))),
+                }
+            )
+    return rows
+
+
+def columns_of(rows: list[dict]) -> dict[str, list]:
+    # rows in the shape get_selection_candidates returns them
+    return {
+        "event_ids": [row["event_id"] for row in rows],
+        "rsvp_ids": [row["rsvp_id"] for row in rows],
+        "authors": [row["author"] for row in rows],
+        "movies": [row["movie"] for row in rows],
+        "weights": [row["weight"] for row in rows],
+        "strategies": [row["strategy"] for row in rows],
+        "days_since_win": [row["days_since_win"] for row in rows],
+    }
+
+
+def legacy_pick(rows_by_event: dict[int, list[dict]]) -> dict[int, dict]:
+    picks = {}
+    for event_id, rsvps in rows_by_event.items():
+        rsvp_ids = [rsvp["rsvp_id"] for rsvp in rsvps]
+        weights = [rsvp["weight"] for rsvp in rsvps]
+        chosen_rsvp_id = random.choices(rsvp_ids, weights, k=1)[0]
+        picks[event_id] = next(rsvp for rsvp in rsvps if rsvp["rsvp_id"] == chosen_rsvp_id)
+    return picks
+
+
+def best_of(repeat: int, run: Callable[[], object]) -> float:
+    # Fastest of repeat runs, the first one also pays for warming up
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        _ = run()
+        timings.append(perf_counter() - start)
+    return min(timings)
+
+
+def check_in_memory(events: int, rsvps: int, repeat: int) -> bool:
+    rng = random.Random(1)
+    rows = synthetic_rows(events, rsvps, rng)
+    seeds = {event_id: new_seed() for event_id in range(1, events + 1)}
+    rows_by_event: dict[int, list[dict]] = {}
+    for row in rows:
+        rows_by_event.setdefault(row["event_id"], []).append(row)
+    columns = columns_of(rows)
+
+    legacy = best_of(repeat, lambda: legacy_pick(rows_by_event))
+    bulk = best_of(repeat, lambda: pick_winners(columns, seeds))
+    winners = pick_winners(columns, seeds)
+    print(f"[selection_bulk] In memory, {events} events x {rsvps} RSVPs, best of {repeat}:")
+    print(f"[selection_bulk]   per-event loop {legacy * 1000:.1f} ms, one pass {bulk * 1000:.1f} ms")
+
+    ok = len(winners) == events
+    # Same seeds, rows shuffled and split in two batches: same picks
+    shuffled = rows[:]
+    rng.shuffle(shuffled)
+    half = len(shuffled) // 2
+    by_event = {w["event_id"]: w["rsvp_id"] for w in winners}
+    split = {}
+    for part in (shuffled[:half], shuffled[half:]):
+        # An event split across both halves has to be picked from all its rows
+        events_in_part = {row["event_id"] for row in part}
+        whole = [row for row in rows if row["event_id"] in events_in_part]
+        split.update({w["event_id"]: w["rsvp_id"] for w in pick_winners(columns_of(whole), seeds)})
+    if split != by_event:
+        print("[selection_bulk] FAIL: picks depend on batch composition or order")
+        ok = False
+    else:
+        print("[selection_bulk]   picks replay exactly from their seeds, in any batch or order")
+    return ok
+
+
+def check_odds(trials: int) -> bool:
+    ok = True
+    weights = [1, 2, 3, 4]
+    base = [
+        {"event_id": 1, "rsvp_id": i, "author": f"a{i}", "movie": f"M{i}", "weight": w, "days_since_win": float("inf")}
+        for i, w in enumerate(weights)
+    ]
+
+    def frequencies(rows: list[dict]) -> list[float]:
+        columns = columns_of(rows)
+        counts = Counter(
+            pick_winners(columns, {1: new_seed()})[0]["rsvp_id"] for _ in range(trials)
+        )
+        return [counts[i] / trials for i in range(len(rows))]
+
+    weighted = frequencies([{**row, "strategy": "weighted"} for row in base])
+    expected = [w / sum(weights) for w in weights]
+    print(f"[selection_bulk] weighted odds {[round(f, 3) for f in weighted]}, expected {[round(e, 3) for e in expected]}")
+    ok &= all(abs(f - e) < 0.02 for f, e in zip(weighted, expected))
+
+    # Author 3 won the day of the event: weight 4 * 0.5 = 2, author 2 won
+    # 45 of the 90 days before: weight 3 * 0.5^0.5
+    fair_rows = [{**row, "strategy": "fair"} for row in base]
+    fair_rows[3]["days_since_win"] = 0.0
+    fair_rows[2]["days_since_win"] = 45.0
+    fair = frequencies(fair_rows)
+    fair_weights = [1, 2, 3 * 0.5**0.5, 2]
+    expected = [w / sum(fair_weights) for w in fair_weights]
+    print(f"[selection_bulk] fair odds {[round(f, 3) for f in fair]}, expected {[round(e, 3) for e in expected]}")
+    ok &= all(abs(f - e) < 0.02 for f, e in zip(fair, expected))
+
+    # Three RSVPs for M0 (total 3) against M3 alone (4): M3 always wins
+    plurality_rows = [{**row, "strategy": "plurality", "weight": 1, "movie": "M0"} for row in base[:3]]
+    plurality_rows.append({**base[3], "strategy": "plurality"})
+    plurality = frequencies(plurality_rows)
+    print(f"[selection_bulk] plurality odds {[round(f, 3) for f in plurality]}, expected [0, 0, 0, 1]")
+    ok &= plurality[3] == 1.0
+
+    # Three RSVPs for M0 against one of weight 3 for M3, a tie: each movie
+    # wins half the time, and M0's RSVPs share its half
+    tie_rows = [*plurality_rows[:3], {**plurality_rows[3], "weight": 3}]
+    tie = frequencies(tie_rows)
+    expected = [1 / 6, 1 / 6, 1 / 6, 1 / 2]
+    print(f"[selection_bulk] plurality tie odds {[round(f, 3) for f in tie]}, expected {[round(e, 3) for e in expected]}")
+    ok &= all(abs(f - e) < 0.02 for f, e in zip(tie, expected))
+
+    if not ok:
+        print("[selection_bulk] FAIL: pick frequencies are off")
+    return ok
+
+
+def check_database(events: int, rsvps: int):
+    with POOL.connection() as conn:
+        with conn.transaction(force_rollback=True):
+            _ = conn.execute(seed_events, {"events": events})
+            _ = conn.execute(seed_rsvps, {"rsvps": rsvps})
+            _ = conn.execute("ANALYZE events, rsvps, event_winners")
+            event_ids = [row["id"] for row in conn.execute(get_seeded_event_ids).fetchall()]
+
+            with conn.transaction(force_rollback=True):
+                start = perf_counter()
+                for event_id in event_ids:
+                    rsvp_rows = conn.execute(get_rsvps_for_event, (event_id,)).fetchall()
+                    pick = legacy_pick({event_id: rsvp_rows})[event_id]
+                    _ = conn.execute(
+                        insert_event_winner,
+                        (event_id, pick["rsvp_id"], pick["movie"], pick["author"]),
+                    )
+                legacy = perf_counter() - start
+
+            with conn.transaction(force_rollback=True):
+                start = perf_counter()
+                claimed = conn.execute(claim_due_events, {"batch_size": events}).fetchall()
+                candidates = conn.execute(
+                    get_selection_candidates, {"event_ids": [row["id"] for row in claimed]}
+                ).fetchone()
+                winners = pick_winners(candidates, {row["id"]: new_seed() for row in claimed})
+                inserted = conn.execute(insert_event_winners, winner_columns(winners)).fetchall()
+                bulk = perf_counter() - start
+
+    print(f"[selection_bulk] Database, {events} due events x {rsvps} RSVPs:")
+    print(f"[selection_bulk]   per-event queries {legacy:.2f}s, claim + one pass {bulk:.2f}s ({len(inserted)} winners)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    _ = parser.add_argument("--events", type=int, default=10_000)
+    _ = parser.add_argument("--rsvps", type=int, default=8)
+    _ = parser.add_argument("--trials", type=int, default=20_000)
+    _ = parser.add_argument("--repeat", type=int, default=5, help="in-memory runs timed, the best one counts")
+    _ = parser.add_argument("--no-db", action="store_true")
+    args = parser.parse_args()
+
+    ok = check_in_memory(args.events, args.rsvps, args.repeat)
+    ok &= check_odds(args.trials)
+    if not args.no_db:
+        check_database(args.events, args.rsvps)
+    POOL.close()
+    print("[selection_bulk] OK" if ok else "[selection_bulk] FAIL")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+# backend/bench/serialization.py
+# What it costs per 1000 rows to fetch and encode the API's listings (event
+# page, event details page, RSVPs, author stats), the old way against the
+# current one:
+#   - fetch: JSON columns parsed by the stdlib json module or orjson, rows as
+#     dicts or tuples
+#   - encode: JSONResponse (stdlib json, plus jsonable_encoder for datetimes)
+#     against ORJSONResponse (backend/responses.py). Validating the rows with
+#     the response models first, as FastAPI does for handlers returning plain
+#     dicts, and orjson on tuple rows are shown for reference.
+# Fails when an orjson body differs from the stdlib one or doesn't match its
+# response model. Everything runs in a transaction that is rolled back at the
+# end. From the root directory:
+#   python -m backend.bench.serialization --rows 1000 --repeat 20
+import argparse
+import json
+import sys
+from collections.abc import Callable
+from time import perf_counter
+from typing import Any
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from psycopg.rows import dict_row, tuple_row
+from psycopg.types.json import set_json_loads
+from pydantic import BaseModel, TypeAdapter
+
+from ..api import EventsPage, author_stats_response, build_events_page_query
+from ..responses import (
+    AuthorsPageOut,
+    EventDetailsPageOut,
+    EventsPageOut,
+    ORJSONResponse,
+    RSVPsOut,
+)
+from ..SQL_UTIL.db import POOL
+from ..SQL_UTIL.operations import (
+    get_author_stats_page,
+    get_event_details_query,
+    get_events_query,
+)
+
+seed_events = """
+INSERT INTO events (title, genre, date, time, location, author, starts_at)
+SELECT 'Bench serialization ' || n, 'Action', '1/1/2030', '19:00', 'Bench',
+       'bench-serialization', NOW() - (n || ' hours')::INTERVAL
+FROM generate_series(1, %(rows)s) AS n
+"""
+
+# Every event gets RSVPs from rsvps_per_event consecutive authors
+seed_rsvps = """
+INSERT INTO rsvps (event_id, author, movie, weight)
+SELECT e.id, 'bench-serialization ' || LPAD(((e.id + k) %% %(rows)s)::TEXT, 6, '0'),
+       'Movie ' || k, 1 + k %% 3
+FROM events e, generate_series(1, %(rsvps_per_event)s) AS k
+WHERE e.author = 'bench-serialization'
+"""
+
+# Every other event already has a winner, so authors have a last_win_at
+seed_winners = """
+INSERT INTO event_winners (event_id, rsvp_id, movie, author, strategy, seed)
+SELECT DISTINCT ON (r.event_id) r.event_id, r.id, r.movie, r.author, 'weighted', 0
+FROM rsvps r
+JOIN events e ON e.id = r.event_id
+WHERE e.author = 'bench-serialization' AND e.id %% 2 = 0
+ORDER BY r.event_id, r.id
+"""
+
+get_seeded_rsvps = """
+SELECT event_id, id AS rsvp_id, author, movie, weight
+FROM rsvps
+WHERE author LIKE 'bench-serialization %%'
+ORDER BY id DESC
+LIMIT %s
+"""
+
+
+def timed(repeat: int, run: Callable[[], Any]) -> tuple[float, Any]:
+    # Median of repeat runs, and the last result
+    timings: list[float] = []
+    result = None
+    for _ in range(repeat):
+        start = perf_counter()
+        result = run()
+        timings.append(perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2], result
+
+
+def fetch(conn, query, params, row_factory) -> list:
+    with conn.cursor(row_factory=row_factory) as cur:
+        _ = cur.execute(query, params)
+        return cur.fetchall()
+
+
+def report(label: str, variant: str, seconds: float, rows: int):
+    print(f"[serialization] {label:<14} {variant:<34} {seconds * 1000 / rows * 1000:8.2f} ms/1k rows")
+
+
+def listings(conn, rows: int) -> dict[str, tuple]:
+    # label: (query, params, payload from dict rows, response model, stdlib encoding)
+    page = EventsPage.model_construct(
+        limit=rows, cursor=None, genre=None, author="bench-serialization",
+        starts_after=None, starts_before=None,
+    )
+    events_query, events_params = build_events_page_query(page, get_events_query)
+    details_query, details_params = build_events_page_query(page, get_event_details_query)
+    authors_params = {"cursor": "bench-serialization", "limit": rows}
+
+    def page_of(events):
+        return {"events": events[:rows], "next_cursor": None}
+
+    def stdlib(payload):
+        return JSONResponse(content=payload).body
+
+    def stdlib_encoded(payload):
+        return JSONResponse(content=jsonable_encoder(payload)).body
+
+    return {
+        "events": (events_query, events_params, page_of, EventsPageOut, stdlib),
+        "event details": (details_query, details_params, page_of, EventDetailsPageOut, stdlib),
+        "rsvps": (get_seeded_rsvps, (rows,), lambda r: {"rsvps": r}, RSVPsOut, stdlib),
+        "authors": (
+            get_author_stats_page,
+            authors_params,
+            lambda r: {"authors": [author_stats_response(a) for a in r], "next_cursor": None},
+            AuthorsPageOut,
+            stdlib_encoded,
+        ),
+    }
+
+
+def check(label: str, payload: Any, stdlib_body: bytes, model: type[BaseModel]) -> bool:
+    body = ORJSONResponse(content=payload).body
+    ok = True
+    if json.loads(body) != json.loads(stdlib_body):
+        print(f"[serialization] FAIL: {label}: orjson body differs from the stdlib one")
+        ok = False
+    try:
+        _ = model.model_validate_json(body)
+    except ValueError as e:
+        print(f"[serialization] FAIL: {label}: body doesn't match {model.__name__}: {e}")
+        ok = False
+    return ok
+
+
+def run(args) -> bool:
+    ok = True
+    with POOL.connection() as conn:
+        try:
+            with conn.cursor() as cur:
+                params = {"rows": args.rows, "rsvps_per_event": args.rsvps_per_event}
+                _ = cur.execute(seed_events, params)
+                _ = cur.execute(seed_rsvps, params)
+                _ = cur.execute(seed_winners, {})
+
+            for label, (query, params, build, model, stdlib) in listings(conn, args.rows).items():
+                set_json_loads(json.loads, conn)
+                seconds, rows = timed(args.repeat, lambda: fetch(conn, query, params, dict_row))
+                report(label, "fetch dict rows, stdlib json", seconds, len(rows))
+                set_json_loads(orjson.loads, conn)
+                seconds, rows = timed(args.repeat, lambda: fetch(conn, query, params, dict_row))
+                report(label, "fetch dict rows, orjson", seconds, len(rows))
+                seconds, tuples = timed(args.repeat, lambda: fetch(conn, query, params, tuple_row))
+                report(label, "fetch tuple rows, orjson", seconds, len(tuples))
+
+                payload = build(rows)
+                stdlib_seconds, stdlib_body = timed(args.repeat, lambda: stdlib(payload))
+                report(label, "encode JSONResponse", stdlib_seconds, len(rows))
+                adapter = TypeAdapter(model)
+                seconds, _body = timed(
+                    args.repeat, lambda: adapter.dump_json(adapter.validate_python(payload))
+                )
+                report(label, "encode response model", seconds, len(rows))
+                seconds, _body = timed(args.repeat, lambda: orjson.dumps(tuples))
+                report(label, "encode tuple rows, orjson", seconds, len(rows))
+                orjson_seconds, _body = timed(
+                    args.repeat, lambda: ORJSONResponse(content=payload).body
+                )
+                report(label, "encode ORJSONResponse", orjson_seconds, len(rows))
+
+                ok &= check(label, payload, stdlib_body, model)
+                if orjson_seconds >= stdlib_seconds:
+                    print(f"[serialization] FAIL: {label}: orjson was not faster")
+                    ok = False
+        finally:
+            conn.rollback()
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    _ = parser.add_argument("--rows", type=int, default=1000)
+    _ = parser.add_argument("--rsvps-per-event", type=int, default=5)
+    _ = parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    ok = run(args)
+    print("[serialization] OK" if ok else "[serialization] FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,536 @@
+# backend/bench/suite.py
+# Reproducible benchmark of the whole backend against a local Postgres:
+#   - seeds events, RSVPs, winners and movies (--events, --rsvps-per-event,
+#     --winners, --movies), all deterministic, deleted again at the end
+#   - starts the API (uvicorn backend.api:app) on --port, or uses --url
+#   - drives every route in backend/api.py with --requests requests each at
+#     --concurrency, sampling the API's async pool from /metrics meanwhile
+#   - times watcher ticks: idle ones and ones picking --due-events winners
+# Results (throughput, latency percentiles, pool saturation, tick times)
+# are written as JSON to --output. Compare two commits with
+#   python -m backend.bench.suite --output before.json
+#   git checkout other-commit
+#   python -m backend.bench.suite --compare before.json
+# which prints slower routes and exits 1 past --tolerance. A running
+# watcher would race the tick benchmark for due events, stop it first.
+# Dispatch is timed too when MOVIE_PICKER_RADARR_URL/_API_KEY are set
+# (e.g. to backend/bench/fake_radarr.py).
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from time import perf_counter
+
+import httpx
+from fastapi.routing import APIRoute
+from prometheus_client.parser import text_string_to_metric_families
+
+from ..api import app
+from ..dispatch import dispatch_pending
+from ..radarr import RadarrClient
+from ..SQL_UTIL.db import POOL, close_async_pool, open_async_pool
+from ..watcher import process_due_events, seconds_until_next_deadline
+
+BENCH_AUTHOR = "bench-suite"
+
+# Events spread over two years around now, none in the watcher's window
+seed_events = """
+INSERT INTO events (title, genre, date, time, location, author, selection_strategy, starts_at)
+SELECT 'Suite ' || n, (ARRAY['Action', 'Comedy', 'Drama', 'Horror'])[1 + n %% 4],
+       '', '', 'Bench', 'bench-suite',
+       (ARRAY['weighted', 'fair', 'plurality'])[1 + n %% 3],
+       NOW() + ((n %% 730) - 365) * INTERVAL '1 day' + INTERVAL '2 hours'
+FROM generate_series(1, %(events)s) AS n
+"""
+
+seed_rsvps = """
+INSERT INTO rsvps (event_id, author, movie, weight)
+SELECT e.id, 'bench-suite ' || ((e.id + k) %% %(authors)s),
+       'Bench Suite Movie ' || ((e.id * 7 + k) %% %(movies)s), 1 + (e.id + k) %% 3
+FROM events e, generate_series(1, %(rsvps_per_event)s) AS k
+WHERE e.author = 'bench-suite'
+"""
+
+# A share of the past events already have their winner
+seed_winners = """
+INSERT INTO event_winners (event_id, rsvp_id, movie, author, strategy, seed)
+SELECT DISTINCT ON (e.id) e.id, r.id, r.movie, r.author, e.selection_strategy, e.id
+FROM events e JOIN rsvps r ON r.event_id = e.id
+WHERE e.author = 'bench-suite' AND e.starts_at < NOW() AND e.id %% 100 < %(winners_pct)s
+ORDER BY e.id, r.id
+"""
+
+# Their Radarr jobs would turn the first watcher ticks into a dispatch run
+delete_seeded_outbox = "DELETE FROM outbox WHERE event_id IN (SELECT id FROM events WHERE author = 'bench-suite')"
+
+seed_movies = """
+INSERT INTO movies (tmdb_id, title, title_key, year, is_available)
+SELECT 20000000 + n, 'Bench Suite Movie ' || n, 'bench suite movie ' || n, 2000 + n %% 25, TRUE
+FROM generate_series(0, %(movies)s - 1) AS n
+ON CONFLICT (tmdb_id) DO NOTHING
+"""
+
+# Rows the DELETE routes remove, one per request
+seed_doomed_events = """
+INSERT INTO events (title, genre, date, time, location, author, starts_at)
+SELECT 'Suite doomed ' || n, 'Action', '', '', 'Bench', 'bench-suite', NOW() - INTERVAL '1 day'
+FROM generate_series(1, %(requests)s) AS n
+RETURNING id
+"""
+
+seed_doomed_rsvps = """
+INSERT INTO rsvps (event_id, author, movie)
+SELECT e.id, 'bench-suite doomed ' || e.id, 'Bench Suite Movie 0'
+FROM events e
+WHERE e.title LIKE 'Suite doomed %' AND e.author = 'bench-suite'
+RETURNING id
+"""
+
+seed_due_events = """
+WITH new_events AS (
+  INSERT INTO events (title, genre, date, time, location, author, starts_at)
+  SELECT 'Suite due ' || n, 'Action', '', '', 'Bench', 'bench-suite', NOW() + INTERVAL '30 minutes'
+  FROM generate_series(1, %(events)s) AS n
+  RETURNING id
+)
+INSERT INTO rsvps (event_id, author, movie)
+SELECT id, 'bench-suite ' || k, 'Bench Suite Movie ' || (id %% 100)
+FROM new_events, generate_series(1, 3) AS k
+"""
+
+get_seeded_ids = """
+SELECT e.id AS event_id, MIN(r.id) AS rsvp_id
+FROM events e JOIN rsvps r ON r.event_id = e.id
+WHERE e.author = 'bench-suite' AND e.title NOT LIKE 'Suite doomed %'
+GROUP BY e.id
+ORDER BY e.id
+"""
+
+delete_seeded = """
+DELETE FROM events WHERE author = 'bench-suite';
+DELETE FROM movies WHERE title LIKE 'Bench Suite Movie %';
+DELETE FROM author_stats
+WHERE author LIKE 'bench-suite%' AND rsvp_count = 0 AND win_count = 0
+"""
+
+
+class Seeded:
+    # Ids the request builders pick from
+
+    def __init__(self, args, rows: list[dict], doomed_events: list[int], doomed_rsvps: list[int]):
+        self.event_ids = [row["event_id"] for row in rows]
+        self.rsvp_ids = [row["rsvp_id"] for row in rows]
+        self.authors = [f"{BENCH_AUTHOR} {i}" for i in range(args.authors)]
+        self.movies = args.movies
+        self.doomed_events = doomed_events
+        self.doomed_rsvps = doomed_rsvps
+
+
+def seed(args) -> Seeded:
+    params = {
+        "events": args.events,
+        "authors": args.authors,
+        "movies": args.movies,
+        "rsvps_per_event": args.rsvps_per_event,
+        "winners_pct": round(args.winners * 100),
+        "requests": args.requests + args.warmup,
+    }
+    start = perf_counter()
+    with POOL.connection() as conn:
+        _ = conn.execute(delete_seeded)
+        _ = conn.execute(seed_events, params)
+        _ = conn.execute(seed_rsvps, params)
+        _ = conn.execute(seed_winners, params)
+        _ = conn.execute(delete_seeded_outbox)
+        _ = conn.execute(seed_movies, params)
+        doomed_events = [row["id"] for row in conn.execute(seed_doomed_events, params).fetchall()]
+        doomed_rsvps = [row["id"] for row in conn.execute(seed_doomed_rsvps).fetchall()]
+        _ = conn.execute("ANALYZE events, rsvps, event_winners, author_stats, movies")
+        rows = conn.execute(get_seeded_ids).fetchall()
+    print(f"[suite] Seeded {args.events} events x {args.rsvps_per_event} RSVPs, {args.movies} movies in {perf_counter() - start:.1f}s")
+    return Seeded(args, rows, doomed_events, doomed_rsvps)
+
+
+def delete_seeded_rows():
+    with POOL.connection() as conn:
+        _ = conn.execute(delete_seeded)
+
+
+# Request builders: (seeded ids, request number, rng) -> request. Every route
+# gets at least one, main refuses to start when a route is missing.
+def event_body(i: int) -> dict:
+    return {
+        "title": f"Suite posted {i}",
+        "genre": "Action",
+        "date": "01/15/2020",
+        "time": "20:00",
+        "location": "Bench",
+        "author": BENCH_AUTHOR,
+    }
+
+
+def rsvp_body(s: Seeded, i: int, rng: random.Random) -> dict:
+    return {"event_id": rng.choice(s.event_ids), "author": f"{BENCH_AUTHOR} posted {i}", "movie": "Bench Suite Movie 1"}
+
+
+def events_params(s: Seeded, rng: random.Random) -> dict:
+    return rng.choice(
+        [
+            {},
+            {"limit": 100},
+            {"genre": "Drama"},
+            {"author": BENCH_AUTHOR, "limit": 50},
+            {"cursor": rng.choice(s.event_ids)},
+        ]
+    )
+
+
+SCENARIOS = [
+    # name, method, route template, build -> (path, httpx kwargs), accepted statuses
+    ("health", "GET", "/api/health", lambda s, i, rng: ("/api/health", {}), {200}),
+    ("metrics", "GET", "/metrics", lambda s, i, rng: ("/metrics", {}), {200}),
+    ("events", "GET", "/api/events", lambda s, i, rng: ("/api/events", {"params": events_params(s, rng)}), {200}),
+    ("event_details", "GET", "/api/events/details", lambda s, i, rng: ("/api/events/details", {"params": events_params(s, rng)}), {200}),
+    ("rsvps", "GET", "/api/rsvps/{event_id}", lambda s, i, rng: (f"/api/rsvps/{rng.choice(s.event_ids)}", {}), {200}),
+    ("winner", "GET", "/api/events/winner/{event_id}", lambda s, i, rng: (f"/api/events/winner/{rng.choice(s.event_ids)}", {}), {200, 404}),
+    ("authors", "GET", "/api/authors", lambda s, i, rng: ("/api/authors", {"params": rng.choice([{}, {"cursor": rng.choice(s.authors)}])}), {200}),
+    ("author", "GET", "/api/authors/{author}", lambda s, i, rng: (f"/api/authors/{rng.choice(s.authors)}", {}), {200}),
+    ("movies", "GET", "/api/movies/{movie}", lambda s, i, rng: (f"/api/movies/bench suite movie {rng.randrange(1, 10)}", {}), {200}),
+    ("movies_cache", "GET", "/api/movies/cache", lambda s, i, rng: ("/api/movies/cache", {}), {200}),
+    ("live", "GET", "/api/live", lambda s, i, rng: ("/api/live", {"params": {"event_id": rng.choice(s.event_ids)}}), {200}),
+    ("live_stats", "GET", "/api/live/stats", lambda s, i, rng: ("/api/live/stats", {}), {200}),
+    # One export at a time, the others get 503 (backend/export.py)
+    ("export", "GET", "/api/export/{dataset}", lambda s, i, rng: (f"/api/export/{rng.choice(['events', 'rsvps', 'winners'])}", {"params": {"format": ("ndjson", "csv")[i % 2]}}), {200, 503}),
+    ("create_event", "POST", "/api/events", lambda s, i, rng: ("/api/events", {"json": event_body(i)}), {200}),
+    ("create_rsvp", "POST", "/api/rsvps", lambda s, i, rng: ("/api/rsvps", {"json": rsvp_body(s, i, rng)}), {200}),
+    ("bulk_events", "POST", "/api/events/bulk", lambda s, i, rng: ("/api/events/bulk", {"json": [event_body(i * 20 + k) for k in range(20)]}), {200}),
+    ("bulk_rsvps", "POST", "/api/rsvps/bulk", lambda s, i, rng: ("/api/rsvps/bulk", {"json": [rsvp_body(s, i * 20 + k, rng) for k in range(20)]}), {200}),
+    ("patch_event", "PATCH", "/api/events/{event_id}", lambda s, i, rng: (f"/api/events/{rng.choice(s.event_ids)}", {"json": {"location": f"Bench {i}"}}), {200}),
+    ("patch_rsvp", "PATCH", "/api/rsvps/{rsvp_id}", lambda s, i, rng: (f"/api/rsvps/{rng.choice(s.rsvp_ids)}", {"json": {"weight": 1 + i % 3}}), {200}),
+    ("delete_rsvp", "DELETE", "/api/rsvps/{rsvp_id}", lambda s, i, rng: (f"/api/rsvps/{s.doomed_rsvps[i % len(s.doomed_rsvps)]}", {}), {200}),
+    ("delete_event", "DELETE", "/api/events/{event_id}", lambda s, i, rng: (f"/api/events/{s.doomed_events[i % len(s.doomed_events)]}", {}), {200}),
+]
+
+
+def missing_routes() -> list[str]:
+    covered = {(method, route) for _, method, route, _, _ in SCENARIOS}
+    return [
+        f"{method} {route.path}"
+        for route in app.routes
+        if isinstance(route, APIRoute)
+        for method in route.methods
+        if (method, route.path) not in covered
+    ]
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, round(pct / 100 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def latency_summary(latencies: list[float]) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p90_ms": round(percentile(latencies, 90) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+    }
+
+
+async def pool_stats(client: httpx.AsyncClient) -> dict[str, float]:
+    # The API's async pool, as exported by PoolStatsCollector
+    text = (await client.get("/metrics")).text
+    stats = {}
+    for family in text_string_to_metric_families(text):
+        if family.name.startswith("movie_picker_pool_"):
+            for sample in family.samples:
+                if sample.labels.get("pool") == "async":
+                    stats[family.name.removeprefix("movie_picker_pool_")] = sample.value
+    return stats
+
+
+async def sample_pool(client: httpx.AsyncClient, peaks: dict[str, float], interval: float):
+    while True:
+        stats = await pool_stats(client)
+        in_use = stats.get("pool_size", 0) - stats.get("pool_available", 0)
+        peaks["in_use"] = max(peaks["in_use"], in_use)
+        peaks["waiting"] = max(peaks["waiting"], stats.get("requests_waiting", 0))
+        await asyncio.sleep(interval)
+
+
+async def send(client: httpx.AsyncClient, method: str, path: str, kwargs: dict) -> int:
+    if path == "/api/live":
+        # The stream never ends: time until the first message, then hang up
+        async with client.stream(method, path, **kwargs) as response:
+            async for _ in response.aiter_lines():
+                break
+            return response.status_code
+    response = await client.request(method, path, **kwargs)
+    return response.status_code
+
+
+async def run_route(client, sampler_client, scenario, seeded: Seeded, args) -> dict:
+    name, method, route, build, accepted = scenario
+    # Requests are built up front from a per-route seed, the same on every run
+    rng = random.Random(f"{args.seed}:{name}")
+    requests = [build(seeded, i, rng) for i in range(args.requests)]
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    errors = 0
+    next_request = iter(requests)
+
+    async def worker():
+        nonlocal errors
+        for path, kwargs in next_request:
+            start = perf_counter()
+            try:
+                status = await send(client, method, path, kwargs)
+            except httpx.HTTPError:
+                status = 0
+            latencies.append(perf_counter() - start)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if status not in accepted:
+                errors += 1
+
+    # Unrecorded warm-up: connections, prepared plans, caches
+    for path, kwargs in [build(seeded, i, rng) for i in range(args.requests, args.requests + args.warmup)]:
+        _ = await send(client, method, path, kwargs)
+
+    before = await pool_stats(sampler_client)
+    peaks = {"in_use": 0.0, "waiting": 0.0}
+    sampler = asyncio.create_task(sample_pool(sampler_client, peaks, args.sample_interval))
+    start = perf_counter()
+    _ = await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = perf_counter() - start
+    _ = sampler.cancel()
+    _ = await asyncio.gather(sampler, return_exceptions=True)
+    after = await pool_stats(sampler_client)
+
+    result = {
+        "method": method,
+        "route": route,
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": statuses,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        **latency_summary(latencies),
+        "pool": {
+            "max": after.get("pool_max", 0),
+            "peak_in_use": peaks["in_use"],
+            "peak_waiting": peaks["waiting"],
+            "queued": after.get("requests_queued", 0) - before.get("requests_queued", 0),
+            "wait_ms": after.get("requests_wait_ms", 0) - before.get("requests_wait_ms", 0),
+        },
+    }
+    print(f"[suite] {method} {route}: {result['throughput_rps']} req/s, p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms, {errors} errors, pool peak {peaks['in_use']:g}/{result['pool']['max']:g} in use, {result['pool']['queued']:g} queued")
+    return result
+
+
+async def run_routes(url: str, seeded: Seeded, args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results = {}
+    async with (
+        httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client,
+        httpx.AsyncClient(base_url=url, timeout=30) as sampler_client,
+    ):
+        # Autocomplete should be answered from the seeded movies, not Radarr
+        for _ in range(50):
+            cache = (await client.get("/api/movies/cache")).json()
+            if cache["indexed_movies"] >= args.movies:
+                break
+            await asyncio.sleep(0.2)
+        for scenario in SCENARIOS:
+            if args.routes and scenario[0] not in args.routes:
+                continue
+            results[scenario[0]] = await run_route(client, sampler_client, scenario, seeded, args)
+    return results
+
+
+async def timed_tick(radarr: RadarrClient) -> dict[str, float]:
+    # One watcher loop iteration, as in backend/watcher.py main()
+    timings = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = perf_counter()
+        await process_due_events()
+        timings["pick"] = perf_counter() - start
+        start = perf_counter()
+        _ = await dispatch_pending(radarr)
+        timings["dispatch"] = perf_counter() - start
+        start = perf_counter()
+        _ = await seconds_until_next_deadline(radarr.configured)
+        timings["deadline"] = perf_counter() - start
+    timings["total"] = sum(timings.values())
+    return timings
+
+
+def tick_summary(ticks: list[dict[str, float]]) -> dict:
+    return {part: latency_summary([tick[part] for tick in ticks]) for part in ticks[0]} if ticks else {}
+
+
+async def run_ticks(args) -> dict:
+    await open_async_pool("watcher")
+    radarr = RadarrClient()
+    try:
+        idle = [await timed_tick(radarr) for _ in range(args.ticks)]
+        busy = []
+        for _ in range(args.ticks):
+            with POOL.connection() as conn:
+                _ = conn.execute(seed_due_events, {"events": args.due_events})
+            busy.append(await timed_tick(radarr))
+    finally:
+        await radarr.aclose()
+        await close_async_pool()
+
+    results = {
+        "radarr_configured": radarr.configured,
+        "idle": tick_summary(idle),
+        f"due_{args.due_events}": tick_summary(busy),
+    }
+    for name in ("idle", f"due_{args.due_events}"):
+        total = results[name]["total"]
+        print(f"[suite] Watcher tick, {name}: p50 {total['p50_ms']} ms, max {total['max_ms']} ms")
+    return results
+
+
+@contextlib.contextmanager
+def api_server(args):
+    if args.url:
+        yield args.url
+        return
+    url = f"http://127.0.0.1:{args.port}"
+    log_path = os.path.join(tempfile.mkdtemp(prefix="suite-"), "api.log")
+    with open(log_path, "w") as log:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.api:app", "--port", str(args.port), "--log-level", "warning"],
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+        try:
+            for _ in range(100):
+                try:
+                    if httpx.get(f"{url}/api/health").status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    pass
+                if server.poll() is not None:
+                    raise SystemExit(f"[suite] The API exited, see {log_path}")
+                time.sleep(0.1)
+            print(f"[suite] API started on {url}, log in {log_path}")
+            yield url
+        finally:
+            server.terminate()
+            _ = server.wait()
+
+
+def git_commit() -> str | None:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("-dirty" if dirty else "")
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    # Slower p50 or lower throughput than the baseline, past the tolerance.
+    # p99 is in the results but too noisy at a few hundred requests to gate on.
+    ok = True
+    print(f"[suite] Compared with {baseline['meta'].get('commit')}:")
+    for name, route in results["routes"].items():
+        old = baseline["routes"].get(name)
+        if not old:
+            continue
+        for key, worse in (("p50_ms", 1), ("throughput_rps", -1)):
+            if not old[key]:
+                continue
+            change = (route[key] - old[key]) / old[key]
+            if change * worse > tolerance:
+                print(f"[suite]   REGRESSION {name} {key}: {old[key]} -> {route[key]} ({change:+.0%})")
+                ok = False
+    for name, tick in results["watcher"].items():
+        old = baseline["watcher"].get(name)
+        if not isinstance(tick, dict) or not old or "total" not in old:
+            continue
+        before, after = old["total"]["p50_ms"], tick["total"]["p50_ms"]
+        if before and (after - before) / before > tolerance:
+            print(f"[suite]   REGRESSION watcher {name} p50: {before} -> {after} ms")
+            ok = False
+    if ok:
+        print(f"[suite]   No route or tick more than {tolerance:.0%} worse")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    _ = parser.add_argument("--url", help="benchmark a running API instead of starting one")
+    _ = parser.add_argument("--port", type=int, default=8765)
+    _ = parser.add_argument("--events", type=int, default=10_000)
+    _ = parser.add_argument("--rsvps-per-event", type=int, default=8)
+    _ = parser.add_argument("--authors", type=int, default=500)
+    _ = parser.add_argument("--winners", type=float, default=0.8, help="share of past events with a winner")
+    _ = parser.add_argument("--movies", type=int, default=1000)
+    _ = parser.add_argument("--requests", type=int, default=500, help="requests per route")
+    _ = parser.add_argument("--concurrency", type=int, default=20)
+    _ = parser.add_argument("--warmup", type=int, default=20, help="unrecorded requests per route")
+    _ = parser.add_argument("--routes", nargs="*", help="only these scenarios, by name")
+    _ = parser.add_argument("--ticks", type=int, default=5)
+    _ = parser.add_argument("--due-events", type=int, default=500)
+    _ = parser.add_argument("--sample-interval", type=float, default=0.1)
+    _ = parser.add_argument("--seed", type=int, default=1)
+    _ = parser.add_argument("--output", default="bench_suite.json")
+    _ = parser.add_argument("--compare", help="a previous --output to check for regressions")
+    _ = parser.add_argument("--tolerance", type=float, default=0.2)
+    _ = parser.add_argument("--keep", action="store_true", help="leave the seeded rows")
+    args = parser.parse_args()
+
+    missing = missing_routes()
+    if missing:
+        raise SystemExit(f"[suite] No benchmark scenario for: {', '.join(missing)}")
+
+    seeded = seed(args)
+    try:
+        with api_server(args) as url:
+            routes = asyncio.run(run_routes(url, seeded, args))
+        watcher = asyncio.run(run_ticks(args))
+    finally:
+        if not args.keep:
+            delete_seeded_rows()
+        POOL.close()
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        },
+        "routes": routes,
+        "watcher": watcher,
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"[suite] Results written to {args.output}")
+
+    ok = all(route["errors"] == 0 for route in routes.values())
+    if not ok:
+        print("[suite] FAIL: some requests got unexpected statuses")
+    if args.compare:
+        with open(args.compare) as f:
+            ok &= compare(results, json.load(f), args.tolerance)
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# backend/bulk.py
+import json
+import os
+from collections.abc import AsyncIterator, Callable
+from typing import Any
+
+from fastapi import Request
+from psycopg import AsyncCursor
+from pydantic import BaseModel, ValidationError
+
+from .deadline import deadline_after
+from .SQL_UTIL.db import ASYNC_POOL
+from .SQL_UTIL.operations import lock_author_stats, lock_existing_event_ids
+
+# Rows per INSERT statement, each column sent as one array parameter
+BULK_CHUNK_SIZE = 1000
+# Upper bound on rows per request, results are kept in memory
+BULK_MAX_ROWS = 50_000
+# Bulk routes skip the API's request deadline. Their budget starts once the
+# body has been read and covers the pool checkout and every insert, so a
+# slow upload doesn't eat into it.
+BULK_TIMEOUT_SECONDS = float(os.environ.get("MOVIE_PICKER_BULK_TIMEOUT", 120))
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl", "application/jsonlines")
+
+
+class BulkRequestError(Exception):
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+async def read_bulk_items(request: Request) -> AsyncIterator[bytes | Any]:
+    # NDJSON bodies are consumed line by line as they stream in, anything
+    # else must be a JSON array
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith(NDJSON_CONTENT_TYPES):
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield line
+        if buffer.strip():
+            yield buffer
+        return
+
+    try:
+        items = json.loads(await request.body())
+    except json.JSONDecodeError as e:
+        raise BulkRequestError(400, f"Invalid JSON: {e}")
+    if not isinstance(items, list):
+        raise BulkRequestError(400, "Expected a JSON array or NDJSON body.")
+    for item in items:
+        yield item
+
+
+async def parse_bulk_rows(
+    request: Request, model: type[BaseModel]
+) -> tuple[list[tuple[int, BaseModel]], list[dict]]:
+    # Returns the valid rows with their position in the body, plus a result
+    # entry for every row that failed validation
+    rows: list[tuple[int, BaseModel]] = []
+    invalid: list[dict] = []
+    index = 0
+    async for item in read_bulk_items(request):
+        if index >= BULK_MAX_ROWS:
+            raise BulkRequestError(413, f"At most {BULK_MAX_ROWS} rows per request.")
+        try:
+            if isinstance(item, bytes):
+                rows.append((index, model.model_validate_json(item)))
+            else:
+                rows.append((index, model.model_validate(item)))
+        except ValidationError as e:
+            invalid.append(
+                {
+                    "index": index,
+                    "status": "invalid",
+                    "errors": e.errors(
+                        include_url=False, include_context=False, include_input=False
+                    ),
+                }
+            )
+        index += 1
+    return rows, invalid
+
+
+async def insert_chunk(
+    cur: AsyncCursor,
+    query: str,
+    rows: list[tuple[int, tuple]],
+    key_of: Callable[[tuple], tuple] | None,
+) -> list[dict]:
+    # One statement for the whole chunk, so its statement triggers fire once.
+    # The query UNNESTs one array per column and returns the new ids.
+    columns = [list(column) for column in zip(*(params for _, params in rows))]
+    _ = await cur.execute(query, columns)
+    inserted = await cur.fetchall()
+
+    if key_of is None:
+        # Nothing is skipped. Rows go in in the order they were sent, and
+        # take increasing ids from the sequence as they do.
+        ids = sorted(row["id"] for row in inserted)
+        return [
+            {"index": index, "status": "created", "id": new_id}
+            for (index, _), new_id in zip(rows, ids)
+        ]
+
+    # ON CONFLICT DO NOTHING: the query also returns the conflict key after
+    # the id, rows that got none back were skipped. Of two rows with the
+    # same key in one chunk, the first one went in.
+    ids = {tuple(row.values())[1:]: row["id"] for row in inserted}
+    results: list[dict] = []
+    for index, params in rows:
+        new_id = ids.pop(key_of(params), None)
+        if new_id is None:
+            results.append({"index": index, "status": "conflict"})
+        else:
+            results.append({"index": index, "status": "created", "id": new_id})
+    return results
+
+
+async def bulk_insert(
+    request: Request,
+    model: type[BaseModel],
+    query: str,
+    to_params: Callable[[Any], tuple],
+    key_of: Callable[[tuple], tuple] | None = None,
+    event_id_of: Callable[[Any], int] | None = None,
+    author_of: Callable[[Any], str] | None = None,
+) -> list[dict]:
+    # to_params gives a row's values in the query's column order, key_of the
+    # ON CONFLICT key out of those values for queries that skip rows
+    rows, results = await parse_bulk_rows(request, model)
+
+    # Everything goes in under one transaction
+    with deadline_after(BULK_TIMEOUT_SECONDS):
+        async with ASYNC_POOL.connection() as conn:
+            async with conn.transaction():
+                async with conn.cursor() as cur:
+                    if event_id_of:
+                        # Rows for missing events would fail the foreign key and
+                        # abort the whole batch, report them per row instead
+                        event_ids = list({event_id_of(row) for _, row in rows})
+                        _ = await cur.execute(lock_existing_event_ids, (event_ids,))
+                        existing = {row["id"] for row in await cur.fetchall()}
+                        results += [
+                            {"index": index, "status": "event_not_found"}
+                            for index, row in rows
+                            if event_id_of(row) not in existing
+                        ]
+                        rows = [(i, row) for i, row in rows if event_id_of(row) in existing]
+
+                    if author_of and rows:
+                        # RSVP inserts lock their authors' author_stats rows from
+                        # a trigger. Taking every author of the batch now, in the
+                        # order the triggers use, keeps a later chunk from waiting
+                        # on an author that the watcher or another batch holds
+                        # while it waits on one this batch already locked
+                        authors = list({author_of(row) for _, row in rows})
+                        _ = await cur.execute(lock_author_stats, (authors,))
+
+                    for start in range(0, len(rows), BULK_CHUNK_SIZE):
+                        chunk = rows[start : start + BULK_CHUNK_SIZE]
+                        results += await insert_chunk(
+                            cur, query, [(index, to_params(row)) for index, row in chunk], key_of
+                        )
+
+    results.sort(key=lambda result: result["index"])
+    return results
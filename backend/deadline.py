@@ -0,0 +1,85 @@
+# backend/deadline.py
+# Per-request time budget. DeadlineMiddleware gives every API request one,
+# and each wait on the way down is capped by what is left of it: pool
+# checkout, every query (cancelled in Postgres when time runs out) and Radarr
+# calls. Out of time, the API answers 504 instead of piling up work nobody
+# waits for anymore. Code outside a request (the watcher) has no deadline and
+# keeps the plain timeouts, and so do routes the middleware is told to skip
+# (the bulk imports, which set their own once the upload is read).
+import asyncio
+import os
+from collections.abc import Collection, Coroutine
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import monotonic
+from typing import Any
+
+REQUEST_TIMEOUT_SECONDS = float(os.environ.get("MOVIE_PICKER_REQUEST_TIMEOUT", 10))
+
+# monotonic() time the current request has to be answered by
+DEADLINE: ContextVar[float | None] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def remaining() -> float | None:
+    # Seconds left for the current request, None without a deadline
+    deadline = DEADLINE.get()
+    if deadline is None:
+        return None
+    left = deadline - monotonic()
+    if left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+    return left
+
+
+@contextmanager
+def deadline_after(seconds: float):
+    token = DEADLINE.set(monotonic() + seconds)
+    try:
+        yield
+    finally:
+        DEADLINE.reset(token)
+
+
+async def within_deadline(awaitable: Coroutine[Any, Any, Any], what: str) -> Any:
+    # Awaits it, cancelled once the request's time is up
+    try:
+        left = remaining()
+    except DeadlineExceeded:
+        awaitable.close()
+        raise
+    if left is None:
+        return await awaitable
+    timeout = asyncio.timeout(left)
+    try:
+        async with timeout:
+            return await awaitable
+    except TimeoutError as e:
+        if not timeout.expired():
+            raise
+        raise DeadlineExceeded(f"Request deadline exceeded waiting for {what}") from e
+
+
+class DeadlineMiddleware:
+    # Plain ASGI middleware like MetricsMiddleware. Streaming responses keep
+    # the deadline but only use it for the queries they run. exempt holds the
+    # (method, path) of routes that get no deadline here.
+
+    def __init__(
+        self,
+        app,
+        seconds: float = REQUEST_TIMEOUT_SECONDS,
+        exempt: Collection[tuple[str, str]] = (),
+    ):
+        self.app = app
+        self.seconds = seconds
+        self.exempt = frozenset(exempt)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (scope["method"], scope["path"]) in self.exempt:
+            return await self.app(scope, receive, send)
+        with deadline_after(self.seconds):
+            return await self.app(scope, receive, send)
@@ -0,0 +1,160 @@
+# backend/dispatch.py
+import asyncio
+import os
+
+from .metrics import DISPATCH_DURATION, DISPATCH_RESULTS
+from .movie_index import resolve_movie, store_movies
+from .radarr import RadarrClient, RadarrError
+from .SQL_UTIL.db import ASYNC_POOL
+from .SQL_UTIL.operations import (
+    claim_outbox_jobs,
+    radarr_add_job,
+    record_outbox_job_failed,
+    record_outbox_job_sent,
+)
+
+# How many winners are sent to Radarr at the same time
+DISPATCH_CONCURRENCY = int(os.environ.get("MOVIE_PICKER_DISPATCH_CONCURRENCY", 4))
+# Outbox jobs claimed at once, claiming goes on until the outbox is drained
+DISPATCH_BATCH_SIZE = 100
+# After this many failed attempts a job is left as 'dead' for a human to look at
+DISPATCH_MAX_ATTEMPTS = 10
+# How long a claimed batch belongs to this watcher, after that another replica
+# may send it again. Should outlast a normal run; a resend after a slow one is
+# harmless since Radarr answers MovieExistsValidator.
+DISPATCH_LEASE_SECONDS = int(os.environ.get("MOVIE_PICKER_DISPATCH_LEASE_SECONDS", 600))
+
+
+async def dispatch_pending(radarr: RadarrClient) -> int:
+    # Drain the Radarr jobs from the outbox, returns how many failed
+    if not radarr.configured:
+        print("[dispatch] Radarr is not configured, leaving winners unsent")
+        return 0
+
+    failed = 0
+    while True:
+        jobs = await claim_jobs(radarr_add_job, DISPATCH_BATCH_SIZE)
+        if not jobs:
+            return failed
+        print(f"[dispatch] Sending {len(jobs)} winners to Radarr")
+        with DISPATCH_DURATION.time():
+            failed += await dispatch_jobs(radarr, jobs)
+        if len(jobs) < DISPATCH_BATCH_SIZE:
+            return failed
+
+
+async def claim_jobs(
+    kind: str, batch_size: int, lease_seconds: int = DISPATCH_LEASE_SECONDS
+) -> list[dict]:
+    # Commits right away: while Radarr is called only the lease is held,
+    # no locks and no pool connection
+    async with ASYNC_POOL.connection() as conn:
+        async with conn.cursor() as cur:
+            _ = await cur.execute(
+                claim_outbox_jobs,
+                {
+                    "kind": kind,
+                    "lease_seconds": lease_seconds,
+                    "batch_size": batch_size,
+                },
+            )
+            return await cur.fetchall()
+
+
+async def dispatch_jobs(radarr: RadarrClient, jobs: list[dict]) -> int:
+    # Root folder and quality profile are cached by the client, without them
+    # (Radarr never answered yet) no movie can be added
+    try:
+        _ = await radarr.settings()
+    except RadarrError as e:
+        print(f"[dispatch] Could not get the Radarr root folder and quality profile: {e}")
+        for job in jobs:
+            await record_result(job, "failed", f"Radarr settings: {e}")
+        DISPATCH_RESULTS.labels("failed").inc(len(jobs))
+        return len(jobs)
+
+    queue: asyncio.Queue[dict] = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+
+    failed: list[int] = []
+    workers = [
+        asyncio.create_task(dispatch_worker(radarr, queue, failed))
+        for _ in range(min(DISPATCH_CONCURRENCY, len(jobs)))
+    ]
+    await queue.join()
+    for worker in workers:
+        _ = worker.cancel()
+    _ = await asyncio.gather(*workers, return_exceptions=True)
+
+    print(f"[dispatch] Sent {len(jobs) - len(failed)}, failed {len(failed)}")
+    return len(failed)
+
+
+async def dispatch_worker(
+    radarr: RadarrClient,
+    queue: asyncio.Queue[dict],
+    failed: list[int],
+):
+    while True:
+        job = await queue.get()
+        status = "sent"
+        error = None
+        try:
+            await send_winner(radarr, job["payload"])
+        except Exception as e:
+            print(f"[dispatch] Error sending {job['payload']['movie']} to Radarr: {e}")
+            status = "failed"
+            error = str(e)
+
+        try:
+            await record_result(job, status, error)
+        except Exception as e:
+            # Keep the worker alive, otherwise queue.join() never returns.
+            # The job stays claimed and is retried once its lease runs out.
+            print(f"[dispatch] Error recording status for event {job['event_id']}: {e}")
+            status = "failed"
+        finally:
+            queue.task_done()
+
+        DISPATCH_RESULTS.labels(status).inc()
+        if status == "failed":
+            failed.append(job["event_id"])
+
+
+async def send_winner(radarr: RadarrClient, winner: dict):
+    movie = winner["movie"]
+    # Titles picked from autocomplete are usually in the movies table already
+    res_movie_obj = await resolve_movie(movie)
+    if res_movie_obj is None:
+        print(f"[dispatch] Radarr looking up movie: {movie}")
+        results = await radarr.lookup(movie)
+        if not results:
+            raise RadarrError(f"No results found in Radarr lookup for {movie}")
+        await store_movies(results)
+
+        # Prioritize the first fuzzy result and its TMDB ID
+        res_movie_obj = results[0]
+    print(f"[dispatch] First result TMDB ID: {res_movie_obj.get('tmdbId')}")
+
+    response = await radarr.add_movie(res_movie_obj)
+    print(f"[dispatch] Radarr add movie response: {response.status_code}")
+
+
+async def record_result(job: dict, status: str, error: str | None):
+    # The outbox row and the winner's status, one statement per job
+    async with ASYNC_POOL.connection() as conn:
+        if status == "sent":
+            _ = await conn.execute(
+                record_outbox_job_sent, {"id": job["id"], "event_id": job["event_id"]}
+            )
+        else:
+            _ = await conn.execute(
+                record_outbox_job_failed,
+                {
+                    "id": job["id"],
+                    "event_id": job["event_id"],
+                    "error": error,
+                    "max_attempts": DISPATCH_MAX_ATTEMPTS,
+                },
+            )
@@ -0,0 +1,125 @@
+# backend/export.py
+# Whole-table exports for analytics: events, RSVPs or winners as NDJSON (one
+# JSON object per line) or CSV with a header row. Rows are streamed from
+# Postgres to the client in chunks and never held all at once, so memory
+# stays flat whatever the table size: NDJSON reads EXPORT_BATCH_ROWS at a
+# time from a server-side cursor, CSV is Postgres' own COPY TO STDOUT output.
+# Served by GET /api/export/{dataset}, or from the root directory:
+#   python -m backend.export events --format csv --output events.csv
+#   python -m backend.export rsvps > rsvps.ndjson
+import argparse
+import asyncio
+import os
+import sys
+from collections.abc import AsyncIterator
+from contextlib import aclosing
+from time import perf_counter
+from typing import Literal
+
+import orjson
+from psycopg.rows import dict_row
+from psycopg.sql import SQL
+
+from .SQL_UTIL.db import ASYNC_POOL, close_async_pool, open_async_pool
+from .SQL_UTIL.operations import (
+    copy_to_csv,
+    disable_statement_timeout_locally,
+    export_events,
+    export_rsvps,
+    export_winners,
+)
+
+ExportDataset = Literal["events", "rsvps", "winners"]
+ExportFormat = Literal["ndjson", "csv"]
+
+EXPORT_QUERIES: dict[str, str] = {
+    "events": export_events,
+    "rsvps": export_rsvps,
+    "winners": export_winners,
+}
+CONTENT_TYPES: dict[str, str] = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# Rows per FETCH from the server-side cursor
+EXPORT_BATCH_ROWS = 5000
+# COPY sends a message per row, they are passed on in chunks of about this size
+EXPORT_CHUNK_BYTES = 256 * 1024
+# Exports running at once in an API process. Each one keeps a pool connection
+# (and a transaction) until the client has read everything.
+EXPORT_CONCURRENCY = int(os.environ.get("MOVIE_PICKER_EXPORT_CONCURRENCY", 1))
+EXPORT_SLOTS = asyncio.Semaphore(EXPORT_CONCURRENCY)
+
+
+async def ndjson_chunks(dataset: ExportDataset) -> AsyncIterator[bytes]:
+    async with ASYNC_POOL.connection() as conn:
+        # Server-side cursors only live inside a transaction. Every FETCH is
+        # its own statement, well within statement_timeout.
+        async with conn.transaction():
+            async with conn.cursor(name=f"export_{dataset}", row_factory=dict_row) as cur:
+                _ = await cur.execute(EXPORT_QUERIES[dataset])
+                while rows := await cur.fetchmany(EXPORT_BATCH_ROWS):
+                    yield b"".join(
+                        orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE) for row in rows
+                    )
+
+
+async def csv_chunks(dataset: ExportDataset) -> AsyncIterator[bytes]:
+    query = SQL(copy_to_csv).format(SQL(EXPORT_QUERIES[dataset]))
+    async with ASYNC_POOL.connection() as conn:
+        async with conn.transaction():
+            _ = await conn.execute(disable_statement_timeout_locally)
+            async with conn.cursor() as cur:
+                async with cur.copy(query) as copy:
+                    buffer = bytearray()
+                    async for data in copy:
+                        buffer += data
+                        if len(buffer) >= EXPORT_CHUNK_BYTES:
+                            yield bytes(buffer)
+                            buffer.clear()
+                    if buffer:
+                        yield bytes(buffer)
+
+
+async def export_chunks(dataset: ExportDataset, fmt: ExportFormat) -> AsyncIterator[bytes]:
+    # Waits for a free export slot. The API checks for one before it answers,
+    # so this only waits when two exports started at the same time.
+    async with EXPORT_SLOTS:
+        chunks = ndjson_chunks(dataset) if fmt == "ndjson" else csv_chunks(dataset)
+        # Closed right away if the client goes, which gives the connection back
+        async with aclosing(chunks):
+            async for chunk in chunks:
+                yield chunk
+
+
+async def export_to(dataset: ExportDataset, fmt: ExportFormat, output) -> int:
+    written = 0
+    await open_async_pool("cli")
+    try:
+        async for chunk in export_chunks(dataset, fmt):
+            _ = output.write(chunk)
+            written += len(chunk)
+    finally:
+        await close_async_pool()
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    _ = parser.add_argument("dataset", choices=list(EXPORT_QUERIES))
+    _ = parser.add_argument("--format", choices=list(CONTENT_TYPES), default="ndjson")
+    _ = parser.add_argument("--output", default="-", help="file to write, - for stdout")
+    args = parser.parse_args()
+
+    start = perf_counter()
+    if args.output == "-":
+        written = asyncio.run(export_to(args.dataset, args.format, sys.stdout.buffer))
+    else:
+        with open(args.output, "wb") as output:
+            written = asyncio.run(export_to(args.dataset, args.format, output))
+    # stdout may be the export itself
+    print(
+        f"[export] {args.dataset} as {args.format}: {written / 1e6:.1f} MB in {perf_counter() - start:.1f}s",
+        file=sys.stderr,
+    )
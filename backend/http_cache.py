@@ -0,0 +1,77 @@
+# backend/http_cache.py
+import os
+from collections.abc import Awaitable, Callable, Hashable
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Any
+
+from fastapi.responses import Response
+
+from .cache import TTLCache
+from .metrics import CONDITIONAL_RESULTS
+from .responses import json_body
+
+# Serialized bodies of versioned GETs. Keys include the data version, so a
+# write anywhere (API or watcher) invalidates them; the TTL only frees the
+# memory of versions nobody asks for anymore. 0 disables the cache.
+RESPONSE_CACHE_SIZE = int(os.environ.get("MOVIE_PICKER_RESPONSE_CACHE_SIZE", 512))
+RESPONSE_CACHE_TTL_SECONDS = 300
+RESPONSE_CACHE = (
+    TTLCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL_SECONDS)
+    if RESPONSE_CACHE_SIZE > 0
+    else None
+)
+
+
+def make_etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, W/"1" matches "1"
+    return any(
+        tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")
+    )
+
+
+def validator_headers(etag: str, updated_at: datetime) -> dict[str, str]:
+    return {
+        "ETag": etag,
+        "Last-Modified": format_datetime(updated_at.astimezone(timezone.utc), usegmt=True),
+        # Clients may keep the body but must revalidate before using it
+        "Cache-Control": "no-cache",
+    }
+
+
+async def conditional_json(
+    route: str,
+    version: int,
+    updated_at: datetime,
+    if_none_match: str | None,
+    build: Callable[[], Awaitable[Any]],
+    cache_key: Hashable | None = None,
+) -> Response:
+    # 304 when the client already has this version, otherwise the cached body
+    # for (cache_key, version), otherwise build() it. build only runs the
+    # query on a miss.
+    etag = make_etag(version)
+    headers = validator_headers(etag, updated_at)
+    if etag_matches(if_none_match, etag):
+        CONDITIONAL_RESULTS.labels(route, "not_modified").inc()
+        return Response(status_code=304, headers=headers)
+
+    key = (cache_key, version)
+    body = RESPONSE_CACHE.get(key) if RESPONSE_CACHE and cache_key else None
+    if body is None:
+        CONDITIONAL_RESULTS.labels(route, "miss").inc()
+        body = json_body(await build())
+        if RESPONSE_CACHE and cache_key:
+            RESPONSE_CACHE.set(key, body)
+    else:
+        CONDITIONAL_RESULTS.labels(route, "cache_hit").inc()
+
+    return Response(content=body, media_type="application/json", headers=headers)
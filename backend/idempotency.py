@@ -0,0 +1,95 @@
+# backend/idempotency.py
+# Idempotency-Key support for the create endpoints (POST /api/events and
+# /api/rsvps). A client retrying a create after a dropped connection sends
+# the same key again and gets the first answer back, replayed from memory
+# without a query, instead of creating a second event. A retry that arrives
+# while the first attempt is still running waits for it and shares its answer.
+#
+# Keys are kept per route in a bounded LRU (TTLCache) for
+# IDEMPOTENCY_TTL_SECONDS, in each API process: behind several API replicas,
+# retries must reach the same one to be deduplicated. Server errors (5xx,
+# timeouts) aren't kept, so the retry runs the create again.
+import hashlib
+import os
+from collections.abc import Awaitable, Callable
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from .cache import SingleFlight, TTLCache
+from .metrics import IDEMPOTENCY_RESULTS
+from .responses import ORJSONResponse
+
+IDEMPOTENCY_CACHE_SIZE = int(os.environ.get("MOVIE_PICKER_IDEMPOTENCY_CACHE_SIZE", 10000))
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get("MOVIE_PICKER_IDEMPOTENCY_TTL", 24 * 3600))
+# Longest key accepted, a UUID takes 36 characters
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+IDEMPOTENCY_STORE = TTLCache(IDEMPOTENCY_CACHE_SIZE, IDEMPOTENCY_TTL_SECONDS)
+IN_FLIGHT = SingleFlight()
+
+
+class StoredResponse:
+    # A create's answer and a hash of the body it was sent
+
+    def __init__(self, fingerprint: bytes, status_code: int, body: bytes):
+        self.fingerprint = fingerprint
+        self.status_code = status_code
+        self.body = body
+
+
+def fingerprint(body: BaseModel) -> bytes:
+    return hashlib.sha256(body.model_dump_json().encode()).digest()
+
+
+async def execute(key: tuple[str, str], digest: bytes, create: Callable[[], Awaitable[Response]]) -> StoredResponse:
+    response = await create()
+    stored = StoredResponse(digest, response.status_code, bytes(response.body))
+    if response.status_code < 500:
+        IDEMPOTENCY_STORE.set(key, stored)
+    return stored
+
+
+async def idempotent(
+    route: str,
+    idempotency_key: str | None,
+    body: BaseModel,
+    create: Callable[[], Awaitable[Response]],
+) -> Response:
+    # create() once per (route, key), its answer for every request with the key
+    if idempotency_key is None:
+        return await create()
+    if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+        return ORJSONResponse(
+            status_code=400,
+            content={"message": f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters."},
+        )
+
+    key = (route, idempotency_key)
+    digest = fingerprint(body)
+    stored = IDEMPOTENCY_STORE.get(key)
+    if stored is not None:
+        result = "replayed"
+    else:
+        result = "shared" if key in IN_FLIGHT.in_flight else "executed"
+        # Errors raised by create() reach every request sharing it, and are
+        # answered by the API's exception handlers
+        stored = await IN_FLIGHT.do(key, lambda: execute(key, digest, create))
+
+    # The same key with another body is a client bug, not a retry
+    if stored.fingerprint != digest:
+        IDEMPOTENCY_RESULTS.labels(route, "mismatch").inc()
+        return ORJSONResponse(
+            status_code=422,
+            content={"message": "Idempotency-Key was already used for a different request."},
+        )
+
+    IDEMPOTENCY_RESULTS.labels(route, result).inc()
+    headers = {REPLAYED_HEADER: "true"} if result != "executed" else None
+    return Response(
+        content=stored.body,
+        status_code=stored.status_code,
+        media_type="application/json",
+        headers=headers,
+    )
@@ -0,0 +1,91 @@
+# backend/live.py
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+import psycopg
+from psycopg.sql import SQL, Identifier
+
+from .SQL_UTIL.db import DB_URL
+from .SQL_UTIL.operations import changes_channel, winners_channel
+
+# Messages buffered per subscriber before it is considered too slow
+SUBSCRIBER_QUEUE_SIZE = 64
+# Sent to subscribers that missed messages (slow client, listener reconnect),
+# telling them to refetch instead of trusting the feed
+RESYNC_MESSAGE = json.dumps({"op": "RESYNC"})
+RECONNECT_SECONDS = 5
+
+
+class Subscriber:
+    __slots__ = ("queue", "event_id")
+
+    def __init__(self, event_id: int | None):
+        self.queue: asyncio.Queue[str] = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+        self.event_id = event_id
+
+
+class ChangeBroadcaster:
+    # One LISTEN connection per process, fanned out to every subscriber
+
+    def __init__(self, channels: tuple[str, ...] = (changes_channel, winners_channel)):
+        self.channels = channels
+        self.subscribers: set[Subscriber] = set()
+        self.task: asyncio.Task | None = None
+        self.resyncs = 0
+
+    async def start(self):
+        self.task = asyncio.create_task(self.listen())
+
+    async def stop(self):
+        if self.task:
+            _ = self.task.cancel()
+            _ = await asyncio.gather(self.task, return_exceptions=True)
+
+    async def listen(self):
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    DB_URL, autocommit=True
+                ) as conn:
+                    for channel in self.channels:
+                        _ = await conn.execute(SQL("LISTEN {}").format(Identifier(channel)))
+                    print(f"[live] Listening on {', '.join(self.channels)}")
+                    async for notify in conn.notifies():
+                        self.publish(notify.payload)
+            except psycopg.Error as e:
+                print(f"[live] Listener connection lost: {e}")
+                # Anything could have changed while we weren't listening
+                self.broadcast(RESYNC_MESSAGE)
+                await asyncio.sleep(RECONNECT_SECONDS)
+
+    def publish(self, payload: str):
+        # Parse once, then hand the same string to every interested subscriber
+        event_id = json.loads(payload).get("event_id")
+        for subscriber in self.subscribers:
+            if subscriber.event_id is None or subscriber.event_id == event_id:
+                self.deliver(subscriber, payload)
+
+    def broadcast(self, payload: str):
+        for subscriber in self.subscribers:
+            self.deliver(subscriber, payload)
+
+    def deliver(self, subscriber: Subscriber, payload: str):
+        try:
+            subscriber.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            # Don't let one slow client hold messages for everyone: drop its
+            # backlog and tell it to resync
+            self.resyncs += 1
+            while not subscriber.queue.empty():
+                _ = subscriber.queue.get_nowait()
+            subscriber.queue.put_nowait(RESYNC_MESSAGE)
+
+    @asynccontextmanager
+    async def subscribe(self, event_id: int | None = None):
+        subscriber = Subscriber(event_id)
+        self.subscribers.add(subscriber)
+        try:
+            yield subscriber.queue
+        finally:
+            self.subscribers.discard(subscriber)
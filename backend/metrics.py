@@ -0,0 +1,194 @@
+# backend/metrics.py
+from time import perf_counter
+from typing import Any
+
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+from prometheus_client.core import GaugeMetricFamily
+from psycopg import AsyncCursor
+from psycopg.sql import SQL, Composed
+
+from .SQL_UTIL import operations
+
+# Buckets in seconds, from sub-millisecond queries up to slow Radarr calls
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30
+)
+
+REQUEST_DURATION = Histogram(
+    "movie_picker_http_request_duration_seconds",
+    "API request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+CONDITIONAL_RESULTS = Counter(
+    "movie_picker_http_conditional_total",
+    "Versioned GETs by outcome: not_modified (304), cache_hit or miss",
+    ["route", "result"],
+)
+IDEMPOTENCY_RESULTS = Counter(
+    "movie_picker_http_idempotency_total",
+    "Creates sent with an Idempotency-Key by outcome: executed, shared (waited for the same key in flight), replayed or mismatch",
+    ["route", "result"],
+)
+REQUEST_TIMEOUTS = Counter(
+    "movie_picker_http_timeouts_total",
+    "Requests answered 503/504 because time ran out, by what ran out: deadline, pool or statement_timeout",
+    ["reason"],
+)
+QUERY_DURATION = Histogram(
+    "movie_picker_db_query_duration_seconds",
+    "Query execution time by operations.py query name",
+    ["query"],
+    buckets=LATENCY_BUCKETS,
+)
+POOL_WAIT = Histogram(
+    "movie_picker_pool_wait_seconds",
+    "Time to check out a pool connection, including the check of long idle ones",
+    ["pool"],
+    buckets=LATENCY_BUCKETS,
+)
+WATCHER_TICK_DURATION = Histogram(
+    "movie_picker_watcher_tick_duration_seconds",
+    "Time to pick winners for due events and dispatch them",
+    buckets=LATENCY_BUCKETS,
+)
+WATCHER_WAKEUPS = Counter(
+    "movie_picker_watcher_wakeups_total",
+    "Why the watcher woke up",
+    ["reason"],
+)
+WATCHER_ERRORS = Counter(
+    "movie_picker_watcher_errors_total",
+    "Database errors that made the watcher reconnect and retry",
+)
+WATCHER_WINNERS = Counter(
+    "movie_picker_watcher_winners_total",
+    "Winners picked by the watcher",
+)
+DISPATCH_DURATION = Histogram(
+    "movie_picker_dispatch_run_duration_seconds",
+    "Time to send one batch of winners to Radarr",
+    buckets=LATENCY_BUCKETS,
+)
+DISPATCH_RESULTS = Counter(
+    "movie_picker_dispatch_winners_total",
+    "Winners sent to Radarr by outcome",
+    ["status"],
+)
+RADARR_REQUEST_DURATION = Histogram(
+    "movie_picker_radarr_request_duration_seconds",
+    "Radarr API call latency, per attempt",
+    ["method", "path", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+RADARR_THROTTLED = Counter(
+    "movie_picker_radarr_throttled_total",
+    "Radarr calls that waited for the rate limiter",
+)
+RADARR_REJECTED = Counter(
+    "movie_picker_radarr_rejected_total",
+    "Radarr calls failed fast by the open circuit breaker",
+)
+RADARR_CIRCUIT_OPEN = Gauge(
+    "movie_picker_radarr_circuit_open",
+    "1 while the Radarr circuit breaker is open",
+)
+
+# Query text -> name in operations.py. Composed queries are matched on the
+# text of their template up to the first placeholder.
+QUERY_NAMES: dict[str, str] = {}
+for name, value in vars(operations).items():
+    if isinstance(value, str) and not name.startswith("_"):
+        QUERY_NAMES.setdefault(value, name)
+        QUERY_NAMES.setdefault(value.split("{", 1)[0], name)
+
+
+def query_name(query: Any) -> str:
+    if isinstance(query, str):
+        return QUERY_NAMES.get(query, "other")
+    if isinstance(query, Composed):
+        first = next(iter(query), None)
+        if isinstance(first, SQL):
+            return QUERY_NAMES.get(first.as_string(), "other")
+        return "other"
+    if isinstance(query, SQL):
+        return QUERY_NAMES.get(query.as_string(), "other")
+    return "other"
+
+
+class TimedAsyncCursor(AsyncCursor):
+    # Cursor factory for the pools: every execute is timed under its name
+
+    async def execute(self, query, params=None, **kwargs):
+        start = perf_counter()
+        try:
+            return await super().execute(query, params, **kwargs)
+        finally:
+            QUERY_DURATION.labels(query_name(query)).observe(perf_counter() - start)
+
+    async def executemany(self, query, params_seq, **kwargs):
+        start = perf_counter()
+        try:
+            return await super().executemany(query, params_seq, **kwargs)
+        finally:
+            QUERY_DURATION.labels(query_name(query)).observe(perf_counter() - start)
+
+
+class PoolStatsCollector:
+    # Exports ConnectionPool.get_stats() for every registered pool at scrape time
+
+    def __init__(self):
+        self.pools: dict[str, Any] = {}
+
+    def collect(self):
+        families: dict[str, GaugeMetricFamily] = {}
+        for pool_name, pool in self.pools.items():
+            for stat, value in pool.get_stats().items():
+                family = families.get(stat)
+                if family is None:
+                    family = families[stat] = GaugeMetricFamily(
+                        f"movie_picker_pool_{stat}",
+                        f"psycopg_pool {stat}",
+                        labels=["pool"],
+                    )
+                family.add_metric([pool_name], value)
+        yield from families.values()
+
+
+POOL_STATS = PoolStatsCollector()
+REGISTRY.register(POOL_STATS)
+
+
+def register_pool(name: str, pool: Any):
+    POOL_STATS.pools[name] = pool
+
+
+class MetricsMiddleware:
+    # Plain ASGI middleware, cheaper than BaseHTTPMiddleware and doesn't
+    # buffer streaming responses
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the scope, label by its
+            # template so ids don't explode the label cardinality
+            route = scope.get("route")
+            REQUEST_DURATION.labels(
+                scope["method"], route.path if route else "unmatched", str(status)
+            ).observe(perf_counter() - start)
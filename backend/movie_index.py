@@ -0,0 +1,216 @@
+# backend/movie_index.py
+import asyncio
+import re
+from bisect import bisect_left, insort
+from datetime import datetime
+
+from .radarr import RadarrClient, RadarrError
+from .SQL_UTIL.db import ASYNC_POOL
+from .SQL_UTIL.operations import get_movie_by_title_key, get_movies_since, upsert_movies
+
+# How often the in-memory index picks up movies other processes saved, and
+# how often the Radarr library is copied into the movies table
+MOVIE_INDEX_REFRESH_SECONDS = 60
+MOVIE_LIBRARY_SYNC_SECONDS = 6 * 60 * 60
+# Rows saved by transactions that were still open at the last refresh carry
+# an older updated_at, read back this far to pick them up
+REFRESH_OVERLAP_SECONDS = 60
+
+
+def title_key(text: str) -> str:
+    # Case, punctuation and spacing don't matter: "star wars episode" finds
+    # "Star Wars: Episode IV", "dont" finds "Don't Look Up"
+    text = re.sub(r"['’]", "", text.casefold())
+    return " ".join(re.sub(r"[^\w\s]", " ", text).split())
+
+
+def movie_rows(results: list[dict], in_library: bool = False) -> list[dict]:
+    # Radarr movie objects (lookup results or library entries) as movies rows,
+    # one per tmdbId
+    rows: dict[int, dict] = {}
+    for movie in results:
+        if not movie.get("tmdbId") or not movie.get("title"):
+            continue
+        rows[movie["tmdbId"]] = {
+            "tmdb_id": movie["tmdbId"],
+            "title": movie["title"],
+            "title_key": title_key(movie["title"]),
+            "year": movie.get("year") or None,
+            "is_available": movie.get("isAvailable"),
+            "in_library": in_library,
+        }
+    return list(rows.values())
+
+
+def radarr_movie(row: dict) -> dict:
+    # A movies row in the shape RadarrClient.add_movie takes
+    return {
+        "title": row["title"],
+        "year": row["year"],
+        "tmdbId": row["tmdb_id"],
+        "isAvailable": row["is_available"],
+    }
+
+
+class MovieIndex:
+    # In-memory autocomplete over the movies table. Every title is indexed
+    # from each word on ("the dark knight", "dark knight", "knight") in a
+    # sorted list, so a prefix search is a bisect plus a short scan.
+
+    def __init__(self):
+        self.movies: dict[int, dict] = {}
+        # (key, tmdb_id) sorted, whole titles apart from the later words so
+        # titles starting with the term rank first
+        self.titles: list[tuple[str, int]] = []
+        self.words: list[tuple[str, int]] = []
+        self.loaded_until: datetime | None = None
+        self.task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self.movies)
+
+    def add(self, rows: list[dict]):
+        if len(rows) > len(self.movies):
+            # Loading (most of) the table: sort once instead of inserting
+            self.movies.update((row["tmdb_id"], row) for row in rows)
+            self.rebuild()
+            return
+        for row in rows:
+            old = self.movies.get(row["tmdb_id"])
+            self.movies[row["tmdb_id"]] = row
+            if old and old["title_key"] == row["title_key"]:
+                continue
+            if old:
+                self.remove_keys(old)
+            for entries, key in self.keys(row):
+                insort(entries, (key, row["tmdb_id"]))
+
+    def rebuild(self):
+        self.titles = []
+        self.words = []
+        for row in self.movies.values():
+            for entries, key in self.keys(row):
+                entries.append((key, row["tmdb_id"]))
+        self.titles.sort()
+        self.words.sort()
+
+    def keys(self, row: dict):
+        words = row["title_key"].split()
+        if words:
+            yield self.titles, row["title_key"]
+        for i in range(1, len(words)):
+            yield self.words, " ".join(words[i:])
+
+    def remove_keys(self, row: dict):
+        for entries, key in self.keys(row):
+            i = bisect_left(entries, (key, row["tmdb_id"]))
+            if i < len(entries) and entries[i] == (key, row["tmdb_id"]):
+                del entries[i]
+
+    def search(self, term: str, limit: int) -> list[dict]:
+        prefix = title_key(term)
+        if not prefix:
+            return []
+        found: dict[int, dict] = {}
+        for entries in (self.titles, self.words):
+            i = bisect_left(entries, (prefix,))
+            while i < len(entries) and len(found) < limit:
+                key, tmdb_id = entries[i]
+                if not key.startswith(prefix):
+                    break
+                _ = found.setdefault(tmdb_id, self.movies[tmdb_id])
+                i += 1
+        return list(found.values())
+
+    async def refresh(self):
+        # Movies saved since the last refresh, by any process
+        since = self.loaded_until
+        async with ASYNC_POOL.connection() as conn:
+            async with conn.cursor() as cur:
+                _ = await cur.execute(
+                    get_movies_since,
+                    {"since": since, "overlap_seconds": REFRESH_OVERLAP_SECONDS},
+                )
+                rows = await cur.fetchall()
+        if rows:
+            self.add(rows)
+            self.loaded_until = max(row["updated_at"] for row in rows)
+        if since is None:
+            print(f"[movie_index] Loaded {len(self.movies)} movies")
+
+    async def start(self, radarr: RadarrClient):
+        self.task = asyncio.create_task(self.keep_fresh(radarr))
+
+    async def stop(self):
+        if self.task:
+            _ = self.task.cancel()
+            _ = await asyncio.gather(self.task, return_exceptions=True)
+
+    async def keep_fresh(self, radarr: RadarrClient):
+        since_sync = MOVIE_LIBRARY_SYNC_SECONDS
+        while True:
+            try:
+                await self.refresh()
+                if radarr.configured and since_sync >= MOVIE_LIBRARY_SYNC_SECONDS:
+                    await sync_library(radarr, self)
+                    since_sync = 0
+            except Exception as e:
+                # Searches fall back to Radarr meanwhile, try again next round
+                print(f"[movie_index] Refresh failed: {e}")
+            await asyncio.sleep(MOVIE_INDEX_REFRESH_SECONDS)
+            since_sync += MOVIE_INDEX_REFRESH_SECONDS
+
+
+async def store_movies(
+    results: list[dict], index: MovieIndex | None = None, in_library: bool = False
+):
+    # Saves Radarr movie objects to the movies table (and the given index).
+    # Best effort: a lookup that worked shouldn't fail because of this.
+    rows = movie_rows(results, in_library)
+    if not rows:
+        return
+    if index is not None:
+        index.add(rows)
+    if ASYNC_POOL.closed:
+        # In-process benchmarks without a database
+        return
+    try:
+        async with ASYNC_POOL.connection() as conn:
+            async with conn.cursor() as cur:
+                _ = await cur.execute(
+                    upsert_movies,
+                    {
+                        "tmdb_ids": [row["tmdb_id"] for row in rows],
+                        "titles": [row["title"] for row in rows],
+                        "title_keys": [row["title_key"] for row in rows],
+                        "years": [row["year"] for row in rows],
+                        "is_available": [row["is_available"] for row in rows],
+                        "in_library": in_library,
+                    },
+                )
+    except Exception as e:
+        print(f"[movie_index] Could not save {len(rows)} movies: {e}")
+
+
+async def sync_library(radarr: RadarrClient, index: MovieIndex | None = None):
+    try:
+        library = await radarr.library()
+    except RadarrError as e:
+        print(f"[movie_index] Could not read the Radarr library: {e}")
+        return
+    await store_movies(library, index, in_library=True)
+    print(f"[movie_index] Synced {len(library)} movies from the Radarr library")
+
+
+async def resolve_movie(title: str) -> dict | None:
+    # The movie a winner's title most likely means, from the movies table:
+    # same title key, one already in the library first, then the newest
+    async with ASYNC_POOL.connection() as conn:
+        async with conn.cursor() as cur:
+            _ = await cur.execute(get_movie_by_title_key, (title_key(title),))
+            row = await cur.fetchone()
+    return radarr_movie(row) if row else None
+
+
+# The API process's index, loaded and refreshed in the background
+MOVIE_INDEX = MovieIndex()
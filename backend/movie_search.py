@@ -0,0 +1,88 @@
+# backend/movie_search.py
+from .cache import SingleFlight, TTLCache
+from .movie_index import MOVIE_INDEX, store_movies
+from .radarr import RadarrClient, RadarrError
+
+# Autocomplete only shows this many titles
+SEARCH_RESULTS_LIMIT = 5
+# Shortest cached term that may be filtered locally to answer a longer query
+MIN_PREFIX_LENGTH = 2
+
+# Full Radarr lookup results (titles) per normalized search term
+LOOKUP_CACHE = TTLCache(maxsize=1024, ttl=10 * 60)
+LOOKUPS = SingleFlight()
+SEARCH_STATS = {
+    "upstream_lookups": 0,
+    "prefix_hits": 0,
+    "local_hits": 0,
+    "offline_answers": 0,
+}
+
+
+def normalize(term: str) -> str:
+    return " ".join(term.casefold().split())
+
+
+async def search_movies(radarr: RadarrClient, term: str) -> list[str]:
+    key = normalize(term)
+    titles = LOOKUP_CACHE.get(key)
+    if titles is None:
+        titles = from_local_index(key)
+    if titles is None:
+        titles = from_cached_prefix(key)
+    if titles is None:
+        try:
+            # Identical searches in flight at the same time share one lookup
+            titles = await LOOKUPS.do(key, lambda: lookup_titles(radarr, key))
+        except RadarrError:
+            # Radarr is down: whatever the local index has beats an error
+            local = MOVIE_INDEX.search(key, SEARCH_RESULTS_LIMIT)
+            if not local:
+                raise
+            SEARCH_STATS["offline_answers"] += 1
+            titles = [movie["title"] for movie in local]
+    return titles[:SEARCH_RESULTS_LIMIT]
+
+
+def from_local_index(key: str) -> list[str] | None:
+    # Movies seen in earlier lookups or in the Radarr library, enough of
+    # them to fill the list, otherwise Radarr may know better ones
+    movies = MOVIE_INDEX.search(key, SEARCH_RESULTS_LIMIT)
+    if len(movies) < SEARCH_RESULTS_LIMIT:
+        return None
+    SEARCH_STATS["local_hits"] += 1
+    return [movie["title"] for movie in movies]
+
+
+def from_cached_prefix(key: str) -> list[str] | None:
+    # While typing, "star w" usually follows "star": if the longest cached
+    # prefix already has enough titles containing the new term, use those
+    for end in range(len(key) - 1, MIN_PREFIX_LENGTH - 1, -1):
+        broader = LOOKUP_CACHE.peek(key[:end])
+        if broader is None:
+            continue
+        matches = [title for title in broader if key in title.casefold()]
+        if len(matches) < SEARCH_RESULTS_LIMIT:
+            return None
+        SEARCH_STATS["prefix_hits"] += 1
+        return matches
+    return None
+
+
+async def lookup_titles(radarr: RadarrClient, key: str) -> list[str]:
+    SEARCH_STATS["upstream_lookups"] += 1
+    print(f"[movie_search] Radarr looking up movie: {key}")
+    results = await radarr.lookup(key)
+    titles = [movie_obj["title"] for movie_obj in results]
+    LOOKUP_CACHE.set(key, titles)
+    await store_movies(results, MOVIE_INDEX)
+    return titles
+
+
+def search_cache_stats() -> dict[str, int]:
+    return {
+        **LOOKUP_CACHE.stats(),
+        **SEARCH_STATS,
+        "shared_in_flight": LOOKUPS.shared,
+        "indexed_movies": len(MOVIE_INDEX),
+    }
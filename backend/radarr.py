@@ -0,0 +1,332 @@
+# backend/radarr.py
+import asyncio
+import os
+import random
+from collections.abc import Callable
+from time import monotonic, perf_counter
+
+import httpx
+
+from .cache import SingleFlight
+from .deadline import DEADLINE, DeadlineExceeded, remaining, within_deadline
+from .metrics import (
+    RADARR_CIRCUIT_OPEN,
+    RADARR_REJECTED,
+    RADARR_REQUEST_DURATION,
+    RADARR_THROTTLED,
+)
+
+# Grab Radarr URL and API key from environment variables
+RADARR_URL = os.environ.get("MOVIE_PICKER_RADARR_URL")
+RADARR_API_KEY = os.environ.get("MOVIE_PICKER_RADARR_API_KEY")
+
+# Never wait on Radarr forever, connecting should be quick on a LAN. Within
+# an API request the deadline may cut both shorter.
+RADARR_TIMEOUT = httpx.Timeout(10.0, connect=3.0)
+# Attempts per request for transient failures, with exponential backoff
+RADARR_MAX_ATTEMPTS = 4
+RADARR_BACKOFF_SECONDS = 0.5
+RADARR_MAX_CONNECTIONS = 10
+
+# Statuses worth retrying, anything else in the 4xx range is our fault
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# Requests per second to Radarr on average, and how many may go at once
+# after a quiet spell. Shared by every caller in the process.
+RADARR_RATE = float(os.environ.get("MOVIE_PICKER_RADARR_RATE", 10))
+RADARR_BURST = int(os.environ.get("MOVIE_PICKER_RADARR_BURST", 20))
+# Consecutive failed attempts before calls fail fast, and how long until a
+# single trial request checks whether Radarr is back
+RADARR_BREAKER_THRESHOLD = 5
+RADARR_BREAKER_RESET_SECONDS = 30
+# Root folder and quality profiles are re-read in the background once this old
+RADARR_SETTINGS_TTL_SECONDS = 10 * 60
+# Profile new movies are added with, the first one Radarr has if it's missing
+RADARR_QUALITY_PROFILE_ID = int(os.environ.get("MOVIE_PICKER_RADARR_QUALITY_PROFILE_ID", 5))
+
+
+class RadarrError(Exception):
+    pass
+
+
+class RadarrUnavailable(RadarrError):
+    # Raised without calling Radarr while the circuit is open
+    pass
+
+
+def request_timeout() -> httpx.Timeout:
+    # RADARR_TIMEOUT, or what is left of the request's deadline if less
+    left = remaining()
+    if left is None:
+        return RADARR_TIMEOUT
+    return httpx.Timeout(
+        min(RADARR_TIMEOUT.read, left), connect=min(RADARR_TIMEOUT.connect, left)
+    )
+
+
+class TokenBucket:
+    # Lets `rate` calls per second through on average, up to `burst` at once.
+    # Waiters queue on the lock, so they get their tokens in arrival order.
+
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+        self.lock = asyncio.Lock()
+        self.waits = 0
+
+    def refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self.lock:
+            self.refill()
+            if self.tokens < 1:
+                self.waits += 1
+                RADARR_THROTTLED.inc()
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self.refill()
+            self.tokens -= 1
+
+
+class CircuitBreaker:
+    # Opens after `threshold` consecutive failures. While open calls fail
+    # fast, after `reset_seconds` one trial call is let through (half open)
+    # and its outcome closes or re-opens the circuit.
+
+    def __init__(
+        self, threshold: int, reset_seconds: float, clock: Callable[[], float] = monotonic
+    ):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.trial = False
+        self.opens = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at < self.reset_seconds:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial:
+            self.trial = True
+            return True
+        self.rejected += 1
+        RADARR_REJECTED.inc()
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        RADARR_CIRCUIT_OPEN.set(0)
+
+    def record_failure(self):
+        self.failures += 1
+        if self.trial or self.failures >= self.threshold:
+            if self.opened_at is None:
+                self.opens += 1
+                print(f"[radarr] {self.failures} failures in a row, not calling Radarr for {self.reset_seconds}s")
+            self.opened_at = self.clock()
+            RADARR_CIRCUIT_OPEN.set(1)
+        self.trial = False
+
+    def release(self):
+        # A call that was let through ended without an outcome (cancelled)
+        self.trial = False
+
+
+class RadarrClient:
+    # Shared keep-alive client for the Radarr v3 API. Every call goes through
+    # one rate limiter and circuit breaker, and identical GETs in flight at
+    # the same time share one response.
+
+    def __init__(
+        self,
+        url: str | None = RADARR_URL,
+        api_key: str | None = RADARR_API_KEY,
+        max_connections: int = RADARR_MAX_CONNECTIONS,
+        rate: float = RADARR_RATE,
+        burst: int = RADARR_BURST,
+        breaker_threshold: int = RADARR_BREAKER_THRESHOLD,
+        breaker_reset_seconds: float = RADARR_BREAKER_RESET_SECONDS,
+        settings_ttl: float = RADARR_SETTINGS_TTL_SECONDS,
+    ):
+        self.configured = bool(url and api_key)
+        if not self.configured:
+            print("[radarr] Radarr URL or API key not set in environment variables")
+            print(f"[radarr] Radarr URL: {url}")
+
+        self.client = httpx.AsyncClient(
+            base_url=f"{url}/api/v3",
+            params={"apikey": api_key or ""},
+            timeout=RADARR_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        )
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset_seconds)
+        self.in_flight = SingleFlight()
+        self.settings_ttl = settings_ttl
+        self.cached_settings: dict | None = None
+        self.settings_fetched_at = 0.0
+        self.settings_refresh: asyncio.Task | None = None
+
+    async def aclose(self):
+        if self.settings_refresh:
+            _ = self.settings_refresh.cancel()
+        await self.client.aclose()
+
+    async def request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        if not self.configured:
+            raise RadarrError("Radarr is not configured")
+
+        if method == "GET":
+            key = (path, tuple(sorted(kwargs.get("params", {}).items())))
+            return await self.in_flight.do(key, lambda: self.send(method, path, **kwargs))
+        return await self.send(method, path, **kwargs)
+
+    async def send(self, method: str, path: str, **kwargs) -> httpx.Response:
+        for attempt in range(1, RADARR_MAX_ATTEMPTS + 1):
+            if not self.breaker.allow():
+                raise RadarrUnavailable(f"{method} {path}: Radarr is failing, not calling it for now")
+            try:
+                await within_deadline(self.bucket.acquire(), "the Radarr rate limiter")
+                timeout = request_timeout()
+            except BaseException:
+                self.breaker.release()
+                raise
+
+            start = perf_counter()
+            outcome = "error"
+            try:
+                response = await self.client.request(method, path, timeout=timeout, **kwargs)
+                outcome = str(response.status_code)
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    self.breaker.record_success()
+                    return response
+                error = f"{response.status_code} - {response.text}"
+            except httpx.TransportError as e:
+                error = repr(e)
+            except BaseException:
+                self.breaker.release()
+                raise
+            finally:
+                RADARR_REQUEST_DURATION.labels(method, path, outcome).observe(
+                    perf_counter() - start
+                )
+            self.breaker.record_failure()
+
+            if attempt == RADARR_MAX_ATTEMPTS:
+                raise RadarrError(f"{method} {path} failed after {attempt} attempts: {error}")
+
+            # 0.5s, 1s, 2s, ... with jitter so retries from many workers spread out
+            delay = RADARR_BACKOFF_SECONDS * 2 ** (attempt - 1)
+            delay *= random.uniform(0.5, 1.5)
+            left = remaining()
+            if left is not None and delay >= left:
+                raise DeadlineExceeded(f"{method} {path} failed ({error}), no time left to retry")
+            print(f"[radarr] {method} {path} failed ({error}), retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+        raise RadarrError(f"{method} {path} failed")
+
+    async def lookup(self, term: str) -> list[dict]:
+        response = await self.request("GET", "/movie/lookup", params={"term": term})
+        if not response.is_success:
+            raise RadarrError(
+                f"Lookup failed: {response.status_code} - {response.text}"
+            )
+        return response.json()
+
+    async def library(self) -> list[dict]:
+        response = await self.request("GET", "/movie")
+        if not response.is_success:
+            raise RadarrError(
+                f"Library request failed: {response.status_code} - {response.text}"
+            )
+        return response.json()
+
+    async def settings(self) -> dict:
+        # Root folder and quality profile, the same for every movie. Fetched
+        # once, then re-read in the background when stale; until that works
+        # (e.g. Radarr is down) the old values are served.
+        if self.cached_settings is None:
+            return await self.in_flight.do("settings", self.fetch_settings)
+        stale = monotonic() - self.settings_fetched_at > self.settings_ttl
+        if stale and (self.settings_refresh is None or self.settings_refresh.done()):
+            self.settings_refresh = asyncio.create_task(self.refresh_settings())
+        return self.cached_settings
+
+    async def refresh_settings(self):
+        # May be started by an API request, but isn't bound by its deadline
+        _ = DEADLINE.set(None)
+        try:
+            _ = await self.fetch_settings()
+        except RadarrError as e:
+            print(f"[radarr] Could not refresh root folder and quality profiles: {e}")
+
+    async def fetch_settings(self) -> dict:
+        response = await self.request("GET", "/rootfolder")
+        if not response.is_success:
+            raise RadarrError(
+                f"Root folder request failed: {response.status_code} - {response.text}"
+            )
+        folders = response.json()
+
+        response = await self.request("GET", "/qualityprofile")
+        if not response.is_success:
+            raise RadarrError(
+                f"Quality profile request failed: {response.status_code} - {response.text}"
+            )
+        profile_ids = [profile["id"] for profile in response.json()]
+        profile_id = RADARR_QUALITY_PROFILE_ID
+        if profile_ids and profile_id not in profile_ids:
+            print(f"[radarr] Quality profile {profile_id} not found, using {profile_ids[0]}")
+            profile_id = profile_ids[0]
+
+        self.cached_settings = {
+            "root_folder_path": folders[0].get("path") if folders else None,
+            "quality_profile_id": profile_id,
+        }
+        self.settings_fetched_at = monotonic()
+        return self.cached_settings
+
+    async def add_movie(self, movie_obj: dict):
+        settings = await self.settings()
+        request_body = {
+            "title": movie_obj.get("title"),
+            "year": movie_obj.get("year"),
+            "tmdbId": movie_obj.get("tmdbId"),
+            "qualityProfileId": settings["quality_profile_id"],
+            "monitored": True,
+            "minimumAvailability": "released",
+            "isAvailable": movie_obj.get("isAvailable"),
+            "addOptions": {"searchForMovie": True},
+            "rootFolderPath": settings["root_folder_path"],
+        }
+        response = await self.request("POST", "/movie", json=request_body)
+
+        # Radarr rejects movies that are already in the library, which is
+        # what we wanted anyway (e.g. a retry after a lost response)
+        if not response.is_success and "MovieExistsValidator" not in response.text:
+            raise RadarrError(
+                f"Add movie failed: {response.status_code} - {response.text}"
+            )
+        return response
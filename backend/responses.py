@@ -0,0 +1,97 @@
+# backend/responses.py
+# How the API's JSON answers are encoded and what they look like.
+#
+# Bodies are encoded with orjson, several times faster than the stdlib json
+# encoder JSONResponse uses, and it writes datetimes (ISO 8601) without a
+# jsonable_encoder pass. The models below only document the responses (they
+# end up in the OpenAPI schema as each route's response_model): handlers
+# return a Response, so FastAPI doesn't validate every row against them.
+# backend/bench/serialization.py checks real responses still match.
+from datetime import datetime
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def json_body(content: Any) -> bytes:
+    return orjson.dumps(content)
+
+
+class ORJSONResponse(JSONResponse):
+    # The app's default_response_class
+
+    def render(self, content: Any) -> bytes:
+        return json_body(content)
+
+
+class Message(BaseModel):
+    message: str
+
+
+class EventOut(BaseModel):
+    id: int
+    title: str
+    genre: str | None
+    date: str
+    time: str
+    location: str
+    author: str
+    selection_strategy: str
+
+
+class EventsPageOut(BaseModel):
+    events: list[EventOut]
+    next_cursor: int | None
+
+
+class RSVPOut(BaseModel):
+    event_id: int
+    rsvp_id: int
+    author: str
+    movie: str
+    weight: int | None
+
+
+class RSVPsOut(BaseModel):
+    rsvps: list[RSVPOut]
+
+
+class WinnerOut(BaseModel):
+    rsvp_id: int
+    movie: str
+    author: str
+
+
+class EventDetailsOut(EventOut):
+    rsvps: list[RSVPOut]
+    rsvp_count: int
+    total_weight: int
+    winner: WinnerOut | None
+
+
+class EventDetailsPageOut(BaseModel):
+    events: list[EventDetailsOut]
+    next_cursor: int | None
+
+
+class EventWinnerOut(BaseModel):
+    rsvp_winner_id: int
+
+
+class AuthorStatsOut(BaseModel):
+    author: str
+    rsvp_count: int
+    win_count: int
+    last_win_at: datetime | None
+    fair_factor: float
+
+
+class AuthorsPageOut(BaseModel):
+    authors: list[AuthorStatsOut]
+    next_cursor: str | None
+
+
+class MoviesOut(BaseModel):
+    movies: list[str]
@@ -0,0 +1,230 @@
+# backend/selection.py
+import argparse
+import hashlib
+import secrets
+from collections.abc import Callable
+from typing import Literal
+
+import numpy as np
+
+from .SQL_UTIL.db import POOL, close_pool, open_pool
+from .SQL_UTIL.operations import get_event_winner_audit, get_selection_candidates
+
+# Strategies an event can pick its winner with (events.selection_strategy):
+#   weighted:  random, proportional to RSVP weight
+#   fair:      weighted, but an author who won right before the event has
+#              their weight halved, fading back to full over FAIR_WINDOW_DAYS
+#   plurality: the movie with the most (weighted) RSVPs, ties broken at random
+SelectionStrategy = Literal["weighted", "fair", "plurality"]
+DEFAULT_STRATEGY: SelectionStrategy = "weighted"
+
+FAIR_WINDOW_DAYS = 90
+FAIR_DECAY = 0.5
+
+# splitmix64 constants
+GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+RSVP_GAMMA = np.uint64(0xC2B2AE3D27D4EB4F)
+MOVIE_GAMMA = np.uint64(0x165667B19E3779F9)
+MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+def new_seed() -> int:
+    # Fits a BIGINT column
+    return secrets.randbits(63)
+
+
+def hashed_uniforms(
+    seeds: np.ndarray, event_ids: np.ndarray, keys: np.ndarray, gamma: np.uint64
+) -> np.ndarray:
+    # One U(0, 1) per entry, hashed from (seed, event, key) instead of drawn
+    # from a stream: an event's pick doesn't depend on what else is in the
+    # batch or on row order, so its recorded seed replays it exactly
+    with np.errstate(over="ignore"):
+        x = seeds ^ (event_ids.astype(np.uint64) * GOLDEN_GAMMA) ^ (keys.astype(np.uint64) * gamma)
+        x ^= x >> np.uint64(30)
+        x *= MIX_1
+        x ^= x >> np.uint64(27)
+        x *= MIX_2
+        x ^= x >> np.uint64(31)
+    # Top 53 bits, shifted off zero so log() stays finite
+    return ((x >> np.uint64(11)).astype(np.float64) + 0.5) / 2.0**53
+
+
+def title_hash(title: str) -> int:
+    # Stable across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(title.encode(), digest_size=8).digest(), "little")
+
+
+class Candidates:
+    # Numpy columns for the RSVPs of many events, built from the column
+    # arrays get_selection_candidates returns and grouped by event. order
+    # maps them back to positions in those arrays
+
+    def __init__(self, columns: dict[str, list], seeds: dict[int, int]):
+        self.columns = columns
+        event_ids = np.array(columns["event_ids"], np.int64)
+        self.order = np.argsort(event_ids, kind="stable")
+        self.event_ids = event_ids[self.order]
+        self.rsvp_ids = np.array(columns["rsvp_ids"], np.int64)[self.order]
+        self.weights = np.array(columns["weights"], np.float64)[self.order]
+        self.days_since_win = np.array(columns["days_since_win"], np.float64)[self.order]
+        # Where each event's RSVPs start, and the event (0, 1, ...) of each
+        first = np.ones(len(event_ids), dtype=bool)
+        first[1:] = self.event_ids[1:] != self.event_ids[:-1]
+        self.starts = np.flatnonzero(first)
+        self.events = np.cumsum(first) - 1
+        # Seeds and strategies belong to the event: looked up once per event
+        # and spread to its RSVPs
+        event_seeds = [seeds[e] for e in self.event_ids[self.starts].tolist()]
+        self.seeds = np.array(event_seeds, np.uint64)[self.events]
+        strategies = [columns["strategies"][i] for i in self.order[self.starts].tolist()]
+        # Strategy names as small ints, numpy string compares are slow
+        self.strategy_names = sorted(set(strategies))
+        codes = {name: i for i, name in enumerate(self.strategy_names)}
+        self.strategies = np.array([codes[name] for name in strategies], np.int64)[self.events]
+
+    def uniforms(self) -> np.ndarray:
+        # One per RSVP
+        return hashed_uniforms(self.seeds, self.event_ids, self.rsvp_ids, RSVP_GAMMA)
+
+
+def weighted_keys(weights: np.ndarray, u: np.ndarray) -> np.ndarray:
+    # Efraimidis-Spirakis: the largest log(u) / w in a group belongs to row i
+    # with probability w_i / sum(w). Weights <= 0 can't win.
+    with np.errstate(divide="ignore"):
+        return np.where(weights > 0, np.log(u) / np.maximum(weights, 1e-300), -np.inf)
+
+
+def weighted_scores(c: Candidates, u: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    return weighted_keys(c.weights[mask], u[mask])
+
+
+def fair_factor(days_since_win: np.ndarray | float) -> np.ndarray:
+    # FAIR_DECAY for a win right before the event, 1 once it is
+    # FAIR_WINDOW_DAYS old (or for authors who never won)
+    return FAIR_DECAY ** np.clip(1 - np.asarray(days_since_win) / FAIR_WINDOW_DAYS, 0, 1)
+
+
+def fair_scores(c: Candidates, u: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    return weighted_keys(c.weights[mask] * fair_factor(c.days_since_win[mask]), u[mask])
+
+
+def plurality_scores(c: Candidates, u: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    # The movie with the most weight in the event wins. Ties between movies
+    # are broken by a uniform per (event, movie), so each tied movie wins as
+    # often whatever its number of RSVPs, and u < 1 only picks which of the
+    # winning movie's RSVPs is recorded
+    movies = c.columns["movies"]
+    titles: dict[str, int] = {}
+    title_codes = np.array(
+        [titles.setdefault(movies[i], len(titles)) for i in c.order[mask].tolist()], np.int64
+    )
+    # Titles are normalized once each, not once per RSVP
+    normalized: dict[str, int] = {}
+    title_movies = np.array(
+        [normalized.setdefault(title.strip().casefold(), len(normalized)) for title in titles],
+        np.int64,
+    )
+    # One code per (event, movie), and a row of each
+    row_movies = title_movies[title_codes]
+    _, first, movie_codes = np.unique(
+        c.events[mask] * len(normalized) + row_movies, return_index=True, return_inverse=True
+    )
+    totals = np.bincount(movie_codes, np.maximum(c.weights[mask], 0))
+    hashes = np.array([title_hash(name) for name in normalized], np.uint64)
+    movie_u = hashed_uniforms(
+        c.seeds[mask][first], c.event_ids[mask][first], hashes[row_movies[first]], MOVIE_GAMMA
+    )
+    # Movies ranked by total, then movie_u. Only ranks within an event are
+    # compared
+    ranks = np.empty(len(totals))
+    ranks[np.lexsort((movie_u, totals))] = np.arange(len(totals))
+    return np.where(totals[movie_codes] > 0, ranks[movie_codes] + u[mask], -np.inf)
+
+
+STRATEGIES: dict[str, Callable[[Candidates, np.ndarray, np.ndarray], np.ndarray]] = {
+    "weighted": weighted_scores,
+    "fair": fair_scores,
+    "plurality": plurality_scores,
+}
+
+
+def pick_winners(columns: dict[str, list], seeds: dict[int, int]) -> list[dict]:
+    # Winning RSVP (with its strategy and seed) for every event in columns
+    # that has a candidate able to win, all events in one pass
+    if not columns["event_ids"]:
+        return []
+
+    c = Candidates(columns, seeds)
+    u = c.uniforms()
+    scores = np.full(len(c.event_ids), -np.inf)
+    for code, name in enumerate(c.strategy_names):
+        score = STRATEGIES.get(name)
+        if score is None:
+            print(f"[selection] Unknown strategy {name!r}, using {DEFAULT_STRATEGY}")
+            score = STRATEGIES[DEFAULT_STRATEGY]
+        mask = c.strategies == code
+        scores[mask] = score(c, u, mask)
+
+    # Best score of each event, and the first RSVP of the event that has it
+    best_scores = np.maximum.reduceat(scores, c.starts)
+    positions = np.flatnonzero((scores == best_scores[c.events]) & np.isfinite(scores))
+    first = np.ones(len(positions), dtype=bool)
+    first[1:] = c.events[positions][1:] != c.events[positions][:-1]
+    best = c.order[positions[first]].tolist()
+    return [
+        {
+            "event_id": columns["event_ids"][i],
+            "rsvp_id": columns["rsvp_ids"][i],
+            "movie": columns["movies"][i],
+            "author": columns["authors"][i],
+            "strategy": columns["strategies"][i],
+            "seed": seeds[columns["event_ids"][i]],
+        }
+        for i in best
+    ]
+
+
+def winner_columns(winners: list[dict]) -> tuple[list, ...]:
+    # Parameters for insert_event_winners, one array per column
+    return (
+        [w["event_id"] for w in winners],
+        [w["rsvp_id"] for w in winners],
+        [w["movie"] for w in winners],
+        [w["author"] for w in winners],
+        [w["strategy"] for w in winners],
+        [w["seed"] for w in winners],
+    )
+
+
+def replay(event_id: int) -> tuple[dict | None, dict | None]:
+    # Recorded winner and the pick recomputed from its strategy and seed over
+    # the event's current RSVPs
+    with POOL.connection() as conn:
+        recorded = conn.execute(get_event_winner_audit, (event_id,)).fetchone()
+        if not recorded or recorded["seed"] is None:
+            return recorded, None
+        columns = conn.execute(get_selection_candidates, {"event_ids": [event_id]}).fetchone()
+
+    columns["strategies"] = [recorded["strategy"]] * len(columns["event_ids"] or ())
+    winners = pick_winners(columns, {event_id: recorded["seed"]})
+    return recorded, winners[0] if winners else None
+
+
+if __name__ == "__main__":
+    # python -m backend.selection --replay EVENT_ID
+    parser = argparse.ArgumentParser()
+    _ = parser.add_argument("--replay", type=int, required=True, metavar="EVENT_ID")
+    args = parser.parse_args()
+    open_pool("cli")
+    recorded, replayed = replay(args.replay)
+    close_pool()
+    if not recorded:
+        print(f"[selection] Event {args.replay} has no winner")
+    elif replayed is None:
+        print(f"[selection] No seed recorded for event {args.replay}, or no candidates left")
+    else:
+        same = replayed["rsvp_id"] == recorded["rsvp_id"]
+        print(f"[selection] Recorded: RSVP {recorded['rsvp_id']} ({recorded['strategy']}, seed {recorded['seed']})")
+        print(f"[selection] Replayed: RSVP {replayed['rsvp_id']} -> {'match' if same else 'MISMATCH'}")
@@ -1,202 +1,189 @@
+import asyncio
 import os
-from datetime import datetime
-from time import sleep
-import random
-import requests
+from collections.abc import AsyncIterator
+
+import psycopg
+from prometheus_client import start_http_server
+from psycopg.sql import SQL, Identifier
+
+from .dispatch import dispatch_pending
+from .metrics import (
+    WATCHER_ERRORS,
+    WATCHER_TICK_DURATION,
+    WATCHER_WAKEUPS,
+    WATCHER_WINNERS,
+)
+from .radarr import RadarrClient
+from .selection import new_seed, pick_winners, winner_columns
 
 # psycopg using dict row factory
-from .SQL_UTIL.db import POOL
+from .SQL_UTIL.db import ASYNC_POOL, DB_URL, close_async_pool, open_async_pool
 from .SQL_UTIL.operations import (
-    get_events_within_the_half_hour,
-    get_rsvps_for_event,
-    insert_event_winner,
+    changes_channel,
+    claim_due_event_candidates,
+    get_watcher_deadlines,
+    insert_event_winners,
 )
 
-
-def main():
+# Upper bound on how long the watcher sleeps without re-checking the database,
+# in case a notification is missed (e.g. while the listen connection reconnects)
+MAX_SLEEP_SECONDS = 300
+# After the first notification, keep collecting for this long so a burst of
+# changes (e.g. several RSVPs at once) only triggers a single tick
+NOTIFY_DEBOUNCE_SECONDS = 0.5
+# Due events claimed (and row locked) and picked in one pass per transaction
+CLAIM_BATCH_SIZE = 1000
+# Due events another replica has locked are looked at again after this long,
+# in case that replica died before inserting their winners
+PEER_RECHECK_SECONDS = 5
+# After a database error (connection lost, Postgres restarting, a deadlock)
+# the watcher reconnects and retries after this long, doubled for every
+# failure in a row up to RETRY_MAX_SECONDS
+RETRY_SECONDS = 1
+RETRY_MAX_SECONDS = 60
+# Prometheus metrics are served on this port, the watcher has no HTTP API
+METRICS_PORT = int(os.environ.get("MOVIE_PICKER_WATCHER_METRICS_PORT", 9100))
+
+
+async def main():
     print("[watcher] Watcher started")
-    next_minute = datetime.now().minute
-    # Only trigger the watcher at the start of each minute
-    while True:
-        this_minute = datetime.now().minute
-        if this_minute != next_minute:
-            continue
-        # Increment the next minute
-        next_minute = (this_minute + 1) % 60
-        this_datetime = datetime.now()
-        print(f"[watcher] Triggering watcher at {this_datetime}")
-        date_string = ""
-        format_string = "%m/%d/%Y"
-
-        # Select events within a half an hour of now, that are not in the event_winners table
-        # Then, pick a winner for each event, and insert into event_winners table
-        # Finally, send a radarr request to add the movie to the library
-
-        with POOL.connection() as conn:
-            with conn.cursor() as cur:
-                _ = cur.execute(get_events_within_the_half_hour)
-                events = cur.fetchall()
-                print(
-                    f"[watcher] Found {len(events)} events within the half hour that need processing"
-                )
-                for event in events:
-                    print(f"[watcher] Event found within the half hour: {event}")
-                    # Need to pick an event winner
-                    # First, get the RSVPs for the event
-                    event_id = event["id"]
-                    _ = cur.execute(get_rsvps_for_event, (event_id,))
-                    rsvps = cur.fetchall()
-                    print(f"[watcher] Found {len(rsvps)} RSVPs for event {event_id}")
-                    if rsvps:
-                        # Pick a winner based on weights
-                        rsvp_ids = [rsvp["rsvp_id"] for rsvp in rsvps]
-                        weights = [rsvp["weight"] for rsvp in rsvps]
-
-                        chosen_rsvp_id = random.choices(rsvp_ids, weights, k=1)[0]
-                        print(f"[watcher] Chosen RSVP ID: {chosen_rsvp_id}")
-                        chosen_rsvp = next(
-                            rsvp for rsvp in rsvps if rsvp["rsvp_id"] == chosen_rsvp_id
-                        )
-                        print(f"[watcher] Chosen RSVP: {chosen_rsvp}")
-
-                        # Insert into event_winners table
-                        _ = cur.execute(
-                            insert_event_winner,
-                            (
-                                event_id,
-                                chosen_rsvp["rsvp_id"],
-                                chosen_rsvp["movie"],
-                                chosen_rsvp["author"],
-                            ),
-                        )
-                        print(
-                            f"[watcher] Inserted event winner for event {event_id}: {chosen_rsvp['movie']} by {chosen_rsvp['author']}"
-                        )
-
-                        # ======== Send Radarr request to add the movie to the library ========
-
-                        try:
-                            # Grab Radarr URL and API key from environment variables
-                            radarr_url = os.environ.get("MOVIE_PICKER_RADARR_URL")
-                            radarr_api_key = os.environ.get(
-                                "MOVIE_PICKER_RADARR_API_KEY"
-                            )
-
-                            if not radarr_url or not radarr_api_key:
-                                print(
-                                    "[watcher] Radarr URL or API key not set in environment variables"
-                                )
-                                print(f"[watcher] Radarr URL: {radarr_url}")
-                                print(f"[watcher] Radarr API Key: {radarr_api_key}")
-                                continue
-
-                            # Build and send the Radarr lookup request for movie data
-                            radarr_lookup_endpoint = f"{radarr_url}/api/v3/movie/lookup"
-                            params = {
-                                "term": chosen_rsvp["movie"],
-                                "apikey": radarr_api_key,
-                            }
-                            print(
-                                f"[watcher] Radarr looking up movie: {params['term']}"
-                            )
-                            lookup_response = requests.get(
-                                radarr_lookup_endpoint,
-                                params=params,
-                            )
-
-                            if not lookup_response.ok:
-                                print(
-                                    f"[watcher] Radarr lookup failed: {lookup_response.status_code} - {lookup_response.text}"
-                                )
-                                continue
-
-                            results = lookup_response.json()
-                            print(
-                                f"[watcher] Radarr lookup response: {lookup_response.status_code} - {results[0] if results else 'No results found'}"
-                            )
-
-                            if not results:
-                                print("[watcher] No results found in Radarr lookup")
-                                continue
-
-                            # Prioritize the first fuzzy result and its TMDB ID
-                            res_movie_obj = results[0]
-                            first_result_imdb_id = res_movie_obj.get("tmdbId")
-
-                            print(
-                                f"[watcher] First result TMDB ID: {first_result_imdb_id}"
-                            )
-
-                            # Get the root folder path from Radarr
-                            root_folder_path = get_root_folder(
-                                radarr_url, radarr_api_key
-                            )
-
-                            # Send the add movie request to Radarr with the TMDB ID
-                            params = {"apikey": radarr_api_key}
-                            request_body = {
-                                "title": res_movie_obj.get("title"),
-                                "year": res_movie_obj.get("year"),
-                                "tmdbId": res_movie_obj.get("tmdbId"),
-                                "qualityProfileId": 5,  # 4K UHD or next highest available
-                                "monitored": True,
-                                "minimumAvailability": "released",
-                                "isAvailable": res_movie_obj.get("isAvailable"),
-                                "addOptions": {"searchForMovie": True},
-                                "rootFolderPath": root_folder_path,
-                            }
-
-                            radarr_add_endpoint = f"{radarr_url}/api/v3/movie"
-                            add_response = requests.post(
-                                radarr_add_endpoint,
-                                params=params,
-                                json=request_body,
-                            )
-
-                            if not add_response.ok:
-                                print(
-                                    f"[watcher] Radarr add movie failed: {add_response.status_code} - {add_response.text}"
-                                )
-                                continue
-
-                            print(
-                                f"[watcher] Radarr add movie response: {add_response.status_code} - {add_response.text}"
-                            )
-
-                        except Exception as e:
-                            print(f"[watcher] Error sending Radarr request: {e}")
-                            continue
-
-        # Sleep for a few seconds to avoid busy waiting
-        sleep(10)
-
-
-def get_root_folder(radarr_url: str, radarr_api_key: str):
+    _ = start_http_server(METRICS_PORT)
+    print(f"[watcher] Serving metrics on port {METRICS_PORT}")
+    seconds = await open_async_pool("watcher")
+    print(f"[watcher] Database pool ready in {seconds * 1000:.0f} ms")
+    # One keep-alive Radarr client for the lifetime of the watcher
+    radarr = RadarrClient()
+    failures = 0
     try:
-        # Send a radarr request to add the movie to the library
-        if radarr_url and radarr_api_key:
-            radarr_endpoint = f"{radarr_url}/api/v3/rootfolder"
-            params = {
-                "apikey": radarr_api_key,
-            }
-            response = requests.get(
-                radarr_endpoint,
-                params=params,
-            )
-
-            if response.ok:
-                results = response.json()
-                root_folder_path = results[0].get("path")
-                print(
-                    f"[watcher] [get_root_folder] Root folder path: {root_folder_path}"
-                )
-
-                return root_folder_path
-
-    except Exception as e:
-        print(f"[watcher] [get_root_folder] Error sending Radarr request: {e}")
+        while True:
+            try:
+                async for _ in watch(radarr):
+                    failures = 0
+            except psycopg.Error as e:
+                # A tick's work is transactional, whatever it didn't commit
+                # is claimed again by the next tick
+                failures += 1
+                WATCHER_ERRORS.inc()
+                delay = min(RETRY_SECONDS * 2 ** (failures - 1), RETRY_MAX_SECONDS)
+                print(f"[watcher] Database error: {e}, retrying in {delay}s")
+                await asyncio.sleep(delay)
+                # Replace pooled connections the same outage broke, rather
+                # than failing on each of them in turn
+                await ASYNC_POOL.check()
+    finally:
+        await radarr.aclose()
+        await close_async_pool()
+
+
+async def watch(radarr: RadarrClient) -> AsyncIterator[None]:
+    # Yields after every tick. Dedicated autocommit connection so
+    # notifications are delivered as soon as the notifying transaction
+    # commits. Ticks right after (re)connecting, for changes made while
+    # nobody was listening.
+    async with await psycopg.AsyncConnection.connect(
+        DB_URL, autocommit=True
+    ) as listen_conn:
+        _ = await listen_conn.execute(SQL("LISTEN {}").format(Identifier(changes_channel)))
+        print(f"[watcher] Listening on {changes_channel}")
+        while True:
+            with WATCHER_TICK_DURATION.time():
+                await process_due_events()
+                _ = await dispatch_pending(radarr)
+            yield
+            # Failed sends are retried when their outbox backoff is over
+            timeout = await seconds_until_next_deadline(radarr.configured)
+            print(f"[watcher] Sleeping for up to {timeout:.1f}s")
+            await wait_for_changes(listen_conn, timeout)
+
+
+async def seconds_until_next_deadline(dispatching: bool) -> float:
+    # The next event window, and work other watcher replicas hold (which we
+    # take over if they die) and outbox jobs coming off their backoff
+    async with ASYNC_POOL.connection() as conn:
+        cur = await conn.execute(
+            get_watcher_deadlines,
+            {"due_recheck_seconds": PEER_RECHECK_SECONDS, "dispatching": dispatching},
+        )
+        row = await cur.fetchone()
+
+    deadlines: list[float] = []
+    if row and row["window_seconds"] is not None:
+        deadlines.append(float(row["window_seconds"]))
+    if row and row["peer_seconds"] is not None:
+        # At least a second, so a job that is available but can't be claimed
+        # right now doesn't turn into a busy loop
+        deadlines.append(max(float(row["peer_seconds"]), 1.0))
+    if not deadlines:
+        return MAX_SLEEP_SECONDS
+    return min(max(min(deadlines), 0.0), MAX_SLEEP_SECONDS)
+
+
+async def wait_for_changes(listen_conn: psycopg.AsyncConnection, timeout: float):
+    # Sleep until the deadline, or wake early when events/RSVPs change
+    woken = False
+    async for notify in listen_conn.notifies(timeout=timeout, stop_after=1):
+        print(f"[watcher] Woken by notification: {notify.payload}")
+        woken = True
+
+    if woken:
+        WATCHER_WAKEUPS.labels("notify").inc()
+        async for notify in listen_conn.notifies(timeout=NOTIFY_DEBOUNCE_SECONDS):
+            print(f"[watcher] Also received notification: {notify.payload}")
+    else:
+        WATCHER_WAKEUPS.labels("deadline").inc()
+
+
+async def process_due_events():
+    print("[watcher] Checking for events within the half hour")
+
+    # Claim due events that have RSVPs but no winner yet, pick all their
+    # winners in one pass and insert them. Each batch is one transaction, its
+    # row locks keep other watcher replicas off these events until the
+    # winners are in. The claim returns the candidates too, so a batch is
+    # two statements however many events are due. Sending the winners to
+    # Radarr happens afterwards in the dispatch stage
+    while True:
+        async with ASYNC_POOL.connection() as conn:
+            async with conn.transaction():
+                async with conn.cursor() as cur:
+                    _ = await cur.execute(
+                        claim_due_event_candidates, {"batch_size": CLAIM_BATCH_SIZE}
+                    )
+                    candidates = await cur.fetchone()
+                    # Every claimed event has at least one RSVP
+                    event_ids = list(dict.fromkeys(candidates["event_ids"] or ()))
+                    print(
+                        f"[watcher] Claimed {len(event_ids)} events within the half hour that need processing"
+                    )
+                    if event_ids:
+                        await insert_winners(cur, event_ids, candidates)
+
+        # Every claimed event gets a winner, so a short batch means we're done
+        if len(event_ids) < CLAIM_BATCH_SIZE:
+            return
+
+
+async def insert_winners(
+    cur: psycopg.AsyncCursor, event_ids: list[int], candidates: dict[str, list]
+):
+    # One pass to pick the winners of every event, one insert. A fresh seed
+    # per event, recorded with the pick so it can be replayed
+    # (python -m backend.selection --replay EVENT_ID)
+    winners = pick_winners(candidates, {event_id: new_seed() for event_id in event_ids})
+
+    _ = await cur.execute(insert_event_winners, winner_columns(winners))
+    inserted = await cur.fetchall()
+    WATCHER_WINNERS.inc(len(inserted))
+    for winner in inserted:
+        print(
+            f"[watcher] Inserted event winner for event {winner['event_id']}: {winner['movie']} by {winner['author']}"
+        )
+    if len(inserted) < len(winners):
+        print(
+            f"[watcher] {len(winners) - len(inserted)} events already had a winner from another watcher"
+        )
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
     print("[watcher] Watcher stopped")
@@ -1,6 +1,7 @@
 // Helper function to fetch and return a list of events
 
 import { Event } from "./types";
+import { postIdempotent } from "./utils";
 
 async function EventFetch() {
   /*
@@ -48,13 +49,7 @@ async function EventDelete(event_id: number) {
 
 async function EventCreate(event: Event) {
   try {
-    const response = await fetch("/api/events", {
-      method: "POST",
-      body: JSON.stringify(event),
-      headers: {
-        "Content-Type": "application/json"
-      }
-    })
+    const response = await postIdempotent("/api/events", event);
     if (response.ok) {
       console.log("Event created successfully");
     }
@@ -1,6 +1,7 @@
 // Helper function to fetch and return a list of RSVPs
 
 import { RSVP } from "./types";
+import { postIdempotent } from "./utils";
 
 async function RSVPsFetch(eventID: number) {
   try {
@@ -31,13 +32,7 @@ async function RSVPsDelete(rsvpID: number) {
 
 async function RSVPsCreate(rsvp: RSVP) {
   try {
-    const response = await fetch("/api/rsvps", {
-      method: "POST",
-      body: JSON.stringify(rsvp),
-      headers: {
-        "Content-Type": "application/json"
-      }
-    })
+    const response = await postIdempotent("/api/rsvps", rsvp);
     if (response.ok) {
       console.log("RSVP created successfully");
     }
@@ -4,3 +4,37 @@ import { twMerge } from "tailwind-merge"
 export function cn(...inputs: ClassValue[]) {
   return twMerge(clsx(inputs))
 }
+
+// crypto.randomUUID only exists in secure contexts (https or localhost)
+function idempotencyKey(): string {
+  if (typeof crypto.randomUUID === "function") {
+    return crypto.randomUUID()
+  }
+  return Array.from(crypto.getRandomValues(new Uint8Array(16)), (b) =>
+    b.toString(16).padStart(2, "0")
+  ).join("")
+}
+
+// POSTs JSON, retrying network failures with the same Idempotency-Key so the
+// backend creates the row once even when an earlier attempt got through
+export async function postIdempotent(url: string, body: unknown, attempts = 3) {
+  const key = idempotencyKey()
+  for (let attempt = 1; ; attempt++) {
+    try {
+      return await fetch(url, {
+        method: "POST",
+        body: JSON.stringify(body),
+        headers: {
+          "Content-Type": "application/json",
+          "Idempotency-Key": key,
+        },
+      })
+    }
+    catch (error) {
+      if (attempt >= attempts) {
+        throw error
+      }
+      await new Promise((resolve) => setTimeout(resolve, 500 * attempt))
+    }
+  }
+}